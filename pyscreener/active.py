@@ -0,0 +1,307 @@
+"""This module contains an active learning driver for screening a ligand library with a fraction of
+the docking calls of an exhaustive screen
+
+Starting from a random sample of the library, each iteration trains a surrogate model on the
+packed Morgan fingerprints and docking scores of all the ligands docked so far, predicts the score
+of every remaining ligand in vectorized batches, and docks the batch of ligands with the highest
+acquisition value. This continues until the budget of docking calls is spent. NOTE: requires
+scikit-learn"""
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.stats import norm
+
+from pyscreener.docking import DockingVirtualScreen
+from pyscreener.postprocessing import fingerprints
+
+if TYPE_CHECKING:
+    from pyscreener.docking.writer import ResultWriter
+
+PREDICT_BATCH_SIZE = 16384
+
+
+def greedy(Y_mean: np.ndarray, Y_sd: np.ndarray, best: float, beta: float, rng) -> np.ndarray:
+    return Y_mean
+
+
+def ucb(Y_mean: np.ndarray, Y_sd: np.ndarray, best: float, beta: float, rng) -> np.ndarray:
+    return Y_mean + beta * Y_sd
+
+
+def ei(Y_mean: np.ndarray, Y_sd: np.ndarray, best: float, beta: float, rng) -> np.ndarray:
+    improvement = Y_mean - best
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Z = improvement / Y_sd
+        E = improvement * norm.cdf(Z) + Y_sd * norm.pdf(Z)
+
+    return np.where(Y_sd > 0, E, np.maximum(improvement, 0))
+
+
+def random(Y_mean: np.ndarray, Y_sd: np.ndarray, best: float, beta: float, rng) -> np.ndarray:
+    return rng.random(len(Y_mean))
+
+
+ACQUISITIONS: Dict[str, Callable] = {"greedy": greedy, "ucb": ucb, "ei": ei, "random": random}
+SURROGATES = ("rf", "mlp")
+
+
+def build_surrogate(surrogate: str, seed: Optional[int] = None):
+    """build an unfit scikit-learn regressor of the given type"""
+    if surrogate == "rf":
+        from sklearn.ensemble import RandomForestRegressor
+
+        return RandomForestRegressor(
+            n_estimators=100, max_features="sqrt", n_jobs=-1, random_state=seed
+        )
+    if surrogate == "mlp":
+        from sklearn.neural_network import MLPRegressor
+
+        return MLPRegressor((128,), early_stopping=True, max_iter=200, random_state=seed)
+
+    raise ValueError(f'Invalid surrogate model! got: "{surrogate}"')
+
+
+def predict(
+    model, fps: np.ndarray, length: int, batch_size: int = PREDICT_BATCH_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """predict the objective of each molecule in vectorized batches of unpacked fingerprints
+
+    Parameters
+    ----------
+    model
+        a fitted scikit-learn regressor
+    fps : np.ndarray
+        the packed fingerprints of the molecules
+    length : int
+        the length of the unpacked fingerprints
+    batch_size : int, default=PREDICT_BATCH_SIZE
+        the number of fingerprints to unpack and predict at once
+
+    Returns
+    -------
+    np.ndarray
+        the predicted mean of each molecule
+    np.ndarray
+        the predicted standard deviation of each molecule. For a random forest, this is the spread
+        of the predictions of its trees. Otherwise, zero
+    """
+    Y_mean = np.empty(len(fps))
+    Y_sd = np.zeros(len(fps))
+    for i in range(0, len(fps), batch_size):
+        X = fingerprints.unpack(fps[i : i + batch_size], length)
+        if hasattr(model, "estimators_"):
+            Y = np.stack([tree.predict(X) for tree in model.estimators_])
+            Y_mean[i : i + batch_size] = Y.mean(0)
+            Y_sd[i : i + batch_size] = Y.std(0)
+        else:
+            Y_mean[i : i + batch_size] = model.predict(X)
+
+    return Y_mean, Y_sd
+
+
+@dataclass
+class Iteration:
+    num_docked: int
+    best: Optional[float]
+    top_k: Optional[float]
+    recovery: Optional[float] = None
+
+
+class ActiveLearner:
+    """An ActiveLearner screens a ligand library using a surrogate model of the docking score to
+    select the ligands to dock
+
+    Parameters
+    ----------
+    virtual_screen : DockingVirtualScreen
+        the virtual screen with which to dock each selected batch of ligands
+    smis : Sequence[str]
+        the SMILES strings of the library
+    budget : int
+        the total number of ligands to dock
+    batch_size : Optional[int], default=None
+        the number of ligands to dock in each iteration. If None, use 10% of the budget
+    init_size : Optional[int], default=None
+        the number of randomly selected ligands to dock in the first iteration. If None, use the
+        batch size
+    acquisition : str, default="ucb"
+        the acquisition function with which to select each batch. One of "greedy", "ucb"
+        (upper confidence bound), "ei" (expected improvement), or "random". Only a random forest
+        surrogate predicts uncertainties, so "ucb" and "ei" are equivalent to "greedy" otherwise
+    surrogate : str, default="rf"
+        the surrogate model, either "rf" (random forest) or "mlp" (neural network)
+    k : int, default=100
+        the number of top-scoring ligands to track
+    beta : float, default=2.0
+        the weight of the uncertainty in the upper confidence bound
+    radius : int, default=2
+        the radius of the Morgan fingerprints
+    length : int, default=2048
+        the length of the Morgan fingerprints
+    reference : Optional[Sequence[Optional[float]]], default=None
+        the true docking score of each ligand in the library, e.g., from a previous exhaustive
+        screen, with which to calculate the fraction of the true top-k ligands recovered. Ligands
+        without a score are ignored
+    seed : Optional[int], default=None
+        the random seed
+
+    Raises
+    ------
+    ValueError
+        if the acquisition function or surrogate model is invalid or the budget is not positive
+    """
+
+    def __init__(
+        self,
+        virtual_screen: DockingVirtualScreen,
+        smis: Sequence[str],
+        budget: int,
+        batch_size: Optional[int] = None,
+        init_size: Optional[int] = None,
+        acquisition: str = "ucb",
+        surrogate: str = "rf",
+        k: int = 100,
+        beta: float = 2.0,
+        radius: int = 2,
+        length: int = 2048,
+        reference: Optional[Sequence[Optional[float]]] = None,
+        seed: Optional[int] = None,
+    ):
+        if acquisition not in ACQUISITIONS:
+            raise ValueError(f'Invalid acquisition function! got: "{acquisition}"')
+        if surrogate not in SURROGATES:
+            raise ValueError(f'Invalid surrogate model! got: "{surrogate}"')
+        if budget < 1:
+            raise ValueError(f'arg "budget" must be positive! got: "{budget}"')
+
+        self.virtual_screen = virtual_screen
+        self.smis = list(smis)
+        self.budget = min(budget, len(self.smis))
+        self.batch_size = batch_size or max(1, self.budget // 10)
+        self.init_size = init_size or self.batch_size
+        self.acquisition = acquisition
+        self.surrogate = surrogate
+        self.k = k
+        self.beta = beta
+        self.length = length
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        self.fps, self.valid = fingerprints.gen_packed_fps(self.smis, radius, length)
+        self.scores = np.full(len(self.smis), np.nan)
+        self.docked = np.zeros(len(self.smis), dtype=bool)
+        self.history: List[Iteration] = []
+
+        if reference is not None:
+            R = np.array(reference, dtype=float)
+            idxs = np.flatnonzero(~np.isnan(R))
+            self.true_top_k = idxs[np.argsort(R[idxs], kind="stable")[:k]]
+        else:
+            self.true_top_k = None
+
+    @property
+    def num_docked(self) -> int:
+        """the number of ligands docked so far"""
+        return int(self.docked.sum())
+
+    def run(self, writer: Optional["ResultWriter"] = None) -> np.ndarray:
+        """screen the library until the budget is spent
+
+        Parameters
+        ----------
+        writer : Optional[ResultWriter], default=None
+            a writer to which the results of each ligand will be written as they complete
+
+        Returns
+        -------
+        np.ndarray
+            the docking score of each ligand in the library. NaN for each ligand that was not
+            docked (or whose simulation failed)
+        """
+        self.dock(self.explore(min(self.init_size, self.budget)), writer)
+
+        while self.num_docked < self.budget:
+            idxs = self.exploit(min(self.batch_size, self.budget - self.num_docked))
+            if len(idxs) == 0:
+                break
+
+            self.dock(idxs, writer)
+
+        return self.scores
+
+    def explore(self, n: int) -> np.ndarray:
+        """randomly select `n` undocked ligands"""
+        idxs = np.flatnonzero(self.valid & ~self.docked)
+
+        return self.rng.choice(idxs, min(n, len(idxs)), replace=False)
+
+    def exploit(self, n: int) -> np.ndarray:
+        """select the `n` undocked ligands with the highest acquisition values under a surrogate
+        model trained on all of the docked ligands. Scores are negated so that higher is better"""
+        idxs = np.flatnonzero(self.valid & ~self.docked)
+        train_idxs = np.flatnonzero(self.docked & ~np.isnan(self.scores))
+        if len(train_idxs) < 2 or self.acquisition == "random":
+            return self.explore(n)
+
+        model = build_surrogate(self.surrogate, self.seed)
+        model.fit(fingerprints.unpack(self.fps[train_idxs], self.length), -self.scores[train_idxs])
+
+        Y_mean, Y_sd = predict(model, self.fps[idxs], self.length)
+        best = -np.nanmin(self.scores)
+        U = ACQUISITIONS[self.acquisition](Y_mean, Y_sd, best, self.beta, self.rng)
+
+        n = min(n, len(idxs))
+        top = np.argpartition(-U, n - 1)[:n]
+
+        return idxs[top[np.argsort(-U[top], kind="stable")]]
+
+    def dock(self, idxs: np.ndarray, writer: Optional["ResultWriter"] = None):
+        """dock the ligands at the given indices and record the progress of the screen"""
+        if len(idxs) > 0:
+            self.scores[idxs] = self.virtual_screen([self.smis[i] for i in idxs], writer=writer)
+            self.docked[idxs] = True
+
+        scores = np.sort(self.scores[~np.isnan(self.scores)])
+        top_k = scores[: self.k]
+        self.history.append(
+            Iteration(
+                self.num_docked,
+                float(top_k[0]) if len(top_k) > 0 else None,
+                float(top_k.mean()) if len(top_k) > 0 else None,
+                self.recovery(),
+            )
+        )
+
+    def recovery(self) -> Optional[float]:
+        """the fraction of the true top-k ligands that have been docked. None if no reference
+        scores were supplied"""
+        if self.true_top_k is None or len(self.true_top_k) == 0:
+            return None
+
+        return float(self.docked[self.true_top_k].mean())
+
+    def report(self) -> str:
+        """a table of the progress of the screen after each iteration"""
+        lines = [f"{'docked':>8} {'best':>10} {f'top-{self.k}':>10} {'recovery':>9}"]
+        for it in self.history:
+            best = f"{it.best:0.2f}" if it.best is not None else "-"
+            top_k = f"{it.top_k:0.2f}" if it.top_k is not None else "-"
+            recovery = f"{it.recovery:0.1%}" if it.recovery is not None else "-"
+            lines.append(f"{it.num_docked:>8} {best:>10} {top_k:>10} {recovery:>9}")
+
+        return "\n".join(lines)
+
+
+def read_reference(filepath: Union[str, Path], smis: Sequence[str]) -> List[Optional[float]]:
+    """read the reference score of each SMILES string from a CSV file with a header and SMILES
+    strings and scores in its first two columns, e.g., the "scores.csv" file of a screen. SMILES
+    strings without a score in the file are given a score of None"""
+    with open(filepath) as fid:
+        reader = csv.reader(fid)
+        next(reader)
+        d_smi_score = {row[0]: float(row[1]) for row in reader if len(row) > 1 and row[1]}
+
+    return [d_smi_score.get(smi) for smi in smis]
@@ -16,11 +16,22 @@ def gen_args(argv: Optional[str] = None) -> Namespace:
     add_preprocessing_args(parser)
     add_supply_args(parser)
     add_screen_args(parser)
+    add_active_learning_args(parser)
     add_postprocessing_args(parser)
 
     args = parser.parse_args(argv)
     args.title_line = not args.no_title_line
     del args.no_title_line
+    args.property_ranges = dict(args.property_ranges) if args.property_ranges else None
+
+    if args.stdin and (args.input_files or args.smis):
+        parser.error("argument --stdin: not allowed with arguments -i/--input-files or -s/--smis")
+    if args.stdin and args.shard is not None:
+        parser.error("argument --stdin: not allowed with argument --shard")
+    if args.output_format == "arrow" and args.compression not in ("none", "lz4", "zstd"):
+        parser.error(f"argument --compression: arrow output does not support: '{args.compression}'")
+    if args.stream_out is not None and args.budget is not None:
+        parser.error("argument --stream-out: not allowed with argument --budget")
 
     args.metadata_template["buffer"] = args.buffer
     args.metadata_template["docked_ligand_file"] = args.docked_ligand_file
@@ -28,6 +39,20 @@ def gen_args(argv: Optional[str] = None) -> Namespace:
     return args
 
 
+def gen_serve_args(argv: Optional[str] = None) -> Namespace:
+    parser = ArgumentParser(description="Serve the docking scores of ligands over a local API.")
+
+    add_general_args(parser)
+    add_screen_args(parser)
+    add_server_args(parser)
+
+    args = parser.parse_args(argv)
+    args.metadata_template["buffer"] = args.buffer
+    args.metadata_template["docked_ligand_file"] = args.docked_ligand_file
+
+    return args
+
+
 def add_general_args(parser: ArgumentParser):
     parser.add_argument(
         "--config", is_config_file=True, help="filepath of a configuration file to use"
@@ -50,6 +75,29 @@ def add_general_args(parser: ArgumentParser):
         default=False,
         help="do not sort the output scores CSV file by score",
     )
+    parser.add_argument(
+        "--output-format",
+        default="csv",
+        choices=("csv", "parquet", "arrow"),
+        help='the format of the output results file. "csv" writes the sorted "scores.csv" file at the end of the screen. "parquet" and "arrow" incrementally write the typed results of each simulation to a "results.parquet" or "results.arrow" file, respectively, in row groups as they complete. NOTE: requires pyarrow',
+    )
+    parser.add_argument(
+        "--stream-out",
+        choices=("jsonl", "tsv"),
+        help='write a record of the overall score and status of each ligand to stdout as soon as it completes, either as a JSON object per line ("jsonl") or as tab-separated values ("tsv"). All other output is redirected to stderr, so pyscreener may be used as a filter in a Unix pipeline. The output file specified by --output-format is still written',
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=positive_int,
+        default=10000,
+        help="the number of simulation results to buffer before writing a row group when using a parquet or arrow output format",
+    )
+    parser.add_argument(
+        "--compression",
+        default="zstd",
+        choices=("none", "snappy", "gzip", "brotli", "lz4", "zstd"),
+        help='the compression codec to use when using a parquet or arrow output format. Pass "none" for no compression. NOTE: arrow output only supports "lz4" and "zstd"',
+    )
     parser.add_argument(
         "--collect-all",
         action="store_true",
@@ -69,9 +117,36 @@ def add_preprocessing_args(parser: ArgumentParser):
     parser.add_argument(
         "--preprocessing-options",
         nargs="+",
-        choices=("pdbfix", "filter"),
+        choices=("pdbfix", "filter", "alerts"),
         help="the preprocessing options to apply",
     )
+    parser.add_argument(
+        "--max-atoms",
+        type=positive_int,
+        help='the maximum number of heavy atoms of a ligand. Only used with the "filter" preprocessing option',
+    )
+    parser.add_argument(
+        "--max-weight",
+        type=float,
+        help='the maximum molecular weight of a ligand. Only used with the "filter" preprocessing option',
+    )
+    parser.add_argument(
+        "--max-logP",
+        type=float,
+        help='the maximum Crippen logP of a ligand. Only used with the "filter" preprocessing option',
+    )
+    parser.add_argument(
+        "--alert-catalogs",
+        nargs="*",
+        default=["PAINS", "BRENK"],
+        help='the RDKit FilterCatalogs of substructure alerts against which to screen ligands, e.g., "PAINS", "BRENK", "NIH", "ZINC", or "ALL". Only used with the "alerts" preprocessing option',
+    )
+    parser.add_argument(
+        "--alert-smarts-files",
+        nargs="+",
+        default=[],
+        help='files containing custom substructure alerts, with one SMARTS pattern per line optionally followed by the name of the alert. Only used with the "alerts" preprocessing option',
+    )
     parser.add_argument(
         "--pH",
         type=float,
@@ -85,6 +160,11 @@ def add_supply_args(parser: ArgumentParser):
     parser.add_argument(
         "-i", "--input-files", nargs="+", help="the filenames containing ligands to dock"
     )
+    parser.add_argument(
+        "--stdin",
+        action="store_true",
+        help="read the SMILES strings of the ligands to dock from stdin, one per line. Lines are read incrementally as docking slots free up, so the input may be an unbounded stream. Any text after the SMILES string on a line, blank lines, and lines starting with '#' are ignored",
+    )
     parser.add_argument(
         "--input-filetypes",
         nargs="+",
@@ -100,7 +180,7 @@ def add_supply_args(parser: ArgumentParser):
         "--smiles-col",
         type=int,
         default=0,
-        help="the column containing the SMILES strings in the CSV file.",
+        help="the column containing the SMILES strings in the CSV, Parquet, or Arrow IPC file.",
     )
     parser.add_argument(
         "--name-col",
@@ -112,6 +192,23 @@ def add_supply_args(parser: ArgumentParser):
         "--id-property",
         help='UNUSED the name of the property containing the molecule names/IDs in a SMI or SDF file (e.g., "CatalogID", "Chemspace_ID", "Name", etc.). Molecules will be labeled as ligand_<i> otherwise.',
     )
+    parser.add_argument(
+        "--property-ranges",
+        nargs="+",
+        type=property_range,
+        help='the allowed range of a property column in a Parquet or Arrow IPC (Feather) input file, specified as "COLUMN:MIN:MAX", where either bound may be empty. E.g., "MW::500 logP:-1:5". Rows outside of these ranges are skipped by the reader before any parsing.',
+    )
+    parser.add_argument(
+        "--supply-ncpu",
+        type=positive_int,
+        default=1,
+        help="the number of processes over which to parse SDF and SMI input files and preprocess ligands. If a ray cluster is running, these will instead be distributed over ray tasks.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard,
+        help='the shard of the input ligands to screen, specified as "I/N" for the I-th of N disjoint shards (0-indexed), e.g., "$SLURM_ARRAY_TASK_ID/16". Each shard is screened independently, its ligands are named "<base-name>_shardI_<j>", and its output is written under the subdirectory "shard_I" of the output directory. The outputs of all shards may then be combined with "pyscreener-merge".',
+    )
     parser.add_argument(
         "--use-3d",
         action="store_true",
@@ -122,6 +219,11 @@ def add_supply_args(parser: ArgumentParser):
         action="store_true",
         help="whether the geometry of each molecule should be optimized using the RDKit MMFF94 forcefield first. Note that, in principle, initial geometry of input molecules to flexible docking simulations is statisically insignificant.",
     )
+    parser.add_argument(
+        "--single-file",
+        action="store_true",
+        help="whether to avoid writing one file per molecule when using input 3D geometries or optimizing molecules. Ligands of an input SDF file will be read in place and optimized geometries will be written to a single multi-record SDF file.",
+    )
 
 
 def add_screen_args(parser: ArgumentParser):
@@ -160,7 +262,19 @@ def add_screen_args(parser: ArgumentParser):
         type=float,
         help="the amount of buffer space to add around the docked ligand when calculating the docking box",
     )
-    parser.add_argument("-nc", "--ncpu", default=1, type=int)
+    parser.add_argument(
+        "-nc",
+        "--ncpu",
+        default=1,
+        type=ncpu,
+        help='the number of CPUs to use per docking simulation. If "auto", calibrate the number by docking a sample of the input ligands at several values on each type of node in the cluster and choosing the value with the highest total throughput',
+    )
+    parser.add_argument(
+        "--calibration-size",
+        default=16,
+        type=positive_int,
+        help="the number of ligands with which to calibrate the number of CPUs per docking simulation",
+    )
     parser.add_argument("--base-name", default="ligand")
     parser.add_argument(
         "--reduction",
@@ -180,6 +294,120 @@ def add_screen_args(parser: ArgumentParser):
         type=int,
         help="the number of top scores to average if using a top-k score mode",
     )
+    parser.add_argument(
+        "--box-fit",
+        choices=("skip", "flag"),
+        help="check whether each ligand's first embedded conformer can fit inside the docking box before docking it and either skip or flag those that cannot. Ligands supplied as files are not checked",
+    )
+    parser.add_argument(
+        "--box-tolerance",
+        type=float,
+        default=0.0,
+        help="the amount (in Angstroms) by which a ligand may exceed the docking box before it is considered not to fit",
+    )
+    parser.add_argument(
+        "--conformer-store",
+        help="the filepath of a SQLite database in which to cache the 3D conformers of ligands prepared from SMILES strings. Conformers in the store are reused across screens, docking programs, and receptors. Should be located on a node-local filesystem",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="the number of ligands to dock against the same receptor in a single invocation of the docking program. Only supported by smina and DOCK6. Other docking programs always dock ligands individually",
+    )
+    parser.add_argument(
+        "--node-executor",
+        action="store_true",
+        help="run the docking program processes of each node as asyncio subprocesses of a single executor on that node rather than as individual ray tasks. Reduces the memory and scheduling overhead of each concurrent docking simulation on nodes with many CPUs. Disables batching",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="prepare and dock each ligand in two separate ray tasks, so that ligands are prepared on a single CPU just ahead of docking rather than on the CPUs reserved for docking. Disables batching and can't be used with --node-executor",
+    )
+    parser.add_argument(
+        "--pin-cpus",
+        action="store_true",
+        help="pin each docking simulation to a disjoint set of cores on its node and limit the number of OpenMP/BLAS threads of each simulation to its number of CPUs. A warning is raised if the load average of a node exceeds its number of cores. Not used with --node-executor or --pipeline",
+    )
+    parser.add_argument(
+        "--schedule",
+        default="fifo",
+        choices=("fifo", "cost"),
+        help="the order in which to submit ligands for docking. 'fifo' submits ligands in input order. 'cost' submits the ligands in the in-flight window in order of their docking time as predicted from their number of rotatable bonds, heavy atoms, and rings, longest first, to avoid a long tail of expensive ligands at the end of the screen. The predictions are refined from the observed docking times as the screen progresses and are also used to estimate the time remaining",
+    )
+
+
+def add_active_learning_args(parser: ArgumentParser):
+    parser.add_argument(
+        "--budget",
+        type=positive_int,
+        help="the number of ligands to dock. If specified, rather than docking the entire library, screen it via active learning: dock an initial random sample of ligands, train a surrogate model on the fingerprints and scores of the docked ligands, dock the ligands with the highest acquisition values under the model, and repeat until the budget is spent. Requires SMILES inputs and scikit-learn",
+    )
+    parser.add_argument(
+        "--init-size",
+        type=positive_int,
+        help="the number of randomly selected ligands to dock in the first iteration of active learning. By default, the acquisition size",
+    )
+    parser.add_argument(
+        "--acquisition-size",
+        type=positive_int,
+        help="the number of ligands to dock in each iteration of active learning. By default, 10%% of the budget",
+    )
+    parser.add_argument(
+        "--acquisition",
+        default="ucb",
+        choices=("greedy", "ucb", "ei", "random"),
+        help="the acquisition function with which to select ligands during active learning",
+    )
+    parser.add_argument(
+        "--surrogate",
+        default="rf",
+        choices=("rf", "mlp"),
+        help="the surrogate model to use during active learning: a random forest or a neural network. Only a random forest predicts uncertainties for the 'ucb' and 'ei' acquisition functions",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=positive_int,
+        default=100,
+        help="the number of top-scoring ligands to track during active learning",
+    )
+    parser.add_argument(
+        "--reference-scores",
+        help="a CSV file of the SMILES strings and scores of an exhaustive screen of the same library (e.g., the scores.csv of a previous run) with which to report the fraction of the true top-k ligands recovered by active learning",
+    )
+    parser.add_argument("--seed", type=int, help="the random seed for active learning")
+
+
+def add_server_args(parser: ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1", help="the host on which to serve")
+    parser.add_argument("--port", type=int, default=8123, help="the port on which to serve")
+    parser.add_argument(
+        "--socket",
+        help="the path of a Unix socket on which to serve. If specified, --host and --port are ignored",
+    )
+    parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=0.05,
+        help="the maximum amount of time (in seconds) to wait for the ligands of further requests before dispatching a window of ligands",
+    )
+    parser.add_argument(
+        "--max-window",
+        type=positive_int,
+        help="the maximum number of ligands to dispatch in a single window. By default, four times the number of simulations that the ray cluster can run concurrently",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1_000_000,
+        help="the maximum number of ligand scores to cache. Pass 0 to disable caching",
+    )
+    parser.add_argument(
+        "--no-warm-up",
+        action="store_true",
+        help="do not dock a trivial ligand on every worker before serving",
+    )
 
 
 def add_postprocessing_args(parser: ArgumentParser):
@@ -206,3 +434,35 @@ def positive_int(arg: str):
         raise ArgumentTypeError(f"Value must be greater than 0! got: {arg}")
 
     return val
+
+
+def ncpu(arg: str):
+    if arg == "auto":
+        return arg
+
+    try:
+        return positive_int(arg)
+    except ValueError:
+        raise ArgumentTypeError(f'Value must be a positive integer or "auto"! got: {arg}')
+
+
+def shard(arg: str):
+    try:
+        i, n = map(int, arg.split("/"))
+    except ValueError:
+        raise ArgumentTypeError(f'Shard must be of the form "I/N"! got: {arg}')
+
+    if not 0 <= i < n:
+        raise ArgumentTypeError(f"Shard index I must be in the range [0, N)! got: {arg}")
+
+    return i, n
+
+
+def property_range(arg: str):
+    try:
+        column, lo, hi = arg.rsplit(":", 2)
+        bounds = tuple(float(x) if x else None for x in (lo, hi))
+    except ValueError:
+        raise ArgumentTypeError(f'Property range must be of the form "COLUMN:MIN:MAX"! got: {arg}')
+
+    return column, bounds
@@ -1,5 +1,6 @@
 from dataclasses import asdict
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
+import warnings
 
 from colorama import init, Fore, Style
 
@@ -41,9 +42,23 @@ def build_metadata(software: str, metadata: Optional[Dict] = None) -> Simulation
     raise UnsupportedSoftwareError(f'Unrecognized screen type: "{software}"')
 
 
-def get_runner(software: str) -> DockingRunner:
+def get_runner(software: str, metadata: Optional[SimulationMetadata] = None) -> DockingRunner:
+    """get the DockingRunner for the given type of screen. If the `software` of the supplied
+    Vina-type metadata is "vina_py", this is the runner that uses the AutoDock Vina python bindings
+    if they are installed. Otherwise, the metadata is changed to use the vina executable"""
     if software.lower() in ("vina", "qvina", "smina", "psovina"):
-        from pyscreener.docking.vina import VinaRunner
+        from pyscreener.docking.vina import Software, VinaRunner
+
+        if metadata is not None and metadata.software == Software.VINA_PY:
+            try:
+                from pyscreener.docking.vina.bindings import VinaPyRunner
+
+                return VinaPyRunner
+            except ImportError:
+                warnings.warn(
+                    "AutoDock Vina python bindings are not installed! Using vina executable ..."
+                )
+                metadata.software = Software.VINA
 
         return VinaRunner
 
@@ -65,6 +80,7 @@ def check_env(software, metadata: Optional[Dict] = None):
         valid_env = True
         print("  Validating metadata ... ", end=" ")
         metadata = build_metadata(software, metadata)
+        runner = get_runner(software, metadata)
         runner.validate_metadata(metadata)
         print(Style.BRIGHT + Fore.GREEN + "PASS")
     except (
@@ -84,5 +100,21 @@ def check_env(software, metadata: Optional[Dict] = None):
     print("Environment is properly set up!")
 
 
-def virtual_screen(software: str, *args, **kwargs) -> DockingVirtualScreen:
-    return DockingVirtualScreen(get_runner(software), *args, **kwargs)
+def virtual_screen(
+    software: str,
+    receptors: Optional[Iterable[str]],
+    center: Optional[Tuple],
+    size: Optional[Tuple],
+    metadata_template: SimulationMetadata,
+    *args,
+    **kwargs,
+) -> DockingVirtualScreen:
+    return DockingVirtualScreen(
+        get_runner(software, metadata_template),
+        receptors,
+        center,
+        size,
+        metadata_template,
+        *args,
+        **kwargs,
+    )
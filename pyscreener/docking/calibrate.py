@@ -0,0 +1,168 @@
+"""This module contains functions for calibrating the number of CPUs to use per docking simulation,
+i.e., the trade-off between the number of threads used by each docking program process and the
+number of concurrent docking simulations on each node"""
+from collections import defaultdict
+from dataclasses import replace
+from itertools import cycle, islice
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Type
+
+import ray
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
+
+from pyscreener.docking.runner import DockingRunner
+from pyscreener.docking.sim import Simulation
+
+CALIBRATION_SIZE = 16
+
+Throughputs = Dict[int, Dict[int, float]]
+
+
+def node_types() -> Dict[int, List[str]]:
+    """group the alive nodes of the ray cluster by type, i.e., their number of CPUs
+
+    Returns
+    -------
+    Dict[int, List[str]]
+        a mapping from the number of CPUs of each node type to the IDs of the nodes of that type
+    """
+    types = defaultdict(list)
+    for node in ray.nodes():
+        num_cpus = int(node["Resources"].get("CPU", 0))
+        if node["Alive"] and num_cpus > 0:
+            types[num_cpus].append(node["NodeID"])
+
+    return dict(types)
+
+
+def candidate_ncpus(num_cpus: int) -> List[int]:
+    """the candidate numbers of CPUs per simulation on a node with the given number of CPUs: each
+    power of two up to (and including) the number of CPUs"""
+    ncpus = []
+    ncpu = 1
+    while ncpu < num_cpus:
+        ncpus.append(ncpu)
+        ncpu *= 2
+    ncpus.append(num_cpus)
+
+    return ncpus
+
+
+def measure(
+    runner: Type[DockingRunner], sims: Sequence[Simulation], ncpu: int, node_id: str, num_cpus: int
+) -> float:
+    """measure the docking throughput of a node at the given number of CPUs per simulation
+
+    Parameters
+    ----------
+    runner : Type[DockingRunner]
+        the runner with which to prepare and run each simulation
+    sims : Sequence[Simulation]
+        the sample of simulations to run. The sample is repeated as necessary to fully occupy the
+        node
+    ncpu : int
+        the number of CPUs to use per simulation
+    node_id : str
+        the ID of the node on which to run the simulations
+    num_cpus : int
+        the number of CPUs of the node
+
+    Returns
+    -------
+    float
+        the throughput of the node in ligands per hour
+    """
+    n = max(len(sims), num_cpus // ncpu)
+    sims = [
+        replace(sim, ncpu=ncpu, name=f"{sim.name}_{i}")
+        for i, sim in enumerate(islice(cycle(sims), n))
+    ]
+
+    f = ray.remote(num_cpus=ncpu)(runner.prepare_and_run).options(
+        scheduling_strategy=NodeAffinitySchedulingStrategy(node_id, soft=False)
+    )
+
+    start = time.perf_counter()
+    ray.get([f.remote(sim) for sim in sims])
+    elapsed = time.perf_counter() - start
+
+    return 3600 * len(sims) / elapsed
+
+
+def calibrate(
+    runner: Type[DockingRunner], sims: Sequence[Simulation], ncpus: Optional[Iterable[int]] = None
+) -> Throughputs:
+    """measure the docking throughput of a representative node of each node type in the ray
+    cluster at several numbers of CPUs per simulation. Before any measurements are made, the
+    sample is docked once on each node to warm up its worker processes
+
+    Parameters
+    ----------
+    runner : Type[DockingRunner]
+        the runner with which to prepare and run each simulation
+    sims : Sequence[Simulation]
+        a sample of simulations from the library to be screened
+    ncpus : Optional[Iterable[int]], default=None
+        the numbers of CPUs per simulation to measure. If None, use each power of two up to the
+        number of CPUs of each node type. Values larger than the number of CPUs of a node type are
+        not measured for that type
+
+    Returns
+    -------
+    Throughputs
+        a mapping from the number of CPUs of each node type to a mapping from the number of CPUs
+        per simulation to the throughput (in ligands per hour) of a node of that type
+    """
+    ncpus = list(ncpus) if ncpus is not None else None
+
+    throughputs = {}
+    for num_cpus, node_ids in node_types().items():
+        ncpus_ = [n for n in ncpus if n <= num_cpus] if ncpus else candidate_ncpus(num_cpus)
+        if len(ncpus_) == 0:
+            continue
+
+        _ = measure(runner, sims, ncpus_[0], node_ids[0], num_cpus)
+        throughputs[num_cpus] = {
+            ncpu: measure(runner, sims, ncpu, node_ids[0], num_cpus) for ncpu in ncpus_
+        }
+
+    return throughputs
+
+
+def best_ncpus(throughputs: Throughputs) -> Dict[int, int]:
+    """the number of CPUs per simulation with the highest throughput for each node type"""
+    return {
+        num_cpus: max(throughputs_, key=throughputs_.get)
+        for num_cpus, throughputs_ in throughputs.items()
+    }
+
+
+def best_ncpu(throughputs: Throughputs, num_nodes: Mapping[int, int]) -> int:
+    """the number of CPUs per simulation with the highest total throughput of the cluster
+
+    Every simulation of a screen uses the same number of CPUs, so if the node types of the cluster
+    disagree on their best number of CPUs per simulation, the number that maximizes the sum of the
+    throughputs of all the nodes in the cluster is chosen. A node type that was not measured at a
+    given number of CPUs (i.e., it has fewer CPUs than that) contributes no throughput
+
+    Parameters
+    ----------
+    throughputs : Throughputs
+        the measured throughputs of each node type
+    num_nodes : Mapping[int, int]
+        the number of nodes of each type
+
+    Returns
+    -------
+    int
+        the number of CPUs per simulation
+    """
+    ncpus = set(ncpu for throughputs_ in throughputs.values() for ncpu in throughputs_)
+
+    def total(ncpu: int) -> float:
+        return sum(
+            num_nodes.get(num_cpus, 0) * throughputs_.get(ncpu, 0.0)
+            for num_cpus, throughputs_ in throughputs.items()
+        )
+
+    return max(sorted(ncpus), key=total)
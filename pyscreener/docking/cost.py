@@ -0,0 +1,135 @@
+"""This module contains a model of the cost (i.e., docking time) of each ligand, which is used to
+dock the most expensive ligands first and to estimate the time remaining in a screen
+
+Docking time grows roughly exponentially with the conformational flexibility of a ligand, so the
+model is a Bayesian linear regression of the log docking time of each simulation on a few cheap
+RDKit descriptors of its ligand. The prior is loosely fit to AutoDock Vina at its default
+exhaustiveness on a single CPU and is refined online from the observed time of each completed
+simulation. The prior on the intercept (i.e., the overall scale of docking times) is weak so that
+the model quickly adapts to the docking program, its parameters, and the hardware."""
+from typing import Optional, Sequence
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdMolDescriptors
+
+PRIOR_WEIGHTS = np.array([1.2, 0.2, 0.05, 0.0])
+PRIOR_PRECISION = np.array([0.1, 10.0, 10.0, 10.0])
+MIN_TIME = 1e-3
+
+
+def featurize(smi: Optional[str]) -> Optional[np.ndarray]:
+    """the features of a ligand: an intercept followed by its number of rotatable bonds, heavy
+    atoms, and rings
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        the feature vector of the ligand. None if the SMILES string is None or could not be parsed
+    """
+    if smi is None:
+        return None
+
+    mol = Chem.MolFromSmiles(smi)
+    if mol is None:
+        return None
+
+    return np.array(
+        [
+            1.0,
+            rdMolDescriptors.CalcNumRotatableBonds(mol),
+            mol.GetNumHeavyAtoms(),
+            rdMolDescriptors.CalcNumRings(mol),
+        ]
+    )
+
+
+class CostModel:
+    """A CostModel predicts the docking time of a ligand from its features and is refined from the
+    observed docking times of other ligands
+
+    Parameters
+    ----------
+    weights : np.ndarray, default=PRIOR_WEIGHTS
+        the prior weights of the model on the log docking time (in seconds)
+    precision : np.ndarray, default=PRIOR_PRECISION
+        the precision of the prior on each weight, i.e., roughly the number of observations it is
+        worth
+    """
+
+    def __init__(
+        self, weights: np.ndarray = PRIOR_WEIGHTS, precision: np.ndarray = PRIOR_PRECISION
+    ):
+        self.w = np.array(weights, dtype=float)
+        self.A = np.diag(precision).astype(float)
+        self.b = self.A @ self.w
+        self.total_time = 0.0
+        self.num_observations = 0
+
+    @property
+    def mean_time(self) -> float:
+        """the mean observed docking time. If nothing has been observed, the time predicted by the
+        intercept of the model"""
+        if self.num_observations == 0:
+            return float(np.exp(self.w[0]))
+
+        return self.total_time / self.num_observations
+
+    def predict(self, xs: Sequence[Optional[np.ndarray]]) -> np.ndarray:
+        """predict the docking time (in seconds) of each ligand. Ligands without features are
+        predicted to take the mean observed docking time"""
+        C = np.full(len(xs), self.mean_time)
+
+        idxs = [i for i, x in enumerate(xs) if x is not None]
+        if len(idxs) > 0:
+            X = np.stack([xs[i] for i in idxs])
+            C[idxs] = np.exp(X @ self.w)
+
+        return C
+
+    def update(self, x: Optional[np.ndarray], t: float):
+        """update the model with the observed docking time `t` (in seconds) of a ligand with
+        features `x`"""
+        self.total_time += t
+        self.num_observations += 1
+        if x is None:
+            return
+
+        y = np.log(max(t, MIN_TIME))
+        self.A += np.outer(x, x)
+        self.b += y * x
+        self.w = np.linalg.solve(self.A, self.b)
+
+    def eta(
+        self,
+        xs: Sequence[Optional[np.ndarray]],
+        num_slots: int,
+        num_unseen: int = 0,
+        num_sims: int = 1,
+    ) -> float:
+        """estimate the time remaining to dock a set of ligands when the most expensive ligands are
+        docked first: the larger of their total predicted docking time spread evenly over the
+        concurrent simulations and the predicted time of the most expensive simulation
+
+        Parameters
+        ----------
+        xs : Sequence[Optional[np.ndarray]]
+            the features of each ligand
+        num_slots : int
+            the number of simulations that may run concurrently
+        num_unseen : int, default=0
+            the number of additional ligands whose features are not (yet) known. Each is predicted
+            to take the mean observed docking time
+        num_sims : int, default=1
+            the number of simulations of each ligand, i.e., the number of receptors
+
+        Returns
+        -------
+        float
+            the estimated time remaining (in seconds)
+        """
+        costs = self.predict(xs)
+        total = num_sims * (costs.sum() + num_unseen * self.mean_time)
+        longest = max(costs.max(initial=0.0), self.mean_time if num_unseen > 0 else 0.0)
+
+        return max(total / max(num_slots, 1), longest)
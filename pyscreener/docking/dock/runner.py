@@ -2,11 +2,11 @@ import os
 from pathlib import Path
 import re
 import subprocess as sp
-from typing import List, Mapping, Optional, Tuple, Union
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
 import warnings
 
 from openbabel import pybel
-from rdkit.Chem import AllChem as Chem
 import ray
 
 from pyscreener.exceptions import (
@@ -15,7 +15,10 @@ from pyscreener.exceptions import (
     ReceptorPreparationError,
 )
 from pyscreener.utils import reduce_scores
-from pyscreener.warnings import ChargeWarning, ConformerWarning, SimulationFailureWarning
+from pyscreener.utils.conformers import get_conformer
+from pyscreener.utils.formats import write_ligand
+from pyscreener.utils.index import read_reference
+from pyscreener.warnings import ChargeWarning, SimulationFailureWarning
 from pyscreener.docking import Simulation, DockingRunner, Result
 from pyscreener.docking.dock import utils
 from pyscreener.docking.dock.metadata import DOCKMetadata
@@ -33,6 +36,8 @@ VDW_DEFN_FILE = DOCK6 / "parameters" / "vdw_AMBER_parm99.defn"
 FLEX_DEFN_FILE = DOCK6 / "parameters" / "flex.defn"
 FLEX_DRIVE_FILE = DOCK6 / "parameters" / "flex_drive.tbl"
 DOCK = DOCK6 / "bin" / "dock6"
+MOLECULE_LINE = re.compile(r"\s*Molecule:\s*(\S+)")
+NAME_LINE = re.compile(r"#+\s+Name:\s*(\S+)")
 
 for f in (VDW_DEFN_FILE, FLEX_DEFN_FILE, FLEX_DRIVE_FILE, DOCK):
     if not f.exists():
@@ -110,13 +115,37 @@ class DOCKRunner(DockingRunner):
 
     @staticmethod
     def prepare_and_run(sim: Simulation) -> Optional[Result]:
+        start = time.perf_counter()
         if not DOCKRunner.prepare_ligand(sim):
             return None
 
         _ = DOCKRunner.run(sim)
+        if sim.result is not None:
+            sim.result.time = time.perf_counter() - start
 
         return sim.result
 
+    @classmethod
+    def supports_batching(cls, metadata: DOCKMetadata) -> bool:
+        return True
+
+    @staticmethod
+    def prepare_and_run_batch(sims: Sequence[Simulation]) -> List[Optional[Result]]:
+        """Prepare the ligand files of the simulations then run them in a single invocation of
+        DOCK6. See `run_batch()` for more details"""
+        start = time.perf_counter()
+        prepared = [sim for sim in sims if DOCKRunner.prepare_ligand(sim)]
+
+        DOCKRunner.run_batch(prepared)
+
+        elapsed = (time.perf_counter() - start) / max(len(prepared), 1)
+        for sim in prepared:
+            if sim.result is not None:
+                sim.result.time = elapsed
+        prepared_ids = {id(sim) for sim in prepared}
+
+        return [sim.result if id(sim) in prepared_ids else None for sim in sims]
+
     @staticmethod
     def prepare_ligand(sim: Simulation) -> bool:
         if sim.smi is not None:
@@ -138,29 +167,15 @@ class DOCKRunner(DockingRunner):
         """
         mol2 = Path(sim.in_path) / f"{sim.name}.mol2"
 
-        mol = Chem.MolFromSmiles(sim.smi)
+        mol = get_conformer(sim.smi, sim.conformer_store)
         if mol is None:
             return False
 
-        mol = Chem.AddHs(mol)
-
-        try:
-            Chem.EmbedMolecule(mol)
-            Chem.MMFFOptimizeMolecule(mol)
-        except ValueError:
-            warnings.warn("Could not generate 3D conformer of molecule!", ConformerWarning)
-
         try:
-            mol = pybel.readstring("mol", Chem.MolToMolBlock(mol))
+            write_ligand(mol, mol2, "mol2", sim.name)
         except IOError:
             return False
 
-        try:
-            mol.calccharges(model="gasteiger")
-        except Exception:
-            warnings.warn("Could not calculate charges for ligand!", ChargeWarning)
-
-        mol.write(format="mol2", filename=str(mol2), overwrite=True, opt={"h": None})
         sim.metadata.prepared_ligand = mol2
 
         return True
@@ -168,10 +183,14 @@ class DOCKRunner(DockingRunner):
     @staticmethod
     def prepare_from_file(sim: Simulation) -> bool:
         """Convert a single ligand to the appropriate input format with specified geometry"""
-        fmt = Path(sim.input_file).suffix.strip(".")
+        filepath, record = read_reference(sim.input_file)
+        fmt = Path(filepath).suffix.strip(".")
 
         try:
-            mol = next(pybel.readfile(fmt, sim.input_file))
+            if record is not None:
+                mol = pybel.readstring(fmt, record)
+            else:
+                mol = next(pybel.readfile(fmt, filepath))
         except StopIteration:
             return False
 
@@ -198,17 +217,28 @@ class DOCKRunner(DockingRunner):
         score : Optional[float]
             the ligand's docking score. None if DOCKing failed.
         """
+        argv = DOCKRunner.build_command(sim)
+        if argv is None:
+            return None
+
+        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
+        try:
+            ret.check_returncode()
+        except sp.SubprocessError:
+            warnings.warn(f'Message: {ret.stderr.decode("utf-8")}', SimulationFailureWarning)
+
+        return DOCKRunner.parse_results(sim)
+
+    @staticmethod
+    def build_command(sim: Simulation) -> Optional[List[str]]:
         if sim.metadata.prepared_receptor is None or sim.metadata.prepared_ligand is None:
             return None
 
-        p_ligand = Path(sim.metadata.prepared_ligand)
-        ligand_name = p_ligand.stem
         sph_file, grid_prefix = sim.metadata.prepared_receptor
+        name = DOCKRunner.output_name(sim)
 
-        name = f"{Path(sph_file).stem}_{ligand_name}"
-
-        infile, outfile_prefix = DOCKRunner.prepare_input_file(
-            p_ligand,
+        infile, _ = DOCKRunner.prepare_input_file(
+            Path(sim.metadata.prepared_ligand),
             sph_file,
             grid_prefix,
             name,
@@ -216,17 +246,15 @@ class DOCKRunner(DockingRunner):
             sim.out_path,
             sim.metadata.dock_params,
         )
+        logfile = Path(sim.out_path) / f"{name}.log"
 
-        logfile = Path(outfile_prefix).parent / f"{name}.log"
-        argv = [str(DOCK), "-i", str(infile), "-o", str(logfile)]
+        return [str(DOCK), "-i", str(infile), "-o", str(logfile)]
 
-        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
-        try:
-            ret.check_returncode()
-        except sp.SubprocessError:
-            warnings.warn(f'Message: {ret.stderr.decode("utf-8")}', SimulationFailureWarning)
+    @staticmethod
+    def parse_results(sim: Simulation) -> Optional[List[float]]:
+        name = DOCKRunner.output_name(sim)
 
-        scores = DOCKRunner.parse_logfile(logfile)
+        scores = DOCKRunner.parse_logfile(Path(sim.out_path) / f"{name}.log")
         score = None if scores is None else reduce_scores(scores, sim.reduction, k=sim.k)
 
         node_id = re.sub("[:,.]", "", ray.util.get_node_ip_address())
@@ -234,6 +262,141 @@ class DOCKRunner(DockingRunner):
 
         return scores
 
+    @staticmethod
+    def output_name(sim: Simulation) -> str:
+        """the base name of the output files of the simulation"""
+        sph_file, _ = sim.metadata.prepared_receptor
+
+        return f"{Path(sph_file).stem}_{Path(sim.metadata.prepared_ligand).stem}"
+
+    @staticmethod
+    def run_batch(sims: Sequence[Simulation]):
+        """Run the simulations, which must all be against the same receptor, in a single
+        invocation of DOCK6 by concatenating their prepared ligands into a single multi-molecule
+        MOL2 file. The energy grids, spheres, and parameter tables are thus only loaded once per
+        batch. The combined log and scored MOL2 files are then split into the same per-ligand log
+        and scored MOL2 files as individual runs would produce, and the `result` of each
+        simulation is set. Any ligand whose results are missing from the batched run (e.g., if
+        DOCK6 crashed partway through) is run individually
+
+        Parameters
+        ----------
+        sims : Sequence[Simulation]
+            the simulations to run. Each must have a prepared ligand
+        """
+        sims = [sim for sim in sims if sim.metadata.prepared_ligand is not None]
+        if len(sims) <= 1 or sims[0].metadata.prepared_receptor is None:
+            [DOCKRunner.run(sim) for sim in sims]
+            return
+
+        sim0 = sims[0]
+        sph_file, grid_prefix = sim0.metadata.prepared_receptor
+        names = [DOCKRunner.output_name(sim) for sim in sims]
+        batch_name = f"{names[0]}_batch"
+
+        p_batch = Path(sim0.in_path) / f"{batch_name}.mol2"
+        with open(p_batch, "w") as fid:
+            for sim in sims:
+                mol2 = Path(sim.metadata.prepared_ligand).read_text()
+                fid.write(DOCKRunner.rename_mol2(mol2, sim.name))
+
+        infile, outfile_prefix = DOCKRunner.prepare_input_file(
+            p_batch,
+            sph_file,
+            grid_prefix,
+            batch_name,
+            sim0.in_path,
+            sim0.out_path,
+            sim0.metadata.dock_params,
+        )
+        logfile = Path(outfile_prefix).parent / f"{batch_name}.log"
+        scored_mol2 = Path(f"{outfile_prefix}_scored.mol2")
+        argv = [str(DOCK), "-i", str(infile), "-o", str(logfile)]
+
+        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
+        logs = DOCKRunner.split_batch_logfile(logfile) or {}
+        poses = DOCKRunner.split_batch_outfile(scored_mol2) or {}
+        for f in (p_batch, infile, logfile, scored_mol2):
+            Path(f).unlink(missing_ok=True)
+
+        failed = [sim for sim in sims if sim.name not in logs]
+        if len(failed) > 0:
+            message = f'Message: {ret.stderr.decode("utf-8")}' if ret.returncode != 0 else ""
+            warnings.warn(
+                f"Batched run of {len(sims)} ligands failed for {len(failed)} ligands! "
+                f"Running these ligands individually ... {message}",
+                SimulationFailureWarning,
+            )
+            [DOCKRunner.run(sim) for sim in failed]
+
+        node_id = re.sub("[:,.]", "", ray.util.get_node_ip_address())
+        for sim, name in zip(sims, names):
+            if sim.name not in logs:
+                continue
+
+            out_path = Path(sim.out_path)
+            logfile = out_path / f"{name}.log"
+            logfile.write_text(logs[sim.name])
+            if sim.name in poses:
+                (out_path / f"{name}_scored.mol2").write_text(poses[sim.name])
+
+            scores = DOCKRunner.parse_logfile(logfile)
+            score = None if scores is None else reduce_scores(scores, sim.reduction, k=sim.k)
+            sim.result = Result(sim.smi, name, node_id, score)
+
+    @staticmethod
+    def rename_mol2(mol2: str, name: str) -> str:
+        """set the name of the (first) molecule in the contents of a MOL2 file"""
+        return re.sub(
+            r"(@<TRIPOS>MOLECULE[^\n]*\n)[^\n]*", lambda m: f"{m.group(1)}{name}", mol2, count=1
+        )
+
+    @staticmethod
+    def split_batch_logfile(logfile: Union[str, Path]) -> Optional[Dict[str, str]]:
+        """split a DOCK6 log file of a multi-molecule run into the log of each molecule
+
+        Returns
+        -------
+        Optional[Dict[str, str]]
+            a mapping from the name of each molecule to its section of the log file. None if the
+            log file was unparseable
+        """
+        try:
+            text = Path(logfile).read_text()
+        except OSError:
+            return None
+
+        logs = {}
+        for block in re.split(r"(?m)^(?=\s*Molecule:)", text)[1:]:
+            match = MOLECULE_LINE.match(block)
+            if match is not None:
+                logs[match.group(1)] = block
+
+        return logs
+
+    @staticmethod
+    def split_batch_outfile(outfile: Union[str, Path]) -> Optional[Dict[str, str]]:
+        """split a scored MOL2 file of a multi-molecule run into the scored poses of each molecule
+
+        Returns
+        -------
+        Optional[Dict[str, str]]
+            a mapping from the name of each molecule to its scored poses. None if the file was
+            unparseable
+        """
+        try:
+            text = Path(outfile).read_text()
+        except OSError:
+            return None
+
+        poses = {}
+        for record in re.split(r"(?m)^(?=#+\s+Name:)", text)[1:]:
+            match = NAME_LINE.match(record)
+            if match is not None:
+                poses[match.group(1)] = poses.get(match.group(1), "") + record
+
+        return poses
+
     @staticmethod
     def validate_metadata(metadata: DOCKMetadata):
         return
@@ -0,0 +1,152 @@
+"""This module contains the NodeExecutor actor, which runs many concurrent docking program
+processes on a single node, and the ExecutorPool, which dispatches simulations to the NodeExecutor
+of each node in the ray cluster"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+import subprocess as sp
+import time
+from typing import List, Optional, Type
+import warnings
+
+import ray
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
+
+from pyscreener.warnings import SimulationFailureWarning
+from pyscreener.docking.result import Result
+from pyscreener.docking.runner import DockingRunner
+from pyscreener.docking.sim import Simulation
+
+PREP_WORKERS = 2
+
+
+class Executor:
+    """An Executor runs many concurrent docking program processes as asyncio subprocesses
+
+    Rather than blocking an entire python worker process on each running docking program, a
+    single executor on each node launches the docking program processes of many simulations
+    concurrently, limited only by the number of CPU slots of the node. Ligand preparation and
+    any simulation that can't be run as a single docking program process are run on a small
+    thread pool. RDKit releases the GIL during conformer embedding and optimization, so a few
+    threads are sufficient to keep the docking program processes fed.
+
+    Parameters
+    ----------
+    runner : Type[DockingRunner]
+        the runner with which to prepare and run each simulation
+    num_slots : int
+        the maximum number of docking program processes to run concurrently
+    num_prep_workers : int, default=PREP_WORKERS
+        the number of threads with which to prepare ligands
+    """
+
+    def __init__(
+        self, runner: Type[DockingRunner], num_slots: int, num_prep_workers: int = PREP_WORKERS
+    ):
+        if num_slots < 1:
+            raise ValueError(f'arg "num_slots" must be positive! got: "{num_slots}"')
+
+        self.runner = runner
+        self.num_slots = num_slots
+        self.pool = ThreadPoolExecutor(num_prep_workers)
+        self.slots = None
+
+    async def prepare_and_run(self, sim: Simulation) -> Optional[Result]:
+        """prepare the ligand of the simulation then run it. Equivalent to
+        `DockingRunner.prepare_and_run()`"""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.num_slots)
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        if not await loop.run_in_executor(self.pool, self.runner.prepare_ligand, sim):
+            return None
+
+        argv = self.runner.build_command(sim)
+        async with self.slots:
+            if argv is None:
+                await loop.run_in_executor(self.pool, self.runner.run, sim)
+            else:
+                await self.run(argv)
+                self.runner.parse_results(sim)
+
+        if sim.result is not None:
+            sim.result.time = time.perf_counter() - start
+
+        return sim.result
+
+    async def run(self, argv: List[str]) -> int:
+        """run the docking program process and return its exit code"""
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=sp.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            warnings.warn(f'Message: {stderr.decode("utf-8")}', SimulationFailureWarning)
+
+        return proc.returncode
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+
+NodeExecutor = ray.remote(num_cpus=0)(Executor)
+
+
+class ExecutorPool:
+    """An ExecutorPool dispatches simulations to a `NodeExecutor` on each node of the ray cluster
+
+    Each executor is pinned to its node and given a number of CPU slots equal to the number of
+    CPUs on its node divided by the number of CPUs used by each simulation. Simulations are
+    dispatched to the executors in round-robin order weighted by their number of slots.
+
+    NOTE: the executors reserve no CPUs from ray. They manage the CPUs of their respective nodes
+    themselves, so other ray tasks should not be run while the pool is in use
+
+    Parameters
+    ----------
+    runner : Type[DockingRunner]
+        the runner with which to prepare and run each simulation
+    ncpu : int, default=1
+        the number of CPUs used by each simulation
+    num_prep_workers : int, default=PREP_WORKERS
+        the number of threads with which each executor prepares ligands
+    """
+
+    def __init__(
+        self, runner: Type[DockingRunner], ncpu: int = 1, num_prep_workers: int = PREP_WORKERS
+    ):
+        self.executors = []
+        self.num_slots = 0
+
+        for node in ray.nodes():
+            num_cpus = node["Resources"].get("CPU", 0)
+            if not node["Alive"] or num_cpus == 0:
+                continue
+
+            num_slots = max(1, int(num_cpus // ncpu))
+            executor = NodeExecutor.options(
+                scheduling_strategy=NodeAffinitySchedulingStrategy(node["NodeID"], soft=False)
+            ).remote(runner, num_slots, num_prep_workers)
+
+            self.executors.extend([executor] * num_slots)
+            self.num_slots += num_slots
+
+        if len(self.executors) == 0:
+            raise RuntimeError("No alive nodes with CPUs in the ray cluster!")
+
+        self.__executors = cycle(self.executors)
+
+    def __len__(self) -> int:
+        """the total number of CPU slots of the executors"""
+        return self.num_slots
+
+    def remote(self, sim: Simulation) -> ray.ObjectRef:
+        """asynchronously prepare and run the simulation on the next executor"""
+        return next(self.__executors).prepare_and_run.remote(sim)
+
+    def shutdown(self):
+        """kill the executors of the pool. Any of their unfinished simulations will fail"""
+        for executor in dict.fromkeys(self.executors):
+            ray.kill(executor)
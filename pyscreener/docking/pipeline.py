@@ -0,0 +1,90 @@
+"""This module contains the Pipeline class, which runs ligand preparation and docking as two
+separate stages of ray tasks with their own resource requests"""
+from pathlib import Path
+import time
+from typing import Optional, Tuple, Type
+
+import ray
+
+from pyscreener.docking.result import Result
+from pyscreener.docking.runner import DockingRunner
+from pyscreener.docking.sim import Simulation
+
+PrepOutput = Tuple[Optional[Simulation], Optional[bytes], float]
+
+
+def prepare(runner: Type[DockingRunner], sim: Simulation) -> PrepOutput:
+    """prepare the ligand of the simulation
+
+    Returns
+    -------
+    Optional[Simulation]
+        the simulation with its prepared ligand. None if preparation failed
+    Optional[bytes]
+        the contents of the prepared ligand file, so that the simulation may be docked on any node.
+        None if preparation failed
+    float
+        the time spent preparing the ligand
+    """
+    start = time.perf_counter()
+    if not runner.prepare_ligand(sim):
+        return None, None, time.perf_counter() - start
+
+    contents = Path(sim.metadata.prepared_ligand).read_bytes()
+
+    return sim, contents, time.perf_counter() - start
+
+
+def dock(runner: Type[DockingRunner], prep_output: PrepOutput) -> Optional[Result]:
+    """dock the prepared ligand of a simulation, writing the prepared ligand file to the local disk
+    of the current node if it isn't already present"""
+    sim, contents, prep_time = prep_output
+    if sim is None:
+        return None
+
+    start = time.perf_counter()
+    p_ligand = Path(sim.metadata.prepared_ligand)
+    if not p_ligand.exists():
+        p_ligand.write_bytes(contents)
+
+    _ = runner.run(sim)
+    if sim.result is not None:
+        sim.result.time = prep_time + time.perf_counter() - start
+
+    return sim.result
+
+
+class Pipeline:
+    """A Pipeline prepares and runs simulations as two separate stages of ray tasks
+
+    Ligand preparation (single-threaded python/RDKit code) and docking (a multithreaded docking
+    program) have very different resource needs. Running both in the same task leaves the CPUs
+    reserved for docking idle during preparation. A Pipeline instead submits a preparation task
+    that reserves `prep_ncpu` CPUs and a docking task that reserves `ncpu` CPUs and depends on the
+    output of the former. Ray only schedules (and reserves the CPUs of) each docking task once its
+    ligand has been prepared, so preparation runs just ahead of docking and the docking CPUs stay
+    busy.
+
+    The number of ligands prepared ahead of docking is bounded by the number of simulations in
+    flight, e.g., the `window` of `DockingVirtualScreen.stream()`. The prepared ligand file is
+    passed between stages in memory, so a ligand may be docked on a different node than the one
+    on which it was prepared.
+
+    Parameters
+    ----------
+    runner : Type[DockingRunner]
+        the runner with which to prepare and run each simulation
+    ncpu : int, default=1
+        the number of CPUs to reserve for each docking task
+    prep_ncpu : float, default=1
+        the number of CPUs to reserve for each preparation task
+    """
+
+    def __init__(self, runner: Type[DockingRunner], ncpu: int = 1, prep_ncpu: float = 1):
+        self.runner = runner
+        self.prepare = ray.remote(num_cpus=prep_ncpu)(prepare)
+        self.dock = ray.remote(num_cpus=ncpu)(dock)
+
+    def remote(self, sim: Simulation) -> ray.ObjectRef:
+        """asynchronously prepare then run the simulation"""
+        return self.dock.remote(self.runner, self.prepare.remote(self.runner, sim))
@@ -0,0 +1,109 @@
+"""This module contains functions for reading SMILES strings from and writing per-ligand result
+records to text streams (e.g., stdin and stdout), so that pyscreener may be used as a filter in a
+Unix pipeline"""
+import json
+from typing import Iterator, Optional, Sequence, TextIO
+
+import numpy as np
+
+from pyscreener.docking.result import Result
+from pyscreener.docking.sim import Simulation
+from pyscreener.utils import Reduction, reduce_scores
+
+FORMATS = ("jsonl", "tsv")
+TSV_HEADER = ("smiles", "name", "score", "status")
+
+
+def iter_smiles(fid: TextIO) -> Iterator[str]:
+    """lazily read the SMILES strings from a text stream, one per line. Any text after the first
+    whitespace-delimited token of a line (e.g., the name column of a SMI file), blank lines, and
+    lines starting with "#" are ignored. Lines are read only as they are consumed, so the stream
+    may be an unbounded pipe"""
+    for line in fid:
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0].startswith("#"):
+            continue
+
+        yield tokens[0]
+
+
+class RecordWriter:
+    """A RecordWriter writes a single record containing the overall result of each ligand to a
+    text stream as soon as the ligand completes
+
+    Each record contains the input SMILES string, the name, and the overall score of the ligand,
+    and its status, one of "success", "failed" (no score could be parsed), "invalid" (the ligand
+    could not be prepared), or "misfit" (the ligand cannot fit inside the docking box). JSONL
+    records additionally contain the score of the ligand against each receptor. Each record is
+    flushed immediately, so a slow consumer of the stream applies backpressure to the screen
+
+    Parameters
+    ----------
+    fid : TextIO
+        the stream to which records are written
+    output_format : str, default="jsonl"
+        the format of each record, either "jsonl" (a JSON object per line) or "tsv"
+        (tab-separated values, preceded by a header line)
+    reduction : Reduction, default=Reduction.BEST
+        the reduction to apply to the scores of a ligand against multiple receptors
+    k : int, default=1
+        the number of top scores to average if using a top-k reduction
+
+    Raises
+    ------
+    ValueError
+        if the output format is not supported
+    """
+
+    def __init__(
+        self,
+        fid: TextIO,
+        output_format: str = "jsonl",
+        reduction: Reduction = Reduction.BEST,
+        k: int = 1,
+    ):
+        if output_format not in FORMATS:
+            raise ValueError(f'Unsupported output format: "{output_format}"')
+
+        self.fid = fid
+        self.output_format = output_format
+        self.reduction = reduction
+        self.k = k
+        self.num_records = 0
+
+        if self.output_format == "tsv":
+            self.write_line("\t".join(TSV_HEADER))
+
+    def __len__(self) -> int:
+        """the number of records that have been written"""
+        return self.num_records
+
+    def write(self, sims: Sequence[Simulation], results: Sequence[Optional[Result]]):
+        """write the record of a single ligand given its simulations and results against each
+        receptor"""
+        scores = [r.score if r is not None else None for r in results]
+        S = np.array([scores], dtype=float)
+        score = float(reduce_scores(S, self.reduction, -1, self.k)[0])
+        score = score if not np.isnan(score) else None
+
+        if all(r is None for r in results):
+            status = "invalid"
+        elif any(r is not None and r.status is not None for r in results):
+            status = next(r.status for r in results if r is not None and r.status is not None)
+        else:
+            status = "success" if score is not None else "failed"
+
+        smi, name = sims[0].smi or sims[0].input_file, sims[0].name
+        if self.output_format == "jsonl":
+            record = {"smiles": smi, "name": name, "score": score, "scores": scores}
+            record["status"] = status
+            line = json.dumps(record)
+        else:
+            line = "\t".join([smi, name, f"{score}" if score is not None else "", status])
+
+        self.write_line(line)
+        self.num_records += 1
+
+    def write_line(self, line: str):
+        self.fid.write(f"{line}\n")
+        self.fid.flush()
@@ -8,3 +8,5 @@ class Result:
     name: str
     node_id: str
     score: Optional[float]
+    time: Optional[float] = None
+    status: Optional[str] = None
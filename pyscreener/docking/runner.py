@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Sequence
+from typing import List, Optional, Sequence
 
 from pyscreener.docking.result import Result
 from pyscreener.docking.sim import Simulation
@@ -33,6 +33,34 @@ class DockingRunner(ABC):
         """Prepare the ligand file then run the given simulation. Roughly equivlaent to `prepare_ligand()` followed by `run()` but returns the Result object for the Simulation
         rather than the scores of the conformers"""
 
+    @classmethod
+    def supports_batching(cls, metadata: SimulationMetadata) -> bool:
+        """Can this docking program dock multiple ligands in a single invocation with the given
+        metadata?"""
+        return False
+
+    @staticmethod
+    def prepare_and_run_batch(sims: Sequence[Simulation]) -> List[Optional[Result]]:
+        """Prepare the ligand files then run the given simulations, which must all be against the
+        same receptor, in as few invocations of the docking program as possible. Only called if
+        `supports_batching()` is True"""
+        raise NotImplementedError
+
+    @staticmethod
+    def build_command(data: Simulation) -> Optional[List[str]]:
+        """Build the argument vector of the docking program process that runs the given simulation,
+        writing any necessary input files. None if the simulation can't be run as a single
+        docking program process (or its inputs have not been prepared), in which case `run()`
+        should be used"""
+        return None
+
+    @staticmethod
+    def parse_results(data: Simulation) -> Optional[Sequence[float]]:
+        """Parse the output files of a completed docking program process built via
+        `build_command()`, set the `result` of the simulation, and return the score(s) of the
+        docked conformers"""
+        raise NotImplementedError
+
     @staticmethod
     def validate_metadata(metadata: SimulationMetadata):
         """Validate the metadata of the simulation. E.g., ensure that the specified software is
@@ -1,23 +1,60 @@
+import asyncio
+from concurrent.futures import Future
 from copy import copy
 from dataclasses import replace
 from datetime import datetime
-from itertools import chain
+import heapq
+from itertools import chain, islice
 from pathlib import Path
 import re
 import shutil
 import tarfile
 import tempfile
-from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 import ray
 from tqdm import tqdm
 
-from pyscreener.utils import Reduction, autobox, pdbfix, reduce_scores, run_on_all_nodes
+from pyscreener.utils import (
+    Reduction,
+    affinity,
+    autobox,
+    boxfit,
+    chunks,
+    pdbfix,
+    reduce_scores,
+    run_on_all_nodes,
+)
 from pyscreener.docking.sim import Simulation
 from pyscreener.docking.metadata import SimulationMetadata
 from pyscreener.docking.result import Result
 from pyscreener.docking.runner import DockingRunner
+from pyscreener.docking.executor import ExecutorPool
+from pyscreener.docking.pipeline import Pipeline
+from pyscreener.docking import calibrate, cost
+
+if TYPE_CHECKING:
+    from pyscreener.docking.writer import ResultWriter
+
+MISFIT = "misfit"
+SCHEDULES = ("fifo", "cost")
+ETA_INTERVAL = 1.0
 
 
 class DockingVirtualScreen:
@@ -31,14 +68,34 @@ class DockingVirtualScreen:
         pdbids: Optional[Sequence[str]] = None,
         docked_ligand_file: Optional[str] = None,
         buffer: float = 10.0,
-        ncpu: int = 1,
+        ncpu: Union[int, str] = 1,
         base_name: str = "ligand",
         path: Union[str, Path] = ".",
         reduction: Union[Reduction, str] = Reduction.BEST,
         receptor_reduction: Union[Reduction, str] = Reduction.BEST,
         k: int = 1,
         verbose: int = 0,
+        box_fit: Optional[str] = None,
+        box_tolerance: float = 0.0,
+        conformer_store: Optional[Union[str, Path]] = None,
+        batch_size: int = 1,
+        executor: bool = False,
+        pipeline: bool = False,
+        calibration_size: int = calibrate.CALIBRATION_SIZE,
+        pin_cpus: bool = False,
+        schedule: str = "fifo",
     ):
+        if isinstance(ncpu, str) and ncpu != "auto":
+            raise ValueError(f'arg "ncpu" must be an integer or "auto"! got: "{ncpu}"')
+        if box_fit not in (None, "skip", "flag"):
+            raise ValueError(f'Invalid box fit mode! got: "{box_fit}"')
+        if executor and pipeline:
+            raise ValueError('args "executor" and "pipeline" are mutually exclusive!')
+        if batch_size < 1:
+            raise ValueError(f'Batch size must be positive! got: "{batch_size}"')
+        if schedule not in SCHEDULES:
+            raise ValueError(f'Invalid schedule! got: "{schedule}"')
+
         self.runner = runner
         self.runner.validate_metadata(metadata_template)
 
@@ -58,6 +115,19 @@ class DockingVirtualScreen:
         )
 
         self.k = k
+        self.box_fit = box_fit
+        self.box_tolerance = box_tolerance
+        self.batch_size = batch_size if self.runner.supports_batching(metadata_template) else 1
+        if executor or pipeline:
+            self.batch_size = 1
+        self.executor = executor
+        self.pipeline = pipeline
+        self.pin_cpus = pin_cpus
+        self.schedule = schedule
+        self.cost_model = cost.CostModel()
+        self.auto_ncpu = ncpu == "auto" and self.runner.is_multithreaded()
+        self.calibration_size = calibration_size
+        self.throughputs = None
 
         self.receptors = receptors or []
         if pdbids is not None:
@@ -80,8 +150,7 @@ class DockingVirtualScreen:
 
         self.tmp_dir = tempfile.gettempdir()
 
-        ncpu = ncpu if self.runner.is_multithreaded() else 1
-        self.prepare_and_run = ray.remote(num_cpus=ncpu)(self.runner.prepare_and_run)
+        ncpu = ncpu if self.runner.is_multithreaded() and ncpu != "auto" else 1
 
         self.simulation_templates = [
             Simulation(
@@ -97,6 +166,7 @@ class DockingVirtualScreen:
                 self.tmp_out,
                 self.score_mode,
                 k,
+                conformer_store=str(conformer_store) if conformer_store is not None else None,
             )
             for receptor in self.receptors
         ]
@@ -108,6 +178,7 @@ class DockingVirtualScreen:
                 ray.init()
 
         self.simulation_templates = self.prepare_receptors()
+        self.set_ncpu(ncpu)
 
         self.planned_simulationss = []
         self.run_simulationss = []
@@ -115,6 +186,22 @@ class DockingVirtualScreen:
 
         self.num_ligands = 0
         self.num_simulations = 0
+        self.num_misfits = 0
+        self.num_skipped = 0
+        self.num_named = 0
+        self.total_time = 0.0
+        self.num_timed = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("lock", None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
 
     def __len__(self):
         """the number of ligands that have been simulated. NOT the total number of simulations"""
@@ -125,6 +212,7 @@ class DockingVirtualScreen:
         *sources: Iterable[Union[str, Iterable[str]]],
         smiles: bool = True,
         reduction: Optional[Reduction] = None,
+        writer: Optional["ResultWriter"] = None,
     ) -> np.ndarray:
         """dock all of the ligands and return an array of their scores
 
@@ -159,6 +247,8 @@ class DockingVirtualScreen:
         reduction : Optional[Reduction], default=None
             the reduction to apply to multiple receptor scores for the same ligand. If None, use
             self.receptor_reduction
+        writer : Optional[ResultWriter], default=None
+            a writer to which the results of each ligand will be written as they complete
 
         Returns
         -------
@@ -171,7 +261,7 @@ class DockingVirtualScreen:
         sources = list(chain(*([s] if isinstance(s, str) else s for s in sources)))
 
         simss = self.setup(sources, smiles)
-        resultss = self.run(simss)
+        resultss = self.run(simss, writer)
 
         return self.reduce(resultss, reduction)
 
@@ -214,6 +304,86 @@ class DockingVirtualScreen:
         """Prepare the receptor file(s) for each of the simulation templates"""
         return [self.runner.prepare_receptor(template) for template in self.simulation_templates]
 
+    @property
+    def ncpu(self) -> int:
+        """the number of CPUs used by each simulation"""
+        return self.__ncpu
+
+    def set_ncpu(self, ncpu: int):
+        """set the number of CPUs used by each simulation. Multithreaded runners only. The
+        executors of any previous executor pool are killed"""
+        ncpu = ncpu if self.runner.is_multithreaded() else 1
+        if isinstance(getattr(self, "prepare_and_run", None), ExecutorPool):
+            self.prepare_and_run.shutdown()
+
+        self.__ncpu = ncpu
+        self.simulation_templates = [
+            replace(template, ncpu=ncpu) for template in self.simulation_templates
+        ]
+
+        if self.pin_cpus:
+            self.prepare_and_run = affinity.PinnedRemote(self.runner.prepare_and_run, ncpu)
+            self.prepare_and_run_batch = affinity.PinnedRemote(
+                self.runner.prepare_and_run_batch, ncpu
+            )
+        else:
+            self.prepare_and_run = ray.remote(num_cpus=ncpu)(self.runner.prepare_and_run)
+            self.prepare_and_run_batch = ray.remote(num_cpus=ncpu)(
+                self.runner.prepare_and_run_batch
+            )
+
+        if self.pipeline:
+            self.prepare_and_run = Pipeline(self.runner, ncpu)
+        elif self.executor:
+            self.prepare_and_run = ExecutorPool(self.runner, ncpu)
+
+    def calibrate(
+        self, sources: Sequence[str], smiles: bool = True, ncpus: Optional[Iterable[int]] = None
+    ) -> int:
+        """calibrate the number of CPUs used by each simulation by docking a sample of ligands at
+        several numbers of CPUs on a node of each type in the ray cluster and choosing the number
+        with the highest total throughput. See `calibrate.calibrate()` for more details
+
+        Parameters
+        ----------
+        sources : Sequence[str]
+            the SMILES strings or filepaths of a sample of the ligands to be screened
+        smiles : bool, default=True
+            whether the inputs are SMILES strings
+        ncpus : Optional[Iterable[int]], default=None
+            the numbers of CPUs per simulation to measure. If None, use each power of two up to
+            the number of CPUs of each node type
+
+        Returns
+        -------
+        int
+            the chosen number of CPUs per simulation
+        """
+        sims = [
+            self.setup_ligand(source, f"calibration_{i}", smiles)[0]
+            for i, source in enumerate(sources)
+        ]
+        if not self.runner.is_multithreaded() or len(sims) == 0:
+            return self.ncpu
+
+        self.throughputs = calibrate.calibrate(self.runner, sims, ncpus)
+        num_nodes = {num_cpus: len(ids) for num_cpus, ids in calibrate.node_types().items()}
+        ncpu = calibrate.best_ncpu(self.throughputs, num_nodes)
+
+        best_ncpus = calibrate.best_ncpus(self.throughputs)
+        print(f"Calibrated CPUs per simulation using {len(sims)} ligands:")
+        for num_cpus, throughputs in sorted(self.throughputs.items()):
+            print(f"  {num_nodes[num_cpus]} node(s) with {num_cpus} CPUs:")
+            for ncpu_, throughput in throughputs.items():
+                best = " (best)" if ncpu_ == best_ncpus[num_cpus] else ""
+                print(f"    ncpu={ncpu_}: {throughput:0.1f} ligands/hour{best}")
+        print(f"Using ncpu={ncpu}", flush=True)
+
+        self.set_ncpu(ncpu)
+        self.auto_ncpu = False
+
+        return ncpu
+
     def results(self) -> List[Result]:
         """A flattened list of results from all of the completed simulations"""
         return list(chain(*self.resultss))
@@ -237,38 +407,612 @@ class DockingVirtualScreen:
         List[List[Simulation]]
             the Simulation objects corresponding to the input ligands
         """
+        sources = list(sources)
+
+        return [
+            self.setup_ligand(source, name, smiles)
+            for source, name in zip(sources, self.name_ligands(len(sources)))
+        ]
+
+    def name_ligands(self, n: int) -> List[str]:
+        """reserve the names of the next `n` ligands. Names are shared between all of the methods
+        that set up ligands, so they are unique over the lifetime of the screen"""
+        with self.lock:
+            i = self.num_named
+            self.num_named += n
+
+        return [f"{self.base_name}_{j}" for j in range(i, i + n)]
+
+    def setup_ligand(self, source: str, name: str, smiles: bool = True) -> List[Simulation]:
+        """Set up the simulations of a single ligand against each receptor"""
         if smiles:
-            simss = [
-                [
-                    replace(template, smi=smi, name=f"{self.base_name}_{i+len(self)}")
-                    for template in self.simulation_templates
-                ]
-                for i, smi in enumerate(sources)
+            return [
+                replace(template, smi=source, name=name) for template in self.simulation_templates
             ]
-        else:
-            simss = [
+
+        return [
+            replace(template, input_file=source, name=name)
+            for template in self.simulation_templates
+        ]
+
+    def run(
+        self, simulationss: List[List[Simulation]], writer: Optional["ResultWriter"] = None
+    ) -> List[List[Result]]:
+        if self.auto_ncpu and len(simulationss) > 0:
+            self.calibrate(
                 [
-                    replace(template, input_file=filepath, name=f"{self.base_name}_{i+len(self)}")
-                    for template in self.simulation_templates
-                ]
-                for i, filepath in enumerate(sources)
+                    sims[0].smi or sims[0].input_file
+                    for sims in simulationss[: self.calibration_size]
+                ],
+                simulationss[0][0].smi is not None,
+            )
+            for sims in simulationss:
+                for sim in sims:
+                    sim.ncpu = self.ncpu
+
+        fitss = self.check_fits(simulationss)
+        xs = [cost.featurize(sims[0].smi) if len(sims) > 0 else None for sims in simulationss]
+        groups = [
+            sims if fits or self.box_fit == "flag" else None
+            for sims, fits in zip(simulationss, fitss)
+        ]
+        order = self.order(xs)
+        refss = [None] * len(groups)
+        for i, refs in zip(order, self.submit_all([groups[i] for i in order])):
+            refss[i] = refs
+
+        resultss = []
+        last_eta = float("-inf")
+        with tqdm(total=len(refss), desc="Docking", unit="ligand", smoothing=0.0) as bar:
+            for i, (sims, refs, fits) in enumerate(zip(simulationss, refss, fitss)):
+                results = self.gather(refs) if refs is not None else self.skip(sims)
+                self.observe(xs[i], results)
+                if not fits:
+                    self.flag(results)
+                if writer is not None:
+                    writer.write(sims, results)
+                resultss.append(results)
+
+                bar.update()
+                if time.monotonic() - last_eta > ETA_INTERVAL:
+                    last_eta = time.monotonic()
+                    xs_ = [x for x, refs in zip(xs[i + 1 :], refss[i + 1 :]) if refs is not None]
+                    bar.set_postfix_str(f"eta={tqdm.format_interval(self.eta(xs_))}")
+
+        for sims, results in zip(simulationss, resultss):
+            self.record(sims, results)
+
+        return resultss
+
+    def submit_all(
+        self, simulationss: Sequence[Optional[Sequence[Simulation]]]
+    ) -> List[Optional[List[Tuple[ray.ObjectRef, Optional[int]]]]]:
+        """submit the simulations of each ligand, in batches of `batch_size` ligands against the
+        same receptor if batching is enabled. Groups of simulations that are None are not submitted
+
+        Returns
+        -------
+        List[Optional[List[Tuple[ray.ObjectRef, Optional[int]]]]]
+            for each group of simulations, the reference to the task running each simulation and
+            the index of the simulation in the task's batch (or None if it was not batched). None
+            for each group that was not submitted
+        """
+        if self.batch_size == 1:
+            return [
+                [(self.prepare_and_run.remote(sim), None) for sim in sims]
+                if sims is not None
+                else None
+                for sims in simulationss
             ]
 
-        return simss
+        refss = [[None] * len(sims) if sims is not None else None for sims in simulationss]
+        idxs = [i for i, sims in enumerate(simulationss) if sims is not None]
+        for j in range(len(self.simulation_templates)):
+            for batch in chunks(idxs, self.batch_size):
+                ref = self.prepare_and_run_batch.remote([simulationss[i][j] for i in batch])
+                for k, i in enumerate(batch):
+                    refss[i][j] = (ref, k)
 
-    def run(self, simulationss: List[List[Simulation]]) -> List[List[Result]]:
-        refss = [[self.prepare_and_run.remote(s) for s in sims] for sims in simulationss]
+        return refss
 
-        resultss = [
-            ray.get(refs) for refs in tqdm(refss, desc="Docking", unit="ligand", smoothing=0.0)
+    @staticmethod
+    def gather(refs: Sequence[Tuple[ray.ObjectRef, Optional[int]]]) -> List[Optional[Result]]:
+        """get the results of the simulations submitted via `submit_all()`"""
+        return [ray.get(ref) if k is None else ray.get(ref)[k] for ref, k in refs]
+
+    def submit(self, source: str, smiles: bool = True) -> Future:
+        """submit the simulations of a single ligand without waiting for them to complete. See
+        `submit_many()` for more details"""
+        return self.submit_many([source], smiles)[0]
+
+    def submit_many(self, sources: Sequence[str], smiles: bool = True) -> List[Future]:
+        """submit the simulations of each ligand without waiting for them to complete
+
+        The returned futures are `concurrent.futures.Future`s, so they may be waited on from any
+        thread or, via `asyncio.wrap_future()`, awaited in an event loop. The results of each ligand
+        are recorded by this screen (see `results()`) upon completion, just like those of `run()`
+
+        Parameters
+        ----------
+        sources : Sequence[str]
+            the SMILES strings or filepaths of the ligands
+        smiles : bool, default=True
+            whether the inputs are SMILES strings
+
+        Returns
+        -------
+        List[Future]
+            a future for the results of each ligand against each receptor, i.e., a
+            `List[Optional[Result]]`
+        """
+        return [future for _, future in self.submit_ligands(sources, smiles)]
+
+    def submit_ligands(
+        self, sources: Sequence[str], smiles: bool = True
+    ) -> List[Tuple[List[Simulation], Future]]:
+        """set up and submit the simulations of each ligand, returning the simulations of each
+        ligand along with the future for their results"""
+        simss = [
+            self.setup_ligand(source, name, smiles)
+            for source, name in zip(sources, self.name_ligands(len(sources)))
         ]
 
-        self.run_simulationss.extend(simulationss)
-        self.resultss.extend(resultss)
-        self.num_ligands += len(resultss)
-        self.num_simulations += len(list(chain(*resultss)))
+        fitss = self.check_fits(simss)
+        refss = self.submit_all(
+            [sims if fits or self.box_fit == "flag" else None for sims, fits in zip(simss, fitss)]
+        )
 
-        return resultss
+        return [
+            (sims, self.future(sims, refs, fits)) for sims, refs, fits in zip(simss, refss, fitss)
+        ]
+
+    def future(
+        self,
+        sims: List[Simulation],
+        refs: Optional[Sequence[Tuple[ray.ObjectRef, Optional[int]]]],
+        fits: bool = True,
+    ) -> Future:
+        """wrap the references to the tasks running the simulations of a single ligand in a
+        future that completes once all of them have. The results are recorded upon completion"""
+        future = Future()
+        if refs is None:
+            results = self.skip(sims)
+            self.flag(results)
+            self.record(sims, results)
+            future.set_result(results)
+
+            return future
+
+        ref_futures = [ref.future() for ref, _ in refs]
+        remaining = [len(ref_futures)]
+        lock = threading.Lock()
+
+        def callback(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+
+            try:
+                results = [
+                    f.result() if k is None else f.result()[k]
+                    for f, (_, k) in zip(ref_futures, refs)
+                ]
+            except Exception as e:
+                future.set_exception(e)
+                return
+
+            if not fits:
+                self.flag(results)
+            self.record(sims, results)
+            future.set_result(results)
+
+        for f in ref_futures:
+            f.add_done_callback(callback)
+
+        return future
+
+    def record(self, sims: List[Simulation], results: List[Optional[Result]], keep: bool = True):
+        """record the completed simulations and results of a single ligand. If `keep` is False,
+        they are only counted and not retained. Safe to call from multiple threads"""
+        times = [r.time for r in results if r is not None and r.time is not None]
+
+        with self.lock:
+            if keep:
+                self.run_simulationss.append(sims)
+                self.resultss.append(results)
+            self.num_ligands += 1
+            self.num_simulations += len(results)
+            self.total_time += sum(times)
+            self.num_timed += len(times)
+
+    async def dock(
+        self,
+        *sources: Iterable[Union[str, Iterable[str]]],
+        smiles: bool = True,
+        reduction: Optional[Reduction] = None,
+    ) -> np.ndarray:
+        """the asynchronous equivalent of calling this screen: dock all of the ligands and return
+        an array of their scores without blocking the event loop. See `__call__()` for more
+        details"""
+        sources = list(chain(*([s] if isinstance(s, str) else s for s in sources)))
+
+        futures = self.submit_many(sources, smiles)
+        resultss = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+        return self.reduce(list(resultss), reduction)
+
+    async def as_completed(
+        self,
+        sources: Union[Iterable[str], AsyncIterable[str]],
+        smiles: bool = True,
+        window: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[List[Simulation], List[Optional[Result]]]]:
+        """Asynchronously dock the input sources, keeping at most `window` ligands in flight at
+        any given time, and yield the simulations and results of each ligand as soon as all of its
+        simulations have completed. This is the asynchronous equivalent of `stream()`, except that
+        the sources may also be an asynchronous iterable (e.g., the outputs of a generative model)
+
+        Parameters
+        ----------
+        sources : Union[Iterable[str], AsyncIterable[str]]
+            an iterable or asynchronous iterable of SMILES strings or filepaths
+        smiles : bool, default=True
+            whether the inputs are SMILES strings
+        window : Optional[int], default=None
+            the maximum number of ligands to have submitted at any one time. If None, use four
+            times the number of simulations that the ray cluster can run concurrently
+
+        Yields
+        ------
+        Tuple[List[Simulation], List[Optional[Result]]]
+            the simulations and corresponding results of a single ligand against each receptor
+        """
+        is_async = isinstance(sources, AsyncIterable)
+        sources = sources.__aiter__() if is_async else iter(sources)
+        window = window or self.default_window()
+
+        inflight: Dict[asyncio.Future, List[Simulation]] = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(inflight) < window:
+                try:
+                    source = await sources.__anext__() if is_async else next(sources)
+                except (StopIteration, StopAsyncIteration):
+                    exhausted = True
+                    break
+
+                [(sims, future)] = self.submit_ligands([source], smiles)
+                inflight[asyncio.wrap_future(future)] = sims
+
+            if len(inflight) == 0:
+                return
+
+            done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                sims = inflight.pop(future)
+                yield sims, future.result()
+
+    def stream(
+        self,
+        sources: Iterable[str],
+        smiles: bool = True,
+        window: Optional[int] = None,
+        total: Optional[int] = None,
+        keep: bool = True,
+    ) -> Iterator[Tuple[List[Simulation], List[Optional[Result]]]]:
+        """Lazily set up and run the simulations for the input sources, keeping at most `window`
+        ligands in flight at any given time
+
+        Unlike `run()`, the input sources are only consumed as simulations complete, so this may
+        be used to screen an arbitrarily large (e.g., lazy `LigandSupply`) stream of ligands in
+        constant memory. The simulations and results of each ligand are yielded as soon as all of
+        its simulations have completed, i.e., *not* necessarily in the order of the input. If the
+        number of CPUs per simulation is "auto", the first `calibration_size` ligands are used to
+        calibrate it before screening. If the schedule is "cost", ligands are submitted in order of
+        their predicted docking time, longest first, among the ligands in the window
+
+        Parameters
+        ----------
+        sources : Iterable[str]
+            an iterable of SMILES strings or filepaths
+        smiles : bool, default=True
+            whether the inputs are SMILES strings
+        window : Optional[int], default=None
+            the maximum number of ligands to have submitted at any one time. If None, use four
+            times the number of simulations that the ray cluster can run concurrently (times the
+            batch size, if batching is enabled)
+        total : Optional[int], default=None
+            the total number of input sources, if known, with which to estimate the time remaining
+            in the screen
+        keep : bool, default=True
+            whether to retain the simulations and results of each ligand in this screen (i.e., in
+            `run_simulationss` and `resultss`). If False, they are only counted, so that the
+            memory usage of the screen does not grow with the number of ligands
+
+        Yields
+        ------
+        Tuple[List[Simulation], List[Optional[Result]]]
+            the simulations and corresponding results of a single ligand against each receptor
+        """
+        if self.auto_ncpu:
+            sources = iter(sources)
+            sample = list(islice(sources, self.calibration_size))
+            self.calibrate(sample, smiles)
+            sources = chain(sample, sources)
+
+        sources = self.iter_fits(sources) if smiles else ((source, True) for source in sources)
+        window = window or self.default_window()
+
+        pending: Dict[ray.ObjectRef, List[Tuple[int, int]]] = {}
+        batches: List[List[Tuple[int, Simulation]]] = [[] for _ in self.simulation_templates]
+        misfits = set()
+        inflight: Dict[int, Tuple[List[Simulation], List[Optional[Result]]]] = {}
+        remaining: Dict[int, int] = {}
+        xs: Dict[int, Optional[np.ndarray]] = {}
+        queue: List[Tuple[float, int]] = []
+        i = len(self)
+        i_start = i
+        exhausted = False
+        last_eta = float("-inf")
+
+        with tqdm(total=total, desc="Docking", unit="ligand", smoothing=0.0) as bar:
+            while True:
+                while not exhausted and len(inflight) < window:
+                    try:
+                        source, fits = next(sources)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    name = self.name_ligands(1)[0]
+                    sims = self.setup_ligand(source, name, smiles)
+                    if not fits and self.box_fit == "skip":
+                        results = self.skip(sims)
+                        self.flag(results)
+                        self.record(sims, results, keep)
+                        bar.update()
+                        i += 1
+
+                        yield sims, results
+                        continue
+
+                    if not fits:
+                        misfits.add(i)
+                    inflight[i] = sims, [None] * len(sims)
+                    remaining[i] = len(sims)
+                    xs[i] = cost.featurize(source) if smiles else None
+                    self.schedule_ligand(i, sims, xs[i], queue, pending, batches)
+                    i += 1
+
+                self.submit_queued(queue, inflight, pending, batches, exhausted)
+                if len(pending) == 0:
+                    break
+
+                done, _ = ray.wait(list(pending), num_returns=1)
+                for ref in done:
+                    for i_ligand in self.collect(ref, pending, inflight, remaining):
+                        sims, results = self.complete_ligand(i_ligand, inflight, xs, misfits, keep)
+                        bar.update()
+                        if time.monotonic() - last_eta > ETA_INTERVAL:
+                            last_eta = time.monotonic()
+                            num_unseen = max(total - (i - i_start), 0) if total is not None else 0
+                            eta = self.eta(list(xs.values()), num_unseen)
+                            bar.set_postfix_str(f"eta={tqdm.format_interval(eta)}")
+
+                        yield sims, results
+
+    def schedule_ligand(
+        self,
+        i: int,
+        sims: Sequence[Simulation],
+        x: Optional[np.ndarray],
+        queue: List[Tuple[float, int]],
+        pending: Dict[ray.ObjectRef, List[Tuple[int, int]]],
+        batches: List[List[Tuple[int, Simulation]]],
+    ):
+        """submit the simulations of the `i`th ligand or, if the schedule is "cost", add the ligand
+        to the `queue` in order of its predicted docking time"""
+        if self.schedule == "cost":
+            heapq.heappush(queue, (-self.cost_model.predict([x])[0], i))
+        else:
+            self.submit_ligand(i, sims, pending, batches)
+
+    def submit_queued(
+        self,
+        queue: List[Tuple[float, int]],
+        inflight: Dict[int, Tuple[List[Simulation], List[Optional[Result]]]],
+        pending: Dict[ray.ObjectRef, List[Tuple[int, int]]],
+        batches: List[List[Tuple[int, Simulation]]],
+        exhausted: bool,
+    ):
+        """submit the queued ligands, longest first, while fewer than twice the number of
+        simulations the cluster can run concurrently are submitted. Partial batches are also
+        submitted if there are no more inputs or nothing else is running"""
+        max_submitted = 2 * self.concurrency() * self.batch_size
+        while len(queue) > 0 and len(inflight) - len(queue) < max_submitted:
+            _, i = heapq.heappop(queue)
+            self.submit_ligand(i, inflight[i][0], pending, batches)
+
+        if exhausted or len(pending) == 0:
+            for j, batch in enumerate(batches):
+                if len(batch) > 0:
+                    pending.update([self.submit_batch(batch, j)])
+                    batches[j] = []
+
+    def collect(
+        self,
+        ref: ray.ObjectRef,
+        pending: Dict[ray.ObjectRef, List[Tuple[int, int]]],
+        inflight: Dict[int, Tuple[List[Simulation], List[Optional[Result]]]],
+        remaining: Dict[int, int],
+    ) -> List[int]:
+        """collect the results of a completed task into the results of each of its ligands
+
+        Returns
+        -------
+        List[int]
+            the index of each ligand whose simulations have now all completed
+        """
+        idxs = pending.pop(ref)
+        results_ = ray.get(ref) if self.batch_size > 1 else [ray.get(ref)]
+        for (i, j), result in zip(idxs, results_):
+            inflight[i][1][j] = result
+            remaining[i] -= 1
+
+        completed = [i for i in dict.fromkeys(i for i, _ in idxs) if remaining[i] == 0]
+        for i in completed:
+            del remaining[i]
+
+        return completed
+
+    def complete_ligand(
+        self,
+        i: int,
+        inflight: Dict[int, Tuple[List[Simulation], List[Optional[Result]]]],
+        xs: Dict[int, Optional[np.ndarray]],
+        misfits: Set[int],
+        keep: bool = True,
+    ) -> Tuple[List[Simulation], List[Optional[Result]]]:
+        """remove the completed `i`th ligand from `inflight`, update the cost model with its
+        simulation times, flag it if it is a misfit, and record its results"""
+        sims, results = inflight.pop(i)
+        self.observe(xs.pop(i), results)
+        if i in misfits:
+            misfits.remove(i)
+            self.flag(results)
+
+        self.record(sims, results, keep)
+
+        return sims, results
+
+    def submit_ligand(
+        self,
+        i: int,
+        sims: Sequence[Simulation],
+        pending: Dict[ray.ObjectRef, List[Tuple[int, int]]],
+        batches: List[List[Tuple[int, Simulation]]],
+    ):
+        """submit the simulations of the `i`th ligand, adding the task running each to `pending`.
+        If batching is enabled, each simulation is instead added to the batch of its receptor, and
+        full batches are submitted"""
+        if self.batch_size == 1:
+            pending.update(
+                (self.prepare_and_run.remote(sim), [(i, j)]) for j, sim in enumerate(sims)
+            )
+            return
+
+        for j, sim in enumerate(sims):
+            batches[j].append((i, sim))
+            if len(batches[j]) >= self.batch_size:
+                pending.update([self.submit_batch(batches[j], j)])
+                batches[j] = []
+
+    def submit_batch(
+        self, batch: Sequence[Tuple[int, Simulation]], j: int
+    ) -> Tuple[ray.ObjectRef, List[Tuple[int, int]]]:
+        """submit a batch of simulations of ligands against the `j`th receptor
+
+        Returns
+        -------
+        ray.ObjectRef
+            the reference to the task running the batch
+        List[Tuple[int, int]]
+            the ligand and receptor index of each simulation in the batch
+        """
+        ref = self.prepare_and_run_batch.remote([sim for _, sim in batch])
+
+        return ref, [(i, j) for i, _ in batch]
+
+    def iter_fits(self, smis: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+        """lazily check whether each ligand can fit inside the docking box, if box fitting is
+        enabled. Otherwise, every ligand is considered to fit
+
+        Yields
+        ------
+        Tuple[str, bool]
+            each SMILES string and whether it fits inside the docking box
+        """
+        if self.box_fit is None:
+            return ((smi, True) for smi in smis)
+
+        ncpu = int(ray.cluster_resources().get("CPU", 1))
+
+        return boxfit.iter_fits(smis, self.size, self.box_tolerance, ncpu)
+
+    def check_fits(self, simulationss: Sequence[Sequence[Simulation]]) -> List[bool]:
+        """check whether the ligand of each group of simulations can fit inside the docking box.
+        Ligands supplied as input files are always considered to fit"""
+        if self.box_fit is None:
+            return [True] * len(simulationss)
+
+        idxs = [
+            i for i, sims in enumerate(simulationss) if len(sims) > 0 and sims[0].smi is not None
+        ]
+        fitss = [True] * len(simulationss)
+        fitss_smi = self.iter_fits(simulationss[i][0].smi for i in idxs)
+        for i, (_, fits) in zip(idxs, fitss_smi):
+            fitss[i] = fits
+
+        return fitss
+
+    def skip(self, sims: Sequence[Simulation]) -> List[Result]:
+        """the results of skipping the simulations of a ligand that cannot fit inside the box"""
+        for sim in sims:
+            sim.result = Result(sim.smi, sim.name, None, None)
+        with self.lock:
+            self.num_skipped += len(sims)
+
+        return [sim.result for sim in sims]
+
+    def flag(self, results: Sequence[Optional[Result]]):
+        """flag the results of a ligand that cannot fit inside the docking box"""
+        for result in results:
+            if result is not None:
+                result.status = MISFIT
+        with self.lock:
+            self.num_misfits += 1
+
+    def time_saved(self) -> float:
+        """the estimated total simulation time (in seconds) saved by skipping the simulations of
+        ligands that cannot fit inside the docking box, based on the average time of each
+        completed simulation"""
+        if self.num_timed == 0:
+            return 0.0
+
+        return self.num_skipped * self.total_time / self.num_timed
+
+    def concurrency(self) -> int:
+        """the number of simulations that the ray cluster can run concurrently"""
+        num_cpus = ray.cluster_resources().get("CPU", 1)
+
+        return max(1, int(num_cpus // self.ncpu))
+
+    def default_window(self) -> int:
+        """the default number of ligands to keep in flight when streaming ligands"""
+        return 4 * self.concurrency() * self.batch_size
+
+    def order(self, xs: Sequence[Optional[np.ndarray]]) -> List[int]:
+        """the order in which to submit ligands with the given features: by decreasing predicted
+        docking time if the schedule is "cost" and in input order otherwise"""
+        if self.schedule != "cost":
+            return list(range(len(xs)))
+
+        return np.argsort(-self.cost_model.predict(xs), kind="stable").tolist()
+
+    def observe(self, x: Optional[np.ndarray], results: Sequence[Optional[Result]]):
+        """refine the cost model with the docking times of the results of a ligand with features
+        `x`"""
+        for result in results:
+            if result is not None and result.time is not None:
+                self.cost_model.update(x, result.time)
+
+    def eta(self, xs: Sequence[Optional[np.ndarray]], num_unseen: int = 0) -> float:
+        """the estimated time (in seconds) remaining to dock the ligands with the given features
+        and `num_unseen` further ligands. See `CostModel.eta()` for more details"""
+        return self.cost_model.eta(
+            xs, self.concurrency(), num_unseen, len(self.simulation_templates)
+        )
 
     def reduce(self, resultss: List[List[Result]], reduction: Optional[Reduction]):
         reduction = reduction or self.receptor_reduction
@@ -37,6 +37,9 @@ class Simulation:
     prepared_receptor : Optional[Union[str, Path]]
     result : Optional[Mapping]
         the result of the docking calculation. None if the calculation has not been performed yet.
+    conformer_store : Optional[str]
+        the filepath of a conformer store from which to retrieve (or in which to store) the 3D
+        conformer of the ligand
 
     Parmeters
     ---------
@@ -52,6 +55,7 @@ class Simulation:
     prepared_ligand : Optional[Union[str, Path]], default=None
     prepared_receptor : Optional[Union[str, Path]], default=None
     result : Optional[Result], default=None
+    conformer_store : Optional[str], default=None
     """
 
     smi: str
@@ -67,6 +71,7 @@ class Simulation:
     reduction: Reduction = Reduction.BEST
     k: int = 1
     result: Optional[Result] = None
+    conformer_store: Optional[str] = None
 
     def __post_init__(self):
         self.in_path = Path(self.in_path)
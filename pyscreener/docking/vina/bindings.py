@@ -0,0 +1,264 @@
+"""This module contains the VinaPyRunner class, a DockingRunner that docks ligands in-process via
+the AutoDock Vina python bindings rather than by starting a new docking program process for
+each ligand"""
+import functools
+from pathlib import Path
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import warnings
+
+import numpy as np
+import ray
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
+from vina import Vina
+
+from pyscreener import utils
+from pyscreener.exceptions import UnsupportedSoftwareError
+from pyscreener.warnings import SimulationFailureWarning
+from pyscreener.docking.sim import Simulation
+from pyscreener.docking.runner import DockingRunner
+from pyscreener.docking.result import Result
+from pyscreener.docking.vina.metadata import VinaMetadata
+from pyscreener.docking.vina.runner import VinaRunner
+from pyscreener.docking.vina.utils import Software
+
+SCORING_FUNCTION = "vina"
+MAX_CONCURRENCY = 1000
+
+
+class VinaDocker:
+    """A VinaDocker docks ligands in-process against receptors whose affinity maps are computed
+    only once for each receptor and docking box
+
+    The maps of each receptor and box are computed by the first `Vina` object that needs them and
+    written to a temporary directory. `Vina` objects are not thread-safe, so each concurrent call
+    docks with its own object, and objects are reused across calls. Any additional object for the
+    same receptor and box loads the written maps rather than recomputing them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.map_locks: Dict[Tuple, threading.Lock] = {}
+        self.maps: Dict[Tuple, str] = {}
+        self.vinas: Dict[Tuple, List[Vina]] = {}
+        self.map_dir = Path(tempfile.mkdtemp(prefix="pyscreener_vina_"))
+
+    def get_vina(
+        self, receptor: str, center: Sequence[float], size: Sequence[float], ncpu: int
+    ) -> Tuple[Tuple, Vina]:
+        """get an idle Vina object with the affinity maps of the receptor and box, computing them
+        if necessary. The object must be returned with `put_vina()` after use
+
+        Returns
+        -------
+        Tuple
+            the key of the receptor and box
+        Vina
+            the Vina object
+        """
+        key = (receptor, tuple(center), tuple(size), ncpu)
+        with self.lock:
+            if len(self.vinas.get(key, [])) > 0:
+                return key, self.vinas[key].pop()
+            map_lock = self.map_locks.setdefault(key, threading.Lock())
+
+        v = Vina(sf_name=SCORING_FUNCTION, cpu=ncpu, verbosity=0)
+        v.set_receptor(rigid_pdbqt_filename=receptor)
+        with map_lock:
+            if key not in self.maps:
+                v.compute_vina_maps(center=list(center), box_size=list(size))
+                prefix = str(self.map_dir / f"maps_{len(self.maps)}")
+                v.write_maps(map_prefix_filename=prefix)
+                self.maps[key] = prefix
+
+                return key, v
+
+        v.load_maps(self.maps[key])
+
+        return key, v
+
+    def put_vina(self, key: Tuple, v: Vina):
+        """return a Vina object retrieved via `get_vina()` so that it may be reused"""
+        with self.lock:
+            self.vinas.setdefault(key, []).append(v)
+
+    def num_maps(self) -> int:
+        """the number of receptor/box affinity maps computed by this docker"""
+        return len(self.maps)
+
+    def dock(
+        self,
+        ligand: str,
+        receptor: str,
+        center: Sequence[float],
+        size: Sequence[float],
+        ncpu: int = 1,
+        exhaustiveness: int = 8,
+        num_modes: int = 9,
+        energy_range: float = 3.0,
+    ) -> Tuple[List[float], str]:
+        """dock the ligand against the receptor
+
+        Parameters
+        ----------
+        ligand : str
+            the contents of the ligand's PDBQT file
+        receptor : str
+            the filepath of the receptor's PDBQT file
+        center : Sequence[float]
+            the center of the docking box
+        size : Sequence[float]
+            the x-, y-, and z-dimensions of the docking box
+        ncpu : int, default=1
+            the number of cpu cores to use during docking
+        exhaustiveness : int, default=8
+        num_modes : int, default=9
+        energy_range : float, default=3.0
+
+        Returns
+        -------
+        List[float]
+            the scores of the docked binding modes
+        str
+            the PDBQT string of the docked binding modes
+        """
+        key, v = self.get_vina(receptor, center, size, ncpu)
+        try:
+            v.set_ligand_from_string(ligand)
+            v.dock(exhaustiveness=exhaustiveness, n_poses=num_modes)
+
+            energies = v.energies(n_poses=num_modes, energy_range=energy_range)
+            poses = v.poses(n_poses=num_modes, energy_range=energy_range)
+        finally:
+            self.put_vina(key, v)
+
+        return energies[:, 0].tolist(), poses
+
+
+# the actor reserves no CPUs of its own. It is only called by (blocking) docking tasks on its node,
+# which hold the CPUs for their docking runs, so it must be able to serve all of them concurrently
+VinaActor = ray.remote(num_cpus=0)(VinaDocker)
+
+
+@functools.lru_cache(maxsize=None)
+def get_actor() -> ray.actor.ActorHandle:
+    """get the VinaActor of the current node, creating it if necessary. All workers on a node
+    share the same actor (and thus the same affinity maps). The handle is cached in each worker"""
+    node_id = ray.get_runtime_context().get_node_id()
+
+    return VinaActor.options(
+        name=f"pyscreener_vina_{node_id}",
+        get_if_exists=True,
+        max_concurrency=MAX_CONCURRENCY,
+        scheduling_strategy=NodeAffinitySchedulingStrategy(node_id, soft=False),
+    ).remote()
+
+
+class VinaPyRunner(DockingRunner):
+    """A VinaPyRunner docks ligands using the AutoDock Vina python bindings
+
+    Each node hosts a long-lived `VinaActor`, shared by all of the docking workers on that node,
+    that holds the affinity maps of each receptor and docking box docked against on the node, so
+    receptor parsing and grid map computation are only performed once per node rather than for
+    every ligand. Ligands are prepared as usual and passed to the actor as PDBQT strings. If the
+    actor fails (e.g., it crashes), the ligand is instead docked via the `vina` executable.
+
+    NOTE: the `extra` metadata field is ignored by this runner
+    """
+
+    @classmethod
+    def is_multithreaded(cls) -> bool:
+        return True
+
+    @staticmethod
+    def prepare(sim: Simulation) -> Simulation:
+        _ = VinaPyRunner.prepare_receptor(sim)
+        _ = VinaPyRunner.prepare_ligand(sim)
+
+        return sim
+
+    @staticmethod
+    def prepare_receptor(sim: Simulation) -> Simulation:
+        return VinaRunner.prepare_receptor(sim)
+
+    @staticmethod
+    def prepare_ligand(sim: Simulation) -> bool:
+        return VinaRunner.prepare_ligand(sim)
+
+    @staticmethod
+    def prepare_and_run(sim: Simulation) -> Optional[Result]:
+        start = time.perf_counter()
+        if not VinaPyRunner.prepare_ligand(sim):
+            return None
+
+        _ = VinaPyRunner.run(sim)
+        if sim.result is not None:
+            sim.result.time = time.perf_counter() - start
+
+        return sim.result
+
+    @staticmethod
+    def run(sim: Simulation) -> Optional[List[float]]:
+        """Dock the ligand of the simulation in the VinaActor of the current node
+
+        Returns
+        -------
+        scores : Optional[List[float]]
+            the conformer scores of the docked ligand. None if docking failed
+        """
+        if sim.metadata.prepared_receptor is None or sim.metadata.prepared_ligand is None:
+            return None
+
+        p_ligand = Path(sim.metadata.prepared_ligand)
+        name = VinaRunner.output_name(sim)
+
+        try:
+            scores, poses = ray.get(
+                get_actor().dock.remote(
+                    p_ligand.read_text(),
+                    str(sim.metadata.prepared_receptor),
+                    sim.center,
+                    sim.size,
+                    sim.ncpu,
+                    sim.metadata.exhaustiveness,
+                    sim.metadata.num_modes,
+                    sim.metadata.energy_range,
+                )
+            )
+        except ray.exceptions.RayActorError:
+            get_actor.cache_clear()
+            warnings.warn(
+                "Vina actor died! Falling back to vina executable ...", SimulationFailureWarning
+            )
+            sim.metadata.software = Software.VINA
+            return VinaRunner.run(sim)
+        except ray.exceptions.RayTaskError as e:
+            warnings.warn(f"Message: {e}", SimulationFailureWarning)
+            scores, poses = None, None
+
+        software = sim.metadata.software.value
+        out_path = Path(sim.out_path)
+        if poses is not None:
+            (out_path / f"{software}_{name}_out.pdbqt").write_text(poses)
+            (out_path / f"{software}_{name}.log").write_text(VinaRunner.format_log_table(scores))
+
+        if not scores:
+            score = None
+        else:
+            score = utils.reduce_scores(np.array(scores), sim.reduction, k=sim.k)
+
+        node_id = re.sub("[:,.]", "", ray.util.get_node_ip_address())
+        sim.result = Result(sim.smi, name, node_id, score)
+
+        return scores or None
+
+    @staticmethod
+    def validate_metadata(metadata: VinaMetadata):
+        if metadata.software != Software.VINA_PY:
+            raise UnsupportedSoftwareError(
+                f'VinaPyRunner only supports "{Software.VINA_PY.value}"! '
+                f'got: "{metadata.software.value}"'
+            )
@@ -3,17 +3,20 @@ from pathlib import Path
 import re
 import shutil
 import subprocess as sp
-from typing import List, Optional, Tuple, Union
+import time
+from typing import List, Optional, Sequence, Tuple, Union
 import warnings
 
 from openbabel import pybel
 import numpy as np
-from rdkit.Chem import AllChem as Chem
 import ray
 
 from pyscreener import utils
 from pyscreener.exceptions import MissingExecutableError, ReceptorPreparationError
-from pyscreener.warnings import ChargeWarning, ConformerWarning, SimulationFailureWarning
+from pyscreener.utils.conformers import get_conformer
+from pyscreener.utils.formats import write_ligand
+from pyscreener.utils.index import read_reference
+from pyscreener.warnings import ChargeWarning, SimulationFailureWarning
 from pyscreener.docking.sim import Simulation
 from pyscreener.docking.runner import DockingRunner
 from pyscreener.docking.result import Result
@@ -27,6 +30,10 @@ if shutil.which("prepare_receptor") is None:
     )
 
 
+TABLE_BORDER = "-----+------------+----------+----------"
+SCORE_LINE = re.compile(r"\s*\d+\s+(-?\d+(?:\.\d*)?)")
+
+
 class VinaRunner(DockingRunner):
     @classmethod
     def is_multithreaded(cls) -> bool:
@@ -71,13 +78,38 @@ class VinaRunner(DockingRunner):
 
     @staticmethod
     def prepare_and_run(sim: Simulation) -> Optional[Result]:
+        start = time.perf_counter()
         if not VinaRunner.prepare_ligand(sim):
             return None
 
         _ = VinaRunner.run(sim)
+        if sim.result is not None:
+            sim.result.time = time.perf_counter() - start
 
         return sim.result
 
+    @classmethod
+    def supports_batching(cls, metadata: VinaMetadata) -> bool:
+        return metadata.software == Software.SMINA
+
+    @staticmethod
+    def prepare_and_run_batch(sims: Sequence[Simulation]) -> List[Optional[Result]]:
+        """Prepare the ligand files of the simulations then run them in a single invocation of the
+        docking program, if supported. See `run_batch()` for more details"""
+        start = time.perf_counter()
+        prepared = [sim for sim in sims if VinaRunner.prepare_ligand(sim)]
+
+        VinaRunner.run_batch(prepared)
+
+        elapsed = (time.perf_counter() - start) / max(len(prepared), 1)
+        for sim in prepared:
+            if sim.result is not None:
+                sim.result.time = elapsed
+
+        prepared_ids = {id(sim) for sim in prepared}
+
+        return [sim.result if id(sim) in prepared_ids else None for sim in sims]
+
     @staticmethod
     def prepare_ligand(sim: Simulation) -> bool:
         if sim.smi is not None:
@@ -103,29 +135,15 @@ class VinaRunner(DockingRunner):
         """
         pdbqt = Path(sim.in_path) / f"{sim.name}.pdbqt"
 
-        mol = Chem.MolFromSmiles(sim.smi)
+        mol = get_conformer(sim.smi, sim.conformer_store)
         if mol is None:
             return False
 
-        mol = Chem.AddHs(mol)
-
-        try:
-            Chem.EmbedMolecule(mol)
-            Chem.MMFFOptimizeMolecule(mol)
-        except ValueError:
-            warnings.warn("Could not generate 3D conformer of molecule!", ConformerWarning)
-
         try:
-            mol = pybel.readstring("mol", Chem.MolToMolBlock(mol))
+            write_ligand(mol, pdbqt, "pdbqt", sim.name)
         except IOError:
             return False
 
-        try:
-            mol.calccharges(model="gasteiger")
-        except Exception:
-            warnings.warn("Could not calculate charges for ligand!", ChargeWarning)
-
-        mol.write("pdbqt", str(pdbqt), overwrite=True, opt={"h": None})
         sim.metadata.prepared_ligand = pdbqt
 
         return True
@@ -147,9 +165,13 @@ class VinaRunner(DockingRunner):
         bool
             whether the ligand preparation succeeded
         """
-        fmt = Path(sim.input_file).suffix.strip(".")
+        filepath, record = read_reference(sim.input_file)
+        fmt = Path(filepath).suffix.strip(".")
 
-        mol = next(pybel.readfile(fmt, sim.input_file))
+        if record is not None:
+            mol = pybel.readstring(fmt, record)
+        else:
+            mol = next(pybel.readfile(fmt, filepath))
 
         pdbqt = Path(sim.in_path) / f"{mol.title or sim.name}.pdbqt"
         sim.smi = mol.write()
@@ -178,15 +200,24 @@ class VinaRunner(DockingRunner):
             the conformer scores parsed from the log file. None if no scores were parseable from
             the logfile due to simulation failure.
         """
-        if sim.metadata.prepared_receptor is None or sim.metadata.prepared_ligand is None:
+        argv = VinaRunner.build_command(sim)
+        if argv is None:
             return None
 
-        p_ligand = Path(sim.metadata.prepared_ligand)
-        ligand_name = p_ligand.stem
+        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
+        try:
+            ret.check_returncode()
+        except sp.SubprocessError:
+            warnings.warn(f'Message: {ret.stderr.decode("utf-8")}', SimulationFailureWarning)
 
-        name = f"{Path(sim.receptor).stem}_{ligand_name}"
+        return VinaRunner.parse_results(sim)
 
-        argv, _, log = VinaRunner.build_argv(
+    @staticmethod
+    def build_command(sim: Simulation) -> Optional[List[str]]:
+        if sim.metadata.prepared_receptor is None or sim.metadata.prepared_ligand is None:
+            return None
+
+        argv, _, _ = VinaRunner.build_argv(
             ligand=sim.metadata.prepared_ligand,
             receptor=sim.metadata.prepared_receptor,
             software=sim.metadata.software,
@@ -196,16 +227,17 @@ class VinaRunner(DockingRunner):
             exhaustiveness=sim.metadata.exhaustiveness,
             num_modes=sim.metadata.num_modes,
             energy_range=sim.metadata.energy_range,
-            name=name,
+            name=VinaRunner.output_name(sim),
             path=Path(sim.out_path),
             extra=sim.metadata.extra,
         )
 
-        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
-        try:
-            ret.check_returncode()
-        except sp.SubprocessError:
-            warnings.warn(f'Message: {ret.stderr.decode("utf-8")}', SimulationFailureWarning)
+        return argv
+
+    @staticmethod
+    def parse_results(sim: Simulation) -> Optional[List[float]]:
+        name = VinaRunner.output_name(sim)
+        log = Path(sim.out_path) / f"{sim.metadata.software.value}_{name}.log"
 
         scores = VinaRunner.parse_logfile(log)
         if scores is None:
@@ -218,6 +250,152 @@ class VinaRunner(DockingRunner):
 
         return scores
 
+    @staticmethod
+    def output_name(sim: Simulation) -> str:
+        """the base name of the output files of the simulation"""
+        return f"{Path(sim.receptor).stem}_{Path(sim.metadata.prepared_ligand).stem}"
+
+    @staticmethod
+    def run_batch(sims: Sequence[Simulation]):
+        """Run the simulations, which must all be against the same receptor, in a single
+        invocation of the docking program by writing their prepared ligands into a single
+        multi-model PDBQT file. The combined output and log files are then split into the same
+        per-ligand output and log files as individual runs would produce, and the `result` of each
+        simulation is set. If the software does not support multi-ligand inputs, the batched run
+        fails, or its output cannot be demultiplexed, each simulation is run individually.
+
+        NOTE: only Smina supports multi-ligand inputs
+
+        Parameters
+        ----------
+        sims : Sequence[Simulation]
+            the simulations to run. Each must have a prepared ligand
+        """
+        if len(sims) <= 1 or sims[0].metadata.software != Software.SMINA:
+            [VinaRunner.run(sim) for sim in sims]
+            return
+
+        sim0 = sims[0]
+        names = [VinaRunner.output_name(sim) for sim in sims]
+        batch_name = f"{names[0]}_batch"
+
+        p_batch = Path(sim0.in_path) / f"{batch_name}.pdbqt"
+        with open(p_batch, "w") as fid:
+            for k, sim in enumerate(sims, 1):
+                fid.write(f"MODEL {k}\n{Path(sim.metadata.prepared_ligand).read_text()}ENDMDL\n")
+
+        argv, out, log = VinaRunner.build_argv(
+            ligand=p_batch,
+            receptor=sim0.metadata.prepared_receptor,
+            software=sim0.metadata.software,
+            center=sim0.center,
+            size=sim0.size,
+            ncpu=sim0.ncpu,
+            exhaustiveness=sim0.metadata.exhaustiveness,
+            num_modes=sim0.metadata.num_modes,
+            energy_range=sim0.metadata.energy_range,
+            name=batch_name,
+            path=Path(sim0.out_path),
+            extra=sim0.metadata.extra,
+        )
+
+        ret = sp.run(argv, stdout=sp.PIPE, stderr=sp.PIPE)
+        scoress = VinaRunner.parse_batch_logfile(log)
+        poses = VinaRunner.split_batch_outfile(out, scoress) if scoress is not None else None
+        for f in (p_batch, out, log):
+            Path(f).unlink(missing_ok=True)
+
+        if ret.returncode != 0 or poses is None or len(scoress) != len(sims):
+            warnings.warn(
+                f"Batched run of {len(sims)} ligands failed! Running ligands individually ...",
+                SimulationFailureWarning,
+            )
+            [VinaRunner.run(sim) for sim in sims]
+            return
+
+        node_id = re.sub("[:,.]", "", ray.util.get_node_ip_address())
+        for sim, name, scores, pose in zip(sims, names, scoress, poses):
+            software = sim.metadata.software.value
+            out_path = Path(sim.out_path)
+            (out_path / f"{software}_{name}_out.pdbqt").write_text(pose)
+            (out_path / f"{software}_{name}.log").write_text(VinaRunner.format_log_table(scores))
+
+            if scores:
+                score = utils.reduce_scores(np.array(scores), sim.reduction, k=sim.k)
+            else:
+                score = None
+            sim.result = Result(sim.smi, name, node_id, score)
+
+    @staticmethod
+    def parse_batch_logfile(logfile: Union[str, Path]) -> Optional[List[List[float]]]:
+        """parse a Vina-type log file of a multi-ligand run for the scores of the binding modes of
+        each ligand
+
+        Returns
+        -------
+        Optional[List[List[float]]]
+            the scores of the docked binding modes of each ligand, in the order of the input. None
+            if the log file was unparseable
+        """
+        try:
+            text = Path(logfile).read_text()
+        except OSError:
+            return None
+
+        scoress = []
+        for block in text.split(TABLE_BORDER)[1:]:
+            scores = []
+            for line in block.splitlines()[1:]:
+                match = SCORE_LINE.match(line)
+                if match is None:
+                    break
+                scores.append(float(match.group(1)))
+            scoress.append(scores)
+
+        return scoress
+
+    @staticmethod
+    def split_batch_outfile(
+        outfile: Union[str, Path], scoress: Sequence[Sequence[float]]
+    ) -> Optional[List[str]]:
+        """split a Vina-type output file of a multi-ligand run into the binding modes of each
+        ligand, given the number of binding modes of each ligand
+
+        Returns
+        -------
+        Optional[List[str]]
+            the contents of the output file of each ligand. None if the output file was unparseable
+            or the number of binding modes in the file does not match the number of scores
+        """
+        try:
+            text = Path(outfile).read_text()
+        except OSError:
+            return None
+
+        models = re.split(r"(?m)^(?=MODEL)", text)[1:]
+        if len(models) != sum(len(scores) for scores in scoress):
+            return None
+
+        poses = []
+        i = 0
+        for scores in scoress:
+            poses.append("".join(models[i : i + len(scores)]))
+            i += len(scores)
+
+        return poses
+
+    @staticmethod
+    def format_log_table(scores: Sequence[float]) -> str:
+        """format the scores of the binding modes as the table of a Vina-type log file"""
+        lines = [
+            "mode |   affinity | dist from best mode",
+            "     | (kcal/mol) | rmsd l.b.| rmsd u.b.",
+            TABLE_BORDER,
+        ]
+        lines.extend(f"{i:>4} {score:>12.1f}" for i, score in enumerate(scores, 1))
+
+        return "\n".join(lines) + "\n"
+
     @staticmethod
     def build_argv(
         ligand: str,
@@ -317,7 +495,6 @@ class VinaRunner(DockingRunner):
             the scores of the docked binding modes in the ordering of the log file. None if no
             scores were parsed or the log file was unparsable
         """
-        TABLE_BORDER = "-----+------------+----------+----------"
         try:
             with open(logfile) as fid:
                 for line in fid:
@@ -0,0 +1,196 @@
+"""This module contains classes for incrementally writing docking results to columnar (Parquet or
+Arrow IPC) output files"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from rdkit import Chem
+
+from pyscreener.docking.result import Result
+from pyscreener.docking.sim import Simulation
+
+SCHEMA = pa.schema(
+    [
+        ("smiles", pa.string()),
+        ("name", pa.string()),
+        ("receptor", pa.int16()),
+        ("score", pa.float64()),
+        ("status", pa.string()),
+        ("node_id", pa.string()),
+        ("time", pa.float64()),
+    ]
+)
+CODECS = {"parquet": ("snappy", "gzip", "brotli", "lz4", "zstd"), "arrow": ("lz4", "zstd")}
+
+
+class ResultWriter(ABC):
+    """A ResultWriter buffers the results of completed simulations and writes them to an output
+    file in row groups (or record batches) of a fixed size as they complete
+
+    Each row corresponds to a single simulation, i.e., a (ligand, receptor) pair, with the
+    following typed columns:
+
+    * `smiles`: the canonical SMILES string of the ligand
+    * `name`: the name of the ligand
+    * `receptor`: the index of the receptor in the screen
+    * `score`: the docking score of the ligand against the given receptor
+    * `status`: one of "success", "failed" (the simulation was run but no score was parsed),
+      "invalid" (the ligand could not be prepared), or "misfit" (the ligand cannot fit inside the
+      docking box)
+    * `node_id`: the ID of the node on which the simulation was run
+    * `time`: the wall time (in seconds) of ligand preparation and simulation
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the filepath of the output file
+    row_group_size : int, default=10000
+        the number of rows to buffer before writing them to the output file
+    compression : Optional[str], default="zstd"
+        the compression codec to use for the output file
+    """
+
+    def __init__(
+        self,
+        filepath: Union[str, Path],
+        row_group_size: int = 10000,
+        compression: Optional[str] = "zstd",
+    ):
+        self.filepath = Path(filepath)
+        self.row_group_size = row_group_size
+        self.compression = compression
+
+        self.buffer: Dict[str, List] = {field.name: [] for field in SCHEMA}
+        self.num_rows = 0
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        """the number of rows that have been written to the output file"""
+        return self.num_rows
+
+    def write(self, sims: Sequence[Simulation], results: Sequence[Optional[Result]]):
+        """buffer the results of the simulations for a single ligand against each receptor and
+        write a new row group if the buffer is full"""
+        for j, (sim, result) in enumerate(zip(sims, results)):
+            if result is None:
+                row = (sim.smi, sim.name, j, None, "invalid", None, None)
+            else:
+                status = result.status or ("failed" if result.score is None else "success")
+                row = (
+                    result.smiles,
+                    sim.name,
+                    j,
+                    result.score,
+                    status,
+                    result.node_id,
+                    result.time,
+                )
+
+            for column, value in zip(self.buffer.values(), row):
+                column.append(value)
+
+        if len(self.buffer["smiles"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """write all buffered rows to the output file"""
+        if len(self.buffer["smiles"]) == 0:
+            return
+
+        self.buffer["smiles"] = [canonicalize(smi) for smi in self.buffer["smiles"]]
+        table = pa.Table.from_pydict(self.buffer, SCHEMA)
+        self.write_table(table)
+
+        self.num_rows += len(table)
+        self.buffer = {k: [] for k in self.buffer}
+
+    def close(self):
+        """flush all buffered rows and close the output file"""
+        self.flush()
+        self.close_writer()
+
+    @abstractmethod
+    def write_table(self, table: pa.Table):
+        """write the table to the output file as a single row group"""
+
+    @abstractmethod
+    def close_writer(self):
+        """close the underlying file writer"""
+
+
+class ParquetResultWriter(ResultWriter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.writer = pq.ParquetWriter(
+            str(self.filepath), SCHEMA, compression=self.compression or "none"
+        )
+
+    def write_table(self, table: pa.Table):
+        self.writer.write_table(table, row_group_size=len(table))
+
+    def close_writer(self):
+        self.writer.close()
+
+
+class ArrowResultWriter(ResultWriter):
+    """Write results to an Arrow IPC file, which may be memory-mapped upon reading"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        self.sink = pa.OSFile(str(self.filepath), "wb")
+        self.writer = pa.ipc.new_file(self.sink, SCHEMA, options=options)
+
+    def write_table(self, table: pa.Table):
+        self.writer.write_table(table, max_chunksize=len(table))
+
+    def close_writer(self):
+        self.writer.close()
+        self.sink.close()
+
+
+def build_writer(
+    output_format: str,
+    path: Union[str, Path],
+    name: str = "results",
+    row_group_size: int = 10000,
+    compression: Optional[str] = "zstd",
+) -> ResultWriter:
+    """build a ResultWriter for the given output format ("parquet" or "arrow") that will write to
+    the file <path>/<name>.<ext>
+
+    Raises
+    ------
+    ValueError
+        if the output format is not supported or the compression codec is not supported by the
+        output format
+    """
+    if output_format in CODECS and compression not in (None, *CODECS[output_format]):
+        raise ValueError(
+            f'Unsupported compression codec for output format "{output_format}"! '
+            f'got: "{compression}"'
+        )
+
+    if output_format == "parquet":
+        return ParquetResultWriter(Path(path) / f"{name}.parquet", row_group_size, compression)
+    if output_format == "arrow":
+        return ArrowResultWriter(Path(path) / f"{name}.arrow", row_group_size, compression)
+
+    raise ValueError(f'Unsupported output format: "{output_format}"')
+
+
+def canonicalize(smi: str) -> str:
+    """the canonical SMILES string of the input SMILES string. If the input can't be parsed by
+    RDKit, return it as-is"""
+    mol = Chem.MolFromSmiles(smi) if smi is not None else None
+
+    return smi if mol is None else Chem.MolToSmiles(mol)
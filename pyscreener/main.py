@@ -1,13 +1,18 @@
+from collections import Counter
+import contextlib
 import csv
 import dataclasses
 import json
 import os
 import sys
 import time
+from typing import Iterable, List, Optional, TextIO, Tuple
 
+import numpy as np
 import ray
 
 import pyscreener as ps
+from pyscreener.docking.records import RecordWriter, iter_smiles
 
 
 def check():
@@ -15,31 +20,7 @@ def check():
     exit(0)
 
 
-def main():
-    args = ps.args.gen_args()
-
-    if args.smoke_test:
-        ps.check_env(args.screen_type, args.metadata_template)
-        exit(0)
-
-    print(
-        """\
-***************************************************************
-*      ____  __  ____________________  ___  ____  ___  _____  *
-*     / __ \/ / / / ___/ ___/ ___/ _ \/ _ \/ __ \/ _ \/ ___/  *
-*    / /_/ / /_/ (__  ) /__/ /  /  __/  __/ / / /  __/ /      *
-*   / .___/\__, /____/\___/_/   \___/\___/_/ /_/\___/_/       *
-*  /_/    /____/                                              *
-***************************************************************"""
-    )
-    print("Welcome to Pyscreener!\n")
-
-    params = vars(args)
-    print("Pyscreener will be run with the following arguments:")
-    for param, value in sorted(params.items()):
-        print(f"  {param}: {value}")
-    print(flush=True)
-
+def init_ray():
     try:
         if "redis_password" in os.environ:
             ray.init(
@@ -59,9 +40,11 @@ def main():
     print(ray.cluster_resources())
     print(flush=True)
 
-    print("Preparing and screening inputs ...", flush=True)
+
+def build_virtual_screen(args) -> "ps.docking.DockingVirtualScreen":
     metadata_template = ps.build_metadata(args.screen_type, args.metadata_template)
-    virtual_screen = ps.virtual_screen(
+
+    return ps.virtual_screen(
         args.screen_type,
         args.receptors,
         args.center,
@@ -77,7 +60,162 @@ def main():
         args.receptor_reduction,
         args.k,
         args.verbose,
+        args.box_fit,
+        args.box_tolerance,
+        args.conformer_store,
+        args.batch_size,
+        args.node_executor,
+        args.pipeline,
+        args.calibration_size,
+        args.pin_cpus,
+        args.schedule,
     )
+
+
+def serve(argv=None):
+    args = ps.args.gen_serve_args(argv)
+
+    if args.smoke_test:
+        ps.check_env(args.screen_type, args.metadata_template)
+        exit(0)
+
+    init_ray()
+
+    print("Preparing receptors ...", flush=True)
+    virtual_screen = build_virtual_screen(args)
+
+    from pyscreener.server import DockingService, make_server
+
+    service = DockingService(virtual_screen, args.max_wait, args.max_window, args.cache_size)
+    if not args.no_warm_up:
+        print("Warming up workers ...", flush=True)
+        service.warm_up()
+
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    address = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving docking scores at {address} (press CTRL+C to quit)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2:])
+        return
+
+    args = ps.args.gen_args()
+
+    if args.smoke_test:
+        ps.check_env(args.screen_type, args.metadata_template)
+        exit(0)
+
+    if args.stream_out is None:
+        screen(args)
+        return
+
+    try:
+        stdout = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            screen(args, stdout)
+    except BrokenPipeError:
+        # the downstream consumer exited early. Silence the final flush of stdout at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        exit(1)
+
+
+def screen(args, fid: Optional[TextIO] = None):
+    print(
+        """\
+***************************************************************
+*      ____  __  ____________________  ___  ____  ___  _____  *
+*     / __ \/ / / / ___/ ___/ ___/ _ \/ _ \/ __ \/ _ \/ ___/  *
+*    / /_/ / /_/ (__  ) /__/ /  /  __/  __/ / / /  __/ /      *
+*   / .___/\__, /____/\___/_/   \___/\___/_/ /_/\___/_/       *
+*  /_/    /____/                                              *
+***************************************************************"""
+    )
+    print("Welcome to Pyscreener!\n")
+
+    params = vars(args)
+    print("Pyscreener will be run with the following arguments:")
+    for param, value in sorted(params.items()):
+        print(f"  {param}: {value}")
+    print(flush=True)
+
+    init_ray()
+
+    print("Preparing and screening inputs ...", flush=True)
+    virtual_screen = build_virtual_screen(args)
+    supply, ligands, smiles = build_ligands(args)
+    if args.shard is not None:
+        virtual_screen.path = virtual_screen.path / f"shard_{args.shard[0]}"
+        virtual_screen.base_name = f"{virtual_screen.base_name}_shard{args.shard[0]}"
+    if args.output_format != "csv":
+        from pyscreener.docking.writer import build_writer
+
+        compression = None if args.compression == "none" else args.compression
+        result_writer = build_writer(
+            args.output_format, virtual_screen.path, "results", args.row_group_size, compression
+        )
+    else:
+        result_writer = None
+
+    record_writer = (
+        RecordWriter(fid, args.stream_out, virtual_screen.receptor_reduction, virtual_screen.k)
+        if args.stream_out is not None
+        else None
+    )
+
+    # the results of each ligand are only retained if they are written at the end of the screen
+    keep = (result_writer is None and record_writer is None) or args.budget is not None
+
+    start = time.time()
+
+    ligands, alert_counts = preprocess(args, ligands, smiles)
+
+    if args.budget is not None and not smiles:
+        print("Active learning requires SMILES inputs! Docking all ligands ...", flush=True)
+        args.budget = None
+
+    learner = None
+    scores = None
+    try:
+        if args.budget is not None:
+            learner = run_active_learning(args, virtual_screen, ligands, result_writer)
+        else:
+            total = None
+            if args.shard is None and ligands is supply:
+                try:
+                    total = len(supply)
+                except TypeError:
+                    pass
+
+            scores = run_screen(
+                args, virtual_screen, ligands, smiles, total, result_writer, record_writer, keep
+            )
+    finally:
+        if result_writer is not None:
+            result_writer.close()
+
+    total_time = time.time() - start
+    print("Done!")
+
+    print_summary(args, virtual_screen, learner, alert_counts, total_time)
+    write_outputs(args, virtual_screen, result_writer, keep, scores)
+
+    print("Thanks for using Pyscreener!")
+
+
+def build_ligands(args) -> Tuple[Optional["ps.LigandSupply"], Iterable, bool]:
+    if args.stdin:
+        return None, iter_smiles(sys.stdin), True
+
     supply = ps.LigandSupply(
         args.input_files,
         args.input_filetypes,
@@ -88,15 +226,116 @@ def main():
         args.smiles_col,
         args.name_col,
         args.id_property,
+        lazy=True,
+        ncpu=args.supply_ncpu,
+        single_file=args.single_file,
+        filters=args.property_ranges,
+        shard=args.shard,
     )
-    start = time.time()
 
-    S = virtual_screen(supply.ligands)
+    return supply, supply, supply.smiles
 
-    total_time = time.time() - start
-    print("Done!")
 
-    avg_time = total_time / len(virtual_screen)
+def preprocess(args, ligands: Iterable, smiles: bool) -> Tuple[Iterable, Optional[Counter]]:
+    options = args.preprocessing_options or []
+
+    if "filter" in options:
+        if smiles:
+            from pyscreener.preprocessing import iter_filtered
+
+            ligands = iter_filtered(
+                ligands, args.max_atoms, args.max_weight, args.max_logP, args.supply_ncpu
+            )
+        else:
+            print("Ligand files cannot be filtered! Skipping filtering ...", flush=True)
+
+    alert_counts = None
+    if "alerts" in options:
+        if smiles:
+            from pyscreener.preprocessing import iter_alert_filtered
+
+            alert_counts = Counter()
+            ligands = iter_alert_filtered(
+                ligands,
+                args.alert_catalogs,
+                args.alert_smarts_files,
+                args.supply_ncpu,
+                counts=alert_counts,
+            )
+        else:
+            print("Ligand files cannot be screened for alerts! Skipping alerts ...", flush=True)
+
+    return ligands, alert_counts
+
+
+def run_active_learning(args, virtual_screen, ligands: Iterable, result_writer):
+    from pyscreener.active import ActiveLearner, read_reference
+
+    smis = list(ligands)
+    reference = (
+        read_reference(args.reference_scores, smis) if args.reference_scores is not None else None
+    )
+    learner = ActiveLearner(
+        virtual_screen,
+        smis,
+        args.budget,
+        args.acquisition_size,
+        args.init_size,
+        args.acquisition,
+        args.surrogate,
+        args.top_k,
+        reference=reference,
+        seed=args.seed,
+    )
+    learner.run(result_writer)
+
+    return learner
+
+
+def run_screen(
+    args,
+    virtual_screen,
+    ligands: Iterable,
+    smiles: bool,
+    total: Optional[int],
+    result_writer,
+    record_writer: Optional[RecordWriter],
+    keep: bool,
+) -> Optional[List[float]]:
+    scores = [] if args.hist_mode is not None and not keep else None
+
+    for sims, results in virtual_screen.stream(ligands, smiles, total=total, keep=keep):
+        if result_writer is not None:
+            result_writer.write(sims, results)
+        if record_writer is not None:
+            record_writer.write(sims, results)
+        if scores is not None:
+            scores.append(virtual_screen.reduce([results], None)[0])
+
+    return scores
+
+
+def print_summary(
+    args, virtual_screen, learner, alert_counts: Optional[Counter], total_time: float
+):
+    if learner is not None:
+        print(
+            f"Active learning progress ({learner.num_docked}/{len(learner.smis)} ligands docked):"
+        )
+        print(learner.report())
+
+    if alert_counts is not None:
+        print(f"Substructure alerts rejected {sum(alert_counts.values())} ligands")
+        for alert, count in alert_counts.most_common():
+            print(f"  {alert}: {count}")
+    if args.box_fit is not None:
+        print(f"{virtual_screen.num_misfits} ligands cannot fit inside the docking box", end="")
+        if args.box_fit == "skip":
+            print(f" and were skipped, saving ~{virtual_screen.time_saved():0.1f}s of docking")
+        else:
+            print(" and were flagged")
+
+    avg_time = total_time / max(len(virtual_screen), 1)
     m, s = divmod(total_time, 60)
     h, m = divmod(int(m), 60)
     print(
@@ -104,11 +343,31 @@ def main():
         f"({avg_time:0.2f}s/ligand)"
     )
 
+
+def write_outputs(args, virtual_screen, result_writer, keep: bool, scores: Optional[List[float]]):
     if args.hist_mode is not None:
+        S = (
+            np.array(scores)
+            if scores is not None
+            else virtual_screen.reduce(virtual_screen.resultss, None)
+        )
         ps.postprocessing.histogram(
             args.hist_mode, S, virtual_screen.path, "score_distribution.png"
         )
 
+    if result_writer is not None or not keep:
+        if result_writer is not None:
+            print(f'Results have been saved to: "{result_writer.filepath}"')
+        else:
+            print("Results have been written to stdout")
+
+        if args.collect_all:
+            print("Collecting all input and output files ...", end=" ", flush=True)
+            virtual_screen.collect_files()
+            print("Done!")
+
+        return
+
     results = virtual_screen.results()
     if not args.no_sort:
         results = sorted(results, key=lambda r: r.score if r.score is not None else float("inf"))
@@ -129,14 +388,12 @@ def main():
         extended_filename = virtual_screen.path / "extended.csv"
         with open(extended_filename, "w") as fid:
             writer = csv.writer(fid)
-            writer.writerow(field.name for field in dataclasses.fields(results[0]))
+            writer.writerow(field.name for field in dataclasses.fields(ps.docking.Result))
             writer.writerows(dataclasses.astuple(r) for r in results)
 
         print("Done!")
         print(f'Extended data has been saved to: "{extended_filename}"')
 
-    print("Thanks for using Pyscreener!")
-
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,219 @@
+"""This module contains functions for merging the outputs of independently screened shards of a
+ligand library (see the `--shard` option of `pyscreener`) and the `pyscreener-merge` entry point"""
+import csv
+import heapq
+from pathlib import Path
+import tarfile
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from configargparse import ArgumentParser
+
+SCORE_FILES = ("scores.csv", "extended.csv")
+TABLE_FILES = ("results.parquet", "results.arrow")
+ARCHIVE_FILE = "archives.tar.gz"
+
+
+def merge_csvs(
+    filepaths: Sequence[Union[str, Path]], out_filepath: Union[str, Path], key: str = "score"
+) -> int:
+    """k-way merge CSV files that are each sorted by score into a single sorted CSV file, holding
+    only a single row of each input file in memory at a time. Rows without a score are sorted last
+
+    Parameters
+    ----------
+    filepaths : Sequence[Union[str, Path]]
+        the CSV files to merge, each with the same header
+    out_filepath : Union[str, Path]
+        the filepath of the merged CSV file
+    key : str, default="score"
+        the name of the column by which the input files are sorted
+
+    Returns
+    -------
+    int
+        the number of rows in the merged file
+
+    Raises
+    ------
+    ValueError
+        if the headers of the input files differ or any input file is not sorted
+    """
+    fids = [open(filepath) for filepath in filepaths]
+    try:
+        readers = [csv.reader(fid) for fid in fids]
+        headers = [next(reader, None) for reader in readers]
+
+        header = next((h for h in headers if h is not None), None)
+        if header is None:
+            return 0
+        if any(h is not None and h != header for h in headers):
+            raise ValueError(f"Input files have different headers! got: {headers}")
+
+        j = header.index(key)
+        rowss = [
+            iter_sorted_rows(reader, j, filepath)
+            for reader, filepath, h in zip(readers, filepaths, headers)
+            if h is not None
+        ]
+
+        num_rows = 0
+        with open(out_filepath, "w") as fid:
+            writer = csv.writer(fid)
+            writer.writerow(header)
+            for row in heapq.merge(*rowss, key=lambda row: parse_score(row[j])):
+                writer.writerow(row)
+                num_rows += 1
+    finally:
+        [fid.close() for fid in fids]
+
+    return num_rows
+
+
+def iter_sorted_rows(rows: Iterable[List[str]], j: int, filepath: Union[str, Path]) -> Iterator:
+    """yield the rows, checking that they are sorted by the score in column `j`"""
+    prev = float("-inf")
+    for row in rows:
+        if not row:
+            continue
+
+        score = parse_score(row[j])
+        if score < prev:
+            raise ValueError(
+                f'"{filepath}" is not sorted by score! Was it generated with "--no-sort"?'
+            )
+        prev = score
+
+        yield row
+
+
+def parse_score(s: str) -> float:
+    """parse a score from a CSV file, where a missing score is infinitely bad"""
+    try:
+        return float(s)
+    except ValueError:
+        return float("inf")
+
+
+def merge_tables(filepaths: Sequence[Union[str, Path]], out_filepath: Union[str, Path]) -> int:
+    """concatenate the Parquet or Arrow IPC result files into a single file of the same format by
+    copying them one row group (or record batch) at a time
+
+    Returns
+    -------
+    int
+        the number of rows in the merged file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    num_rows = 0
+    if Path(out_filepath).suffix == ".parquet":
+        writer = None
+        for filepath in filepaths:
+            pf = pq.ParquetFile(filepath, memory_map=True)
+            if writer is None:
+                writer = pq.ParquetWriter(str(out_filepath), pf.schema_arrow, compression="zstd")
+            for i in range(pf.num_row_groups):
+                table = pf.read_row_group(i)
+                writer.write_table(table, row_group_size=len(table))
+                num_rows += len(table)
+        writer.close()
+
+        return num_rows
+
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    writer = None
+    sink = pa.OSFile(str(out_filepath), "wb")
+    for filepath in filepaths:
+        with pa.memory_map(str(filepath)) as source:
+            reader = pa.ipc.open_file(source)
+            if writer is None:
+                writer = pa.ipc.new_file(sink, reader.schema, options=options)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                writer.write_batch(batch)
+                num_rows += batch.num_rows
+    writer.close()
+    sink.close()
+
+    return num_rows
+
+
+def merge_archives(
+    archives: Sequence[Tuple[str, Union[str, Path]]], out_filepath: Union[str, Path]
+) -> int:
+    """combine gzipped tar archives into a single gzipped tar archive by streaming their members
+
+    Parameters
+    ----------
+    archives : Sequence[Tuple[str, Union[str, Path]]]
+        pairs of the form (prefix, archive), where the members of each archive will be placed
+        under "<prefix>/" in the combined archive
+    out_filepath : Union[str, Path]
+        the filepath of the combined archive
+
+    Returns
+    -------
+    int
+        the number of members in the combined archive
+    """
+    num_members = 0
+    with tarfile.open(out_filepath, "w:gz") as tar_out:
+        for prefix, archive in archives:
+            with tarfile.open(archive, "r|gz") as tar_in:
+                for member in tar_in:
+                    fileobj = tar_in.extractfile(member) if member.isfile() else None
+                    member.name = f"{prefix}/{member.name}"
+                    tar_out.addfile(member, fileobj)
+                    num_members += 1
+
+    return num_members
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(
+        description="Merge the outputs of independently screened shards of a ligand library."
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="the output directory of each shard, e.g., OUTPUT_DIR/shard_*"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default=".", help="the directory under which to write merged outputs"
+    )
+    args = parser.parse_args(argv)
+
+    paths = [Path(path) for path in args.paths]
+    out_path = Path(args.output_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    for name in SCORE_FILES:
+        filepaths = [path / name for path in paths if (path / name).exists()]
+        if filepaths:
+            num_rows = merge_csvs(filepaths, out_path / name)
+            print(
+                f'Merged {num_rows} rows of {len(filepaths)} "{name}" files to "{out_path / name}"'
+            )
+
+    for name in TABLE_FILES:
+        filepaths = [path / name for path in paths if (path / name).exists()]
+        if filepaths:
+            num_rows = merge_tables(filepaths, out_path / name)
+            print(
+                f'Merged {num_rows} rows of {len(filepaths)} "{name}" files to "{out_path / name}"'
+            )
+
+    archives = [
+        (f"{path.name}/{archive.name[:-len('.tar.gz')]}", archive)
+        for path in paths
+        for archive in sorted(path.glob("*.tar.gz"))
+    ]
+    if archives:
+        num_members = merge_archives(archives, out_path / ARCHIVE_FILE)
+        print(
+            f"Combined {num_members} files of {len(archives)} archives into "
+            f'"{out_path / ARCHIVE_FILE}"'
+        )
+
+
+if __name__ == "__main__":
+    main()
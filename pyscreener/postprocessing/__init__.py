@@ -1,6 +1,14 @@
 from typing import List
 
-from .hist import histogram
+
+def __getattr__(name: str):
+    """import the plotting functions lazily, as they require the optional "viz" dependencies"""
+    if name == "histogram":
+        from .hist import histogram
+
+        return histogram
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def postprocess(postprocessing_options: List[str], **kwargs):
@@ -8,4 +16,6 @@ def postprocess(postprocessing_options: List[str], **kwargs):
         return
 
     if "hist" in postprocessing_options:
+        from .hist import histogram
+
         histogram(**kwargs)
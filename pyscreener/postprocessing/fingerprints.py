@@ -31,6 +31,82 @@ def smis_to_fps(
     return fps
 
 
+@ray.remote
+def smis_to_packed_fps(
+    smis: Iterable[str], radius: int = 2, length: int = 2048
+) -> Tuple[np.ndarray, np.ndarray]:
+    """calculate the bit-packed Morgan fingerprints of the SMILES strings
+
+    Returns
+    -------
+    np.ndarray
+        an `n x ceil(length / 8)` array of the packed fingerprint of each molecule. The fingerprint
+        of a molecule that could not be parsed is all zeros
+    np.ndarray
+        a boolean mask of the molecules that could be parsed
+    """
+    fps = []
+    valid = []
+    for smi in smis:
+        mol = Chem.MolFromSmiles(smi)
+        valid.append(mol is not None)
+        if mol is None:
+            fps.append(np.zeros(length, dtype=np.uint8))
+        else:
+            fp = Chem.GetMorganFingerprintAsBitVect(mol, radius, nBits=length, useChirality=True)
+            fps.append(np.array(fp, dtype=np.uint8))
+
+    return np.packbits(np.array(fps).reshape(-1, length), axis=1), np.array(valid, dtype=bool)
+
+
+def gen_packed_fps(
+    smis: Sequence[str], radius: int = 2, length: int = 2048, chunksize: int = 1024
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Generate the bit-packed feature matrix of the SMILES strings in parallel. Packing reduces
+    the memory footprint of the feature matrix eightfold, so the fingerprints of an entire library
+    may be held in memory. Use `unpack()` to recover the fingerprints of a subset of the molecules
+
+    Parameters
+    ----------
+    smis : Sequence[str]
+        the SMILES strings from which to generate fingerprints
+    radius : int, default=2
+        the radius of the fingerprints
+    length : int, default=2048
+        the length of the fingerprints
+    chunksize : int, default=1024
+        the number of SMILES strings to fingerprint in each task
+
+    Returns
+    -------
+    np.ndarray
+        an `n x ceil(length / 8)` array of the packed fingerprint of each molecule
+    np.ndarray
+        a boolean mask of the molecules that could be parsed
+    """
+    if not ray.is_initialized():
+        ray.init()
+
+    refs = [smis_to_packed_fps.remote(chunk, radius, length) for chunk in chunks(smis, chunksize)]
+
+    fpss = []
+    valids = []
+    for ref in tqdm(refs, desc="Calculating fingerprints", unit="chunk"):
+        fps, valid = ray.get(ref)
+        fpss.append(fps)
+        valids.append(valid)
+
+    if len(fpss) == 0:
+        return np.empty((0, (length + 7) // 8), dtype=np.uint8), np.empty(0, dtype=bool)
+
+    return np.concatenate(fpss), np.concatenate(valids)
+
+
+def unpack(fps: np.ndarray, length: int = 2048) -> np.ndarray:
+    """unpack bit-packed fingerprints of the given length into an `n x length` array"""
+    return np.unpackbits(fps, axis=1, count=length)
+
+
 def gen_fps_h5(
     smis: Sequence[str], path: str = ".", name: str = "fps", radius: int = 2, length: int = 2048
 ) -> Tuple[str, Set[int]]:
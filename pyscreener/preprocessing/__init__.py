@@ -0,0 +1,2 @@
+from .alerts import filter_alerts, iter_alert_filtered
+from .filter import filter_ligands, iter_filtered
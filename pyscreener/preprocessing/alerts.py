@@ -0,0 +1,238 @@
+"""This module contains functions for removing molecules that match substructure alerts (e.g., PAINS
+or Brenk structural alerts and custom SMARTS patterns) from inputs"""
+from collections import Counter
+import functools
+from itertools import tee
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from rdkit import Chem
+from rdkit.Chem.FilterCatalog import FilterCatalog, FilterCatalogParams
+
+from pyscreener.utils import chunks, imap
+
+CHUNKSIZE = 4096
+CATALOGS = ("PAINS", "BRENK")
+INVALID = "invalid SMILES"
+
+ELEMENT_RE = re.compile(r"\[?(?:#\d+|[A-Za-z]{1,2})\]?")
+
+
+class Rule(NamedTuple):
+    """a compiled custom substructure alert
+
+    Attributes
+    ----------
+    name : str
+        the name of the alert
+    query : Chem.Mol
+        the compiled SMARTS pattern of the alert
+    elements : frozenset[int]
+        the atomic numbers of the elements a molecule must contain to match the alert
+    num_atoms : int
+        the minimum number of atoms a molecule must contain to match the alert
+    """
+
+    name: str
+    query: Chem.Mol
+    elements: frozenset
+    num_atoms: int
+
+
+def read_smarts_file(filepath: Union[str, Path]) -> List[Tuple[str, str]]:
+    """read the SMARTS patterns from a file containing one pattern per line, optionally followed by
+    whitespace and the name of the pattern. Blank lines and lines starting with "#" are ignored.
+    If a pattern has no name, the pattern itself is used as its name
+
+    Returns
+    -------
+    List[Tuple[str, str]]
+        the (smarts, name) pairs of the file
+    """
+    smarts_names = []
+    with open(filepath) as fid:
+        for line in fid:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            smarts, *name = line.split(maxsplit=1)
+            smarts_names.append((smarts, name[0] if name else smarts))
+
+    return smarts_names
+
+
+def compile_rule(smarts: str, name: str) -> Rule:
+    """compile the SMARTS pattern into a Rule
+
+    Raises
+    ------
+    ValueError
+        if the SMARTS pattern is invalid
+    """
+    query = Chem.MolFromSmarts(smarts)
+    if query is None:
+        raise ValueError(f'Invalid SMARTS pattern for alert "{name}"! got: {smarts}')
+
+    elements = set()
+    for atom in query.GetAtoms():
+        # only plain element queries (e.g., "C", "n", "[Cl]", "[#7]") require an element. Other
+        # primitives that look like elements (e.g., "A", "[R]") have an atomic number of 0
+        if ELEMENT_RE.fullmatch(atom.GetSmarts()) is None or atom.GetAtomicNum() == 0:
+            continue
+        elements.add(atom.GetAtomicNum())
+
+    return Rule(name, query, frozenset(elements), query.GetNumAtoms())
+
+
+@functools.lru_cache(maxsize=None)
+def build_catalog(
+    catalogs: Tuple[str, ...] = CATALOGS, smarts_files: Tuple[str, ...] = ()
+) -> Tuple[Optional[FilterCatalog], List[Rule]]:
+    """build the RDKit FilterCatalog of the given catalogs and compile the rules of the SMARTS
+    files. The result is cached, so the patterns are only compiled once per process (i.e., once per
+    worker)
+
+    Parameters
+    ----------
+    catalogs : Tuple[str, ...], default=("PAINS", "BRENK")
+        the names of the RDKit FilterCatalogs to use, e.g., "PAINS", "PAINS_A", "BRENK", "NIH",
+        "ZINC", or "ALL"
+    smarts_files : Tuple[str, ...], default=()
+        the files containing custom SMARTS patterns. See `read_smarts_file()`
+
+    Returns
+    -------
+    catalog : Optional[FilterCatalog]
+        the filter catalog. None if no catalogs were specified
+    rules : List[Rule]
+        the rules of the custom SMARTS patterns
+    """
+    catalog = None
+    if catalogs:
+        params = FilterCatalogParams()
+        for name in catalogs:
+            try:
+                params.AddCatalog(getattr(FilterCatalogParams.FilterCatalogs, name.upper()))
+            except AttributeError:
+                raise ValueError(f'Unsupported filter catalog: "{name}"')
+        catalog = FilterCatalog(params)
+
+    rules = [
+        compile_rule(smarts, name)
+        for smarts_file in smarts_files
+        for smarts, name in read_smarts_file(smarts_file)
+    ]
+
+    return catalog, rules
+
+
+def first_alert(
+    mol: Chem.Mol, catalog: Optional[FilterCatalog], rules: Sequence[Rule]
+) -> Optional[str]:
+    """the name of the first substructure alert matched by the molecule, if any
+
+    The custom rules are checked first, and a rule is only matched against the molecule if the
+    molecule contains at least as many atoms as the rule and all of the elements it requires.
+    The filter catalog is checked last
+    """
+    elements = {atom.GetAtomicNum() for atom in mol.GetAtoms()}
+    num_atoms = mol.GetNumAtoms()
+
+    for rule in rules:
+        if rule.num_atoms > num_atoms or not rule.elements <= elements:
+            continue
+        if mol.HasSubstructMatch(rule.query):
+            return rule.name
+
+    if catalog is not None:
+        entry = catalog.GetFirstMatch(mol)
+        if entry is not None:
+            return entry.GetDescription()
+
+    return None
+
+
+def alert_chunk(
+    smis: Sequence[str], catalogs: Tuple[str, ...] = CATALOGS, smarts_files: Tuple[str, ...] = ()
+) -> List[Optional[str]]:
+    """the name of the first substructure alert matched by each SMILES string. None if a molecule
+    matches no alerts. Invalid SMILES strings are assigned `INVALID`"""
+    catalog, rules = build_catalog(catalogs, smarts_files)
+
+    alerts = []
+    for smi in smis:
+        mol = Chem.MolFromSmiles(smi)
+        alerts.append(INVALID if mol is None else first_alert(mol, catalog, rules))
+
+    return alerts
+
+
+def iter_alert_filtered(
+    smis: Iterable[str],
+    catalogs: Sequence[str] = CATALOGS,
+    smarts_files: Sequence[Union[str, Path]] = (),
+    ncpu: int = 1,
+    chunksize: int = CHUNKSIZE,
+    counts: Optional[Counter] = None,
+) -> Iterator[str]:
+    """lazily remove the molecules that match any substructure alerts from a stream of SMILES
+    strings in parallel chunks, yielding the remaining SMILES strings in the order of the input
+
+    Parameters
+    ----------
+    smis : Iterable[str]
+        the SMILES strings to filter, e.g., a lazy `LigandSupply`
+    catalogs : Sequence[str], default=("PAINS", "BRENK")
+        the names of the RDKit FilterCatalogs to use
+    smarts_files : Sequence[Union[str, Path]], default=()
+        the files containing custom SMARTS patterns. See `read_smarts_file()`
+    ncpu : int, default=1
+        the number of processes (or ray tasks) over which to filter the molecules
+    chunksize : int, default=CHUNKSIZE
+        the number of molecules to filter in each chunk
+    counts : Optional[Counter], default=None
+        a counter which, if supplied, will be updated in-place with the number of molecules
+        rejected by each alert (by name) as the stream is consumed
+
+    Yields
+    ------
+    str
+        the SMILES string of each molecule that matches no alerts
+    """
+    catalogs = tuple(catalogs)
+    smarts_files = tuple(str(smarts_file) for smarts_file in smarts_files)
+    build_catalog(catalogs, smarts_files)
+
+    smiss, smiss_ = tee(chunks(smis, chunksize))
+    argss = ((smis_chunk, catalogs, smarts_files) for smis_chunk in smiss_)
+    alertss = imap(alert_chunk, argss, ncpu) if ncpu > 1 else (alert_chunk(*a) for a in argss)
+
+    for smis_chunk, alerts in zip(smiss, alertss):
+        if counts is not None:
+            counts.update(alert for alert in alerts if alert is not None)
+
+        yield from (smi for smi, alert in zip(smis_chunk, alerts) if alert is None)
+
+
+def filter_alerts(
+    smis: Iterable[str],
+    catalogs: Sequence[str] = CATALOGS,
+    smarts_files: Sequence[Union[str, Path]] = (),
+    ncpu: int = 1,
+) -> Tuple[List[str], Counter]:
+    """remove the molecules that match any substructure alerts from the SMILES strings. See
+    `iter_alert_filtered()` for more details
+
+    Returns
+    -------
+    smis_filtered : List[str]
+        the SMILES strings of the molecules that match no alerts
+    counts : Counter
+        the number of molecules rejected by each alert
+    """
+    counts = Counter()
+    smis_filtered = list(iter_alert_filtered(smis, catalogs, smarts_files, ncpu, counts=counts))
+
+    return smis_filtered, counts
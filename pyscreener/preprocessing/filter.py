@@ -1,17 +1,22 @@
 """This module contains functions for filtering molecules from inputs based on a desired set of
 properties"""
 import csv
-from pathlib import Path
-from typing import List, Optional, Sequence, Tuple
+from itertools import tee
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from rdkit import Chem
-from rdkit.Chem import QED
+from rdkit.Chem import Crippen, Descriptors
 from tqdm import tqdm
 
+from pyscreener.utils import chunks, imap
+from pyscreener.utils.compression import open_file, strip_compression
+
+CHUNKSIZE = 4096
+
 
 def filter_ligands(ligands: str, **kwargs) -> Tuple[List[str], Optional[List[str]]]:
     if isinstance(ligands, str):
-        p_ligand = Path(ligands)
+        p_ligand = strip_compression(ligands)
 
         if p_ligand.suffix == ".csv":
             return filter_csv(ligands, **kwargs)
@@ -29,9 +34,9 @@ def filter_ligands(ligands: str, **kwargs) -> Tuple[List[str], Optional[List[str
 def filter_mols(
     mols: List[Chem.Mol],
     names: Optional[List[str]] = None,
-    max_atoms: int = 1000,
-    max_weight: float = 10000.0,
-    max_logP: float = 10.0,
+    max_atoms: Optional[int] = 1000,
+    max_weight: Optional[float] = 10000.0,
+    max_logP: Optional[float] = 10.0,
     **kwargs,
 ) -> Tuple[List[str], Optional[List[str]]]:
     """Filter a list of molecules according to input critera
@@ -42,9 +47,9 @@ def filter_mols(
         the molecules to filter
     names : Optional[List[str]] (Default = None)
         a parallel list of names corresponding to each molecule
-    max_atoms : int (Default = 1000)
-    max_weight : float (Default = 10000)
-    max_logP : float (Default = 10)
+    max_atoms : Optional[int] (Default = 1000)
+    max_weight : Optional[float] (Default = 10000)
+    max_logP : Optional[float] (Default = 10)
 
     Returns
     -------
@@ -54,47 +59,41 @@ def filter_mols(
         the names corresponding to the filtered molecules. None, if no names
         were originally supplied
     """
-    names = names or []
-
     smis_filtered = []
-    names_filtered = []
-
-    if names:
-        for mol, name in tqdm(zip(mols, names), total=len(mols), desc="Filtering mols", unit="mol"):
-            if mol.GetNumHeavyAtoms() > max_atoms:
-                continue
+    names_filtered = [] if names else None
 
-            props = QED.properties(mol)
-            if props.MW > max_weight:
-                continue
-            if props.ALOGP > max_logP:
-                continue
+    names = names or [None] * len(mols)
+    for mol, name in tqdm(zip(mols, names), total=len(mols), desc="Filtering mols", unit="mol"):
+        if mol is None or not check_mol(mol, max_atoms, max_weight, max_logP):
+            continue
 
-            smis_filtered.append(mol_to_smi(mol))
+        smis_filtered.append(mol_to_smi(mol))
+        if names_filtered is not None:
             names_filtered.append(name)
-    else:
-        names_filtered = None
-        for mol in tqdm(mols, total=len(mols), desc="Filtering mols", unit="mol"):
-            if mol.GetNumHeavyAtoms() > max_atoms:
-                continue
-
-            props = QED.properties(mol)
-            if props.MW > max_weight:
-                continue
-            if props.ALOGP > max_logP:
-                continue
-
-            smis_filtered.append(mol_to_smi(mol))
 
     return smis_filtered, names_filtered
 
 
 def filter_smis(
-    smis: List[str], names: Optional[List[str]] = None, **kwargs
+    smis: List[str],
+    names: Optional[List[str]] = None,
+    max_atoms: Optional[int] = 1000,
+    max_weight: Optional[float] = 10000.0,
+    max_logP: Optional[float] = 10.0,
+    ncpu: int = 1,
+    **kwargs,
 ) -> Tuple[List[str], Optional[List[str]]]:
-    mols = [mol_from_smi(smi) for smi in tqdm(smis, desc="Reading in mols", unit="mol")]
+    """Filter a list of SMILES strings according to input criteria in parallel chunks. See
+    `filter_mols()` for more details"""
+    criteria = dict(max_atoms=max_atoms, max_weight=max_weight, max_logP=max_logP)
+    argss = ((smis_chunk, criteria) for smis_chunk in chunks(smis, CHUNKSIZE))
+    masks = imap(filter_chunk, argss, ncpu) if ncpu > 1 else (filter_chunk(*a) for a in argss)
 
-    return filter_mols(mols, names, **kwargs)
+    mask = [m for mask in tqdm(masks, desc="Filtering mols", unit="chunk") for m in mask]
+    smis_filtered = [smi for smi, m in zip(smis, mask) if m]
+    names_filtered = [name for name, m in zip(names, mask) if m] if names else None
+
+    return smis_filtered, names_filtered
 
 
 def filter_csv(
@@ -104,55 +103,164 @@ def filter_csv(
     name_col: Optional[int] = None,
     **kwargs,
 ) -> Tuple[List[str], Optional[List[str]]]:
-    with open(csvfile) as fid:
+    with open_file(csvfile) as fid:
         reader = csv.reader(fid)
         if title_line:
             next(reader)
 
-        reader = tqdm(reader, desc="Reading in mols", unit="mol")
-        if name_col is None:
-            mols = [mol_from_smi(row[smiles_col]) for row in reader]
-            names = None
-        else:
-            mols_names = [(mol_from_smi(row[smiles_col]), row[name_col]) for row in reader]
-            mols, names = zip(*mols_names)
+        rows = [row for row in tqdm(reader, desc="Reading in mols", unit="mol") if row]
 
-    return filter_mols(mols, names, **kwargs)
+    smis = [row[smiles_col] for row in rows]
+    names = [row[name_col] for row in rows] if name_col is not None else None
+
+    return filter_smis(smis, names, **kwargs)
 
 
 def filter_supply(
-    supplyfile: str, id_prop_name: Optional[str], **kwargs
+    supplyfile: str, id_prop_name: Optional[str] = None, **kwargs
 ) -> Tuple[List[str], Optional[List[str]]]:
-    p_supply = Path(supplyfile)
-    if p_supply.suffix == ".sdf":
-        supply = Chem.SDMolSupplier(supplyfile)
-    elif p_supply.suffix == ".smi":
-        supply = Chem.SmilesMolSupplier(supplyfile)
-    else:
+    p_supply = strip_compression(supplyfile)
+    if p_supply.suffix not in {".sdf", ".smi"}:
         raise ValueError(f'input file "{supplyfile}" does not have .sdf or .smi extension')
 
-    supply = tqdm(supply, desc="Reading in mols", unit="mol")
-    mols = []
-    names = None
+    with open_file(supplyfile, "rb") as fid:
+        if p_supply.suffix == ".sdf":
+            supply = Chem.ForwardSDMolSupplier(fid)
+        else:
+            supply = mols_from_smi(fid)
+
+        supply = tqdm(supply, desc="Reading in mols", unit="mol")
+        mols = []
+        names = None
 
-    if id_prop_name:
-        names = []
-        for mol in supply:
-            if mol is None:
-                continue
+        if id_prop_name:
+            names = []
+            for mol in supply:
+                if mol is None:
+                    continue
 
-            mols.append(mol_to_smi(mol))
-            names.append(mol.GetProp(id_prop_name))
-    else:
-        for mol in supply:
-            if mol is None:
-                continue
+                mols.append(mol)
+                names.append(mol.GetProp(id_prop_name))
+        else:
+            for mol in supply:
+                if mol is None:
+                    continue
 
-            mols.append(mol_to_smi(mol))
+                mols.append(mol)
 
     return filter_mols(mols, names, **kwargs)
 
 
+def iter_filtered(
+    smis: Iterable[str],
+    max_atoms: Optional[int] = None,
+    max_weight: Optional[float] = None,
+    max_logP: Optional[float] = None,
+    ncpu: int = 1,
+    chunksize: int = CHUNKSIZE,
+) -> Iterator[str]:
+    """lazily filter a stream of SMILES strings in parallel chunks, yielding the SMILES strings
+    that pass all of the active filters in the order of the input
+
+    Each chunk is filtered in a separate process (or ray task, if ray is initialized) as soon as
+    it is read, so the survivors may be streamed directly into a docking screen, e.g., via
+    `VirtualScreen.stream()`. Filters with a value of None are inactive, and the descriptors they
+    require are never calculated. See `check_smi()` for more details
+
+    Parameters
+    ----------
+    smis : Iterable[str]
+        the SMILES strings to filter, e.g., a lazy `LigandSupply`
+    max_atoms : Optional[int], default=None
+        the maximum number of heavy atoms
+    max_weight : Optional[float], default=None
+        the maximum molecular weight
+    max_logP : Optional[float], default=None
+        the maximum Crippen logP
+    ncpu : int, default=1
+        the number of processes over which to filter the molecules
+    chunksize : int, default=CHUNKSIZE
+        the number of molecules to filter in each chunk
+
+    Yields
+    ------
+    str
+        the SMILES string of each molecule that passes the filters
+    """
+    criteria = dict(max_atoms=max_atoms, max_weight=max_weight, max_logP=max_logP)
+
+    smiss, smiss_ = tee(chunks(smis, chunksize))
+    argss = ((smis_chunk, criteria) for smis_chunk in smiss_)
+    masks = imap(filter_chunk, argss, ncpu) if ncpu > 1 else (filter_chunk(*a) for a in argss)
+
+    for smis_chunk, mask in zip(smiss, masks):
+        yield from (smi for smi, m in zip(smis_chunk, mask) if m)
+
+
+def filter_chunk(smis: Sequence[str], criteria: Dict[str, Any]) -> List[bool]:
+    """whether each SMILES string passes the filters specified by `criteria`"""
+    return [check_smi(smi, **criteria) for smi in smis]
+
+
+def check_smi(
+    smi: str,
+    max_atoms: Optional[int] = None,
+    max_weight: Optional[float] = None,
+    max_logP: Optional[float] = None,
+) -> bool:
+    """whether the molecule corresponding to the SMILES string passes all of the active filters
+
+    The filters are applied from cheapest to most expensive and evaluation stops at the first
+    failure: the heavy atom count is checked on the unsanitized molecule before it is sanitized,
+    and the molecular weight and logP are only calculated if their respective filters are active.
+    Invalid SMILES strings never pass
+    """
+    mol = Chem.MolFromSmiles(smi, sanitize=False)
+    if mol is None:
+        return False
+    if max_atoms is not None and mol.GetNumHeavyAtoms() > max_atoms:
+        return False
+    if Chem.SanitizeMol(mol, catchErrors=True) != Chem.SanitizeFlags.SANITIZE_NONE:
+        return False
+
+    return check_mol(mol, None, max_weight, max_logP)
+
+
+def check_mol(
+    mol: Chem.Mol,
+    max_atoms: Optional[int] = None,
+    max_weight: Optional[float] = None,
+    max_logP: Optional[float] = None,
+) -> bool:
+    """whether the (sanitized) molecule passes all of the active filters. See `check_smi()`"""
+    if max_atoms is not None and mol.GetNumHeavyAtoms() > max_atoms:
+        return False
+    if max_weight is not None and Descriptors.MolWt(mol) > max_weight:
+        return False
+    if max_logP is not None and Crippen.MolLogP(mol) > max_logP:
+        return False
+
+    return True
+
+
+def mols_from_smi(fid, title_line: bool = True) -> Iterator[Optional[Chem.Mol]]:
+    """lazily parse the molecules of a SMI file from its (binary) file object. The name of each
+    molecule is set from the second column of the file, if present"""
+    if title_line:
+        fid.readline()
+
+    for line in fid:
+        tokens = line.split()
+        if not tokens:
+            continue
+
+        mol = mol_from_smi(tokens[0].decode())
+        if mol is not None and len(tokens) > 1:
+            mol.SetProp("_Name", tokens[1].decode())
+
+        yield mol
+
+
 def mol_to_smi(mol: Chem.Mol) -> str:
     return Chem.MolToSmiles(mol)
 
@@ -0,0 +1,428 @@
+"""This module contains a long-running docking service and the local HTTP API of `pyscreener serve`
+
+A DockingService holds a single DockingVirtualScreen for its lifetime, so the receptors are only
+prepared once and the ray workers stay warm between requests. Concurrent requests are
+micro-batched: the ligands of all requests that arrive within a short dispatch window are set up
+and submitted together, and each request is answered as soon as its own ligands are docked.
+Scores are cached by canonical SMILES, so repeated ligands (e.g., from a generative model) are
+only docked once.
+
+The API is served over TCP or a Unix socket:
+
+* `POST /score` with a JSON body `{"smiles": [...]}` returns `{"smiles": [...], "scores": [...]}`,
+  where the score of an invalid ligand or failed simulation is `null`
+* `GET /health` returns the status and statistics of the service"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import os
+import queue
+import socket
+from socketserver import ThreadingMixIn, UnixStreamServer
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from rdkit import Chem
+
+from pyscreener.docking import DockingVirtualScreen, Result
+
+HOST = "127.0.0.1"
+PORT = 8123
+MAX_WAIT = 0.05
+CACHE_SIZE = 1_000_000
+WARMUP_SMILES = "C"
+
+
+def canonicalize(smi: str) -> Optional[str]:
+    """the canonical SMILES string of the molecule. None if it could not be parsed"""
+    mol = Chem.MolFromSmiles(smi)
+
+    return Chem.MolToSmiles(mol) if mol is not None else None
+
+
+class ResultCache:
+    """A ResultCache is a thread-safe LRU cache of the score of each ligand
+
+    Parameters
+    ----------
+    maxsize : int, default=CACHE_SIZE
+        the maximum number of ligands to cache. If 0, nothing is cached
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.scores: "OrderedDict[str, float]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get(self, smi: str) -> Optional[float]:
+        with self.lock:
+            score = self.scores.get(smi)
+            if score is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.scores.move_to_end(smi)
+
+            return score
+
+    def put(self, smi: str, score: float):
+        if self.maxsize == 0:
+            return
+
+        with self.lock:
+            self.scores[smi] = score
+            self.scores.move_to_end(smi)
+            if len(self.scores) > self.maxsize:
+                self.scores.popitem(last=False)
+
+
+class DockingService:
+    """A DockingService scores ligands with a single virtual screen, micro-batching the ligands of
+    concurrent requests into dispatch windows
+
+    Parameters
+    ----------
+    virtual_screen : DockingVirtualScreen
+        the virtual screen with which to dock ligands
+    max_wait : float, default=MAX_WAIT
+        the maximum amount of time (in seconds) to wait for further ligands after the first ligand
+        of a dispatch window arrives
+    max_window : Optional[int], default=None
+        the maximum number of ligands in each dispatch window. If None, use the default window of
+        the virtual screen
+    cache_size : int, default=CACHE_SIZE
+        the maximum number of ligand scores to cache
+    """
+
+    def __init__(
+        self,
+        virtual_screen: DockingVirtualScreen,
+        max_wait: float = MAX_WAIT,
+        max_window: Optional[int] = None,
+        cache_size: int = CACHE_SIZE,
+    ):
+        self.virtual_screen = virtual_screen
+        self.max_wait = max_wait
+        self.max_window = max_window or virtual_screen.default_window()
+        self.cache = ResultCache(cache_size)
+
+        self.queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.gatherer = ThreadPoolExecutor(thread_name_prefix="gather")
+        self.dispatcher = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.dispatcher.start()
+
+        self.num_requests = 0
+        self.num_windows = 0
+        self.num_dispatched = 0
+
+    def __enter__(self) -> "DockingService":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """stop dispatching ligands. Windows that have already been dispatched are completed"""
+        self.queue.put(None)
+        self.dispatcher.join()
+        self.gatherer.shutdown(wait=True)
+
+    def warm_up(self):
+        """dock a trivial ligand once on every concurrent slot of the ray cluster so that the ray
+        workers are started (and their imports loaded) before the first request arrives"""
+        vs = self.virtual_screen
+        simss = [vs.setup_ligand(WARMUP_SMILES, f"warmup_{i}") for i in range(vs.concurrency())]
+        for refs in vs.submit_all(simss):
+            vs.gather(refs)
+
+    def submit(self, smis: Sequence[str]) -> List[Future]:
+        """submit ligands to be scored
+
+        Returns
+        -------
+        List[Future]
+            a future for the score of each ligand. The score of an invalid ligand or a failed
+            simulation is None
+        """
+        can_smis = [canonicalize(smi) for smi in smis]
+
+        futures = []
+        with self.lock:
+            self.num_requests += 1
+            for can_smi in can_smis:
+                if can_smi is None:
+                    futures.append(self.resolved(None))
+                    continue
+
+                score = self.cache.get(can_smi)
+                if score is not None:
+                    futures.append(self.resolved(score))
+                    continue
+
+                future = self.pending.get(can_smi)
+                if future is None:
+                    future = Future()
+                    self.pending[can_smi] = future
+                    self.queue.put((can_smi, future))
+                futures.append(future)
+
+        return futures
+
+    def score(self, smis: Sequence[str], timeout: Optional[float] = None) -> List[Optional[float]]:
+        """score the ligands, blocking until each has been scored"""
+        return [future.result(timeout) for future in self.submit(smis)]
+
+    @staticmethod
+    def resolved(score: Optional[float]) -> Future:
+        future = Future()
+        future.set_result(score)
+
+        return future
+
+    def dispatch_loop(self):
+        """collect queued ligands into windows of at most `max_window` ligands, waiting at most
+        `max_wait` seconds after the first ligand of each window, and dispatch each window"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            window = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(window) < self.max_window:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                window.append(item)
+
+            self.dispatch(window)
+            if stop:
+                return
+
+    def dispatch(self, window: Sequence[Tuple[str, Future]]):
+        """submit the simulations of a window of ligands and gather their results in the
+        background"""
+        vs = self.virtual_screen
+        smis = [smi for smi, _ in window]
+        try:
+            if vs.auto_ncpu:
+                vs.calibrate(smis[: vs.calibration_size])
+
+            simss = [
+                vs.setup_ligand(smi, name) for smi, name in zip(smis, vs.name_ligands(len(smis)))
+            ]
+            self.num_dispatched += len(smis)
+            self.num_windows += 1
+            refss = vs.submit_all(simss)
+        except Exception as e:
+            for smi, future in window:
+                self.fail(smi, future, e)
+            return
+
+        for (smi, future), refs in zip(window, refss):
+            self.gatherer.submit(self.complete, smi, future, refs)
+
+    def complete(self, smi: str, future: Future, refs):
+        """gather the results of a single ligand, cache its score, and resolve its future"""
+        try:
+            results = self.virtual_screen.gather(refs)
+        except Exception as e:
+            self.fail(smi, future, e)
+            return
+
+        score = self.reduce(results)
+        if all(result is not None for result in results) and score is not None:
+            self.cache.put(smi, score)
+
+        with self.lock:
+            self.pending.pop(smi, None)
+        future.set_result(score)
+
+    def fail(self, smi: str, future: Future, e: Exception):
+        with self.lock:
+            self.pending.pop(smi, None)
+        future.set_exception(e)
+
+    def reduce(self, results: Sequence[Optional[Result]]) -> Optional[float]:
+        """the score of a ligand given its results against each receptor"""
+        score = float(self.virtual_screen.reduce([results], None)[0])
+
+        return score if not math.isnan(score) else None
+
+    def stats(self) -> Dict:
+        """the statistics of the service"""
+        return {
+            "status": "ok",
+            "receptors": len(self.virtual_screen.simulation_templates),
+            "requests": self.num_requests,
+            "windows": self.num_windows,
+            "dispatched": self.num_dispatched,
+            "pending": len(self.pending),
+            "cache": {
+                "size": len(self.cache),
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+            },
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """the request handler of the local HTTP API. The server must have a `service` attribute"""
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": f'Invalid path! got: "{self.path}"'})
+            return
+
+        self.send_json(200, self.server.service.stats())
+
+    def do_POST(self):
+        if self.path != "/score":
+            self.send_json(404, {"error": f'Invalid path! got: "{self.path}"'})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            smis = body["smiles"]
+            if not isinstance(smis, list) or not all(isinstance(smi, str) for smi in smis):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"error": 'Request body must be a JSON object {"smiles": [...]}'})
+            return
+
+        try:
+            scores = self.server.service.score(smis)
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+
+        self.send_json(200, {"smiles": smis, "scores": scores})
+
+    def send_json(self, code: int, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", 0) > 0:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+
+        return request, ("local", 0)
+
+
+def make_server(
+    service: DockingService,
+    host: str = HOST,
+    port: int = PORT,
+    socket_path: Optional[str] = None,
+    verbose: int = 0,
+) -> Union[ThreadingHTTPServer, UnixHTTPServer]:
+    """make a server for the local HTTP API of the service on the given host and port or, if
+    `socket_path` is given, the Unix socket at that path. Call `serve_forever()` to start it"""
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+
+    server.service = service
+    server.verbose = verbose
+
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class Client:
+    """A Client scores ligands with a running `pyscreener serve` process
+
+    Parameters
+    ----------
+    host : str, default=HOST
+        the host of the server
+    port : int, default=PORT
+        the port of the server
+    socket_path : Optional[str], default=None
+        the path of the Unix socket of the server. If given, `host` and `port` are ignored
+    timeout : Optional[float], default=None
+        the timeout (in seconds) of each request
+    """
+
+    def __init__(
+        self,
+        host: str = HOST,
+        port: int = PORT,
+        socket_path: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def score(self, smis: Sequence[str]) -> List[Optional[float]]:
+        """the score of each ligand. None for an invalid ligand or a failed simulation"""
+        return self.request("POST", "/score", {"smiles": list(smis)})["scores"]
+
+    def health(self) -> Dict:
+        """the status and statistics of the server"""
+        return self.request("GET", "/health")
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        if self.socket_path is not None:
+            conn = UnixHTTPConnection(self.socket_path, self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        try:
+            data = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if data is not None else {}
+            conn.request(method, path, data, headers)
+            resp = conn.getresponse()
+            obj = json.loads(resp.read())
+        finally:
+            conn.close()
+
+        if resp.status != 200:
+            raise RuntimeError(f"Request failed with status {resp.status}: {obj.get('error')}")
+
+        return obj
@@ -1,14 +1,33 @@
 from __future__ import annotations
 
 import csv
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+import functools
+import io
+from itertools import islice
+import operator
+import os
 from pathlib import Path
-from typing import Optional, Union
+from typing import Mapping, Optional, Union
 
+import numpy as np
 from openbabel import pybel
 from rdkit.Chem import AllChem as Chem
 
-from pyscreener.utils import FileFormat
+from pyscreener.utils import FileFormat, chunks, imap
+from pyscreener.utils.compression import (
+    compression,
+    iter_record_chunks,
+    open_file,
+    strip_compression,
+)
+from pyscreener.utils.index import (
+    OffsetIndex,
+    format_reference,
+    read_records,
+    shard_byte_range,
+    split_byte_ranges,
+)
 
 
 class LigandSupply(Iterable):
@@ -31,8 +50,8 @@ class LigandSupply(Iterable):
         an output MOL file for each supplied molecule. NOTE: this will ablate any input geometries.
     title_line : bool
         whether there is a title line in CSV or SMI files
-    smiles_col : int
-        the column containing the SMILES strings in CSV or SMI files
+    smiles_col : Union[int, str]
+        the column containing the SMILES strings in CSV, SMI, Parquet, or Arrow IPC files
     name_col : int
         the column containing the molecule name in CSV or SMI files
     id_property : Optional[str]
@@ -40,11 +59,26 @@ class LigandSupply(Iterable):
     path : Optional[Path]
         The path under which to output all prepared files. If None, prepare all input files in the
         same directory as their parent file.
+    lazy : bool
+        whether the ligands are lazily read from the input files upon iteration rather than being
+        parsed into memory upon initialization
+    ncpu : int
+        the number of processes over which to parse SDF and SMI files and optimize molecules
+    filters : Optional[Mapping[str, tuple[Optional[float], Optional[float]]]]
+        the allowed (inclusive) range of each property column in Parquet or Arrow IPC files
+    shard : Optional[tuple[int, int]]
+        the index of the shard to supply and the total number of shards
+    single_file : bool
+        whether to refer to the records of a single SDF file rather than writing one file per
+        molecule when using input 3D geometries or optimizing molecules
 
     Parameters
     ----------
     filepaths : Iterable[Union[str, Path]]
-        the chemical supply files containing the molecules
+        the chemical supply files containing the molecules. CSV, SMI, and SDF files may be
+        compressed with gzip (".gz"), bzip2 (".bz2"), xz (".xz"), or zstd (".zst", requires the
+        `zstandard` package), in which case they are decompressed as a stream while reading and
+        their format is determined from the inner suffix (e.g., "ligands.smi.gz" is a SMI file)
     formats : Optional[Iterable[Union[str, FileFormat]]], default=None
         the corresponding filetype for each input file. Can be supplied as either a string or a
         Filetype for each file. E.g., for a csv file, filetype can be "csv" or FileFormat.CSV.
@@ -59,8 +93,10 @@ class LigandSupply(Iterable):
         an output MOL file for each supplied molecule. NOTE: this will ablate any input geometries.
     title_line : bool, default=True
         whether there is a title line in CSV or SMI files
-    smiles_col : int, default=0
-        the column containing the SMILES strings in CSV or SMI files
+    smiles_col : Union[int, str], default=0
+        the column containing the SMILES strings in CSV or SMI files. For Parquet or Arrow IPC
+        (Feather) files, this may also be the name of the column. Only this column is read from
+        these files, via a memory-mapped view of the file in batches of records.
     name_col : int, default=1
         the column containing the molecule name in CSV or SMI files
     id_property : Optional[str], default=None
@@ -68,8 +104,49 @@ class LigandSupply(Iterable):
     path : Optional[str], default=None
         The path under which to output all prepared files. If None, prepare all input files in the
         same directory as their parent file and all SMILES strings in the current directory.
+    lazy : bool, default=False
+        whether to lazily stream the ligands from the input files. If True, the `ligands`
+        attribute will be None, and the supply is primarily meant to be iterated over (possibly in
+        chunks via `iter_chunks()`.) Ligands are read directly from CSV and SMI files without any
+        RDKit parsing and records of SDF files are parsed one-by-one. This is useful for screening
+        large libraries, as docking may begin immediately and memory usage remains constant. If
+        all input files are CSV or SMI files, `len()`, indexing, and slicing of a lazy supply are
+        supported via an on-disk `OffsetIndex` of each file.
+    ncpu : int, default=1
+        the number of processes over which to parse SDF and SMI files and optimize molecules. If
+        greater than 1, each file is split into record-aligned byte ranges that are parsed in
+        parallel (preserving the order of the input) using ray tasks if ray is initialized or a
+        process pool otherwise.
+    single_file : bool, default=False
+        if `use_3d` is True, refer to each record of an input SDF file in place rather than
+        splitting the file into one file per molecule. If `optimize` is True, write all of the
+        optimized geometries to a single multi-record SDF file rather than one MOL file per
+        molecule. In either case, the ligands of the supply are references of the form
+        "<filepath>#<i>" to records of the SDF file that are read via an on-disk `OffsetIndex`.
+    filters : Optional[Mapping[str, tuple[Optional[float], Optional[float]]]], default=None
+        a mapping from the name of a (precomputed) property column in Parquet or Arrow IPC files,
+        e.g., "MW" or "logP", to its allowed (inclusive) range, where a bound of None is unbounded.
+        These predicates are pushed down into the reader, so rows outside of the ranges are
+        skipped before any parsing (and, for Parquet files, entire row groups may be skipped via
+        their statistics.) Requires the `pyarrow` package.
+    shard : Optional[tuple[int, int]], default=None
+        a tuple `(i, n)` specifying that only the `i`-th of `n` disjoint shards (`0 <= i < n`) of
+        the ligands should be supplied upon iteration, e.g., for independent batch array jobs.
+        Uncompressed CSV, SMI, and SDF files (without `use_3d`) are partitioned into contiguous,
+        record-aligned ranges of bytes determined solely by the size of each file, and only the
+        range of the given shard is read. The ligands of all other inputs are partitioned in a
+        round-robin fashion, i.e., each shard contains every `n`-th ligand of each input starting
+        from the `i`-th. `len()` and indexing are unaffected. Only supported for lazy supplies.
+
+    Raises
+    ------
+    ValueError
+        if a shard is specified for a non-lazy supply or the shard index is out of range
     """
 
+    CHUNKSIZE = 1024
+    RANGE_SIZE = 1 << 24
+
     def __init__(
         self,
         filepaths: Iterable[Union[str, Path]],
@@ -78,10 +155,15 @@ class LigandSupply(Iterable):
         use_3d: bool = False,
         optimize: bool = False,
         title_line: bool = True,
-        smiles_col: int = 0,
+        smiles_col: Union[int, str] = 0,
         name_col: int = 1,
         id_property: Optional[str] = None,
         path: Optional[str] = None,
+        lazy: bool = False,
+        ncpu: int = 1,
+        single_file: bool = False,
+        filters: Optional[Mapping[str, tuple[Optional[float], Optional[float]]]] = None,
+        shard: Optional[tuple[int, int]] = None,
     ):
         self.filepaths = [Path(filepath) for filepath in filepaths]
         if formats is not None:
@@ -100,6 +182,126 @@ class LigandSupply(Iterable):
         self.id_property = id_property
         self.path = Path(path) if path is not None else None
 
+        self.smis = smis
+        self.lazy = lazy
+        self.ncpu = ncpu
+        self.single_file = single_file
+        self.filters = filters
+
+        if shard is not None:
+            if not lazy:
+                raise ValueError("Sharding is only supported for lazy LigandSupplys!")
+            if not 0 <= shard[0] < shard[1]:
+                raise ValueError(
+                    f"Shard index must be in the range [0, {shard[1]})! got: {shard[0]}"
+                )
+        self.shard = shard
+
+        self.ligands = None if self.lazy else self.get_ligands()
+        self.__indices = None
+
+    def __len__(self):
+        if self.ligands is None:
+            return int(self.bounds[-1]) + len(self.smis or [])
+
+        return len(self.ligands)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.ligands is None:
+            return self.iter_ligands()
+
+        return iter(self.ligands)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[str, list[str]]:
+        if self.ligands is not None:
+            return self.ligands[idx]
+
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+
+            ligands = []
+            for k, (index, fmt) in enumerate(zip(self.indices, self.formats)):
+                i = max(start - self.bounds[k], 0)
+                j = min(stop - self.bounds[k], len(index))
+                if i < j:
+                    ligands.extend(
+                        LigandSupply.parse_record(r, fmt, self.smiles_col) for r in index[i:j]
+                    )
+            if self.smis is not None:
+                i = max(start - self.bounds[-1], 0)
+                j = max(stop - self.bounds[-1], 0)
+                ligands.extend(self.smis[i:j])
+
+            return ligands
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"index {idx} out of range for LigandSupply of length {len(self)}")
+
+        k = np.searchsorted(self.bounds, idx, "right") - 1
+        if k == len(self.indices):
+            return self.smis[idx - self.bounds[-1]]
+
+        record = self.indices[k][idx - self.bounds[k]]
+
+        return LigandSupply.parse_record(record, self.formats[k], self.smiles_col)
+
+    @property
+    def smiles(self) -> bool:
+        """whether the ligands of this supply are SMILES strings rather than files (or references
+        to records of files) containing the molecules"""
+        files = any(fmt in (FileFormat.SDF, FileFormat.FILE) for fmt in self.formats)
+
+        return not (self.optimize or self.use_3d and files)
+
+    @property
+    def indices(self) -> list[OffsetIndex]:
+        """the OffsetIndex of each input file of a lazy supply, built upon first access
+
+        Raises
+        ------
+        TypeError
+            if the supply is to be optimized or contains any input files that are not uncompressed
+            CSV or SMI files
+        """
+        if self.__indices is None:
+            if self.optimize:
+                raise TypeError("a lazy LigandSupply with optimize=True does not support indexing")
+
+            for filepath, fmt in zip(self.filepaths, self.formats):
+                if fmt not in (FileFormat.CSV, FileFormat.SMI):
+                    raise TypeError(
+                        "a lazy LigandSupply only supports indexing of CSV and SMI files! "
+                        f'got: "{filepath}"'
+                    )
+                if compression(filepath) is not None:
+                    raise TypeError(
+                        "a lazy LigandSupply does not support indexing of compressed files! "
+                        f'got: "{filepath}"'
+                    )
+
+            if self.smis is not None:
+                self.smis = list(self.smis)
+
+            self.__indices = [OffsetIndex(filepath, self.title_line) for filepath in self.filepaths]
+            self.__bounds = np.cumsum([0, *(len(index) for index in self.__indices)])
+
+        return self.__indices
+
+    @property
+    def bounds(self) -> np.ndarray:
+        """the global index of the first record in each input file of a lazy supply followed by
+        the total number of records in the input files"""
+        if self.__indices is None:
+            _ = self.indices
+
+        return self.__bounds
+
+    def get_ligands(self) -> list[str]:
+        """read all of the ligands from the input files and SMILES strings into a list"""
         ligands = []
         for filepath, filetype in zip(self.filepaths, self.formats):
             if filetype == FileFormat.CSV:
@@ -111,44 +313,195 @@ class LigandSupply(Iterable):
                         self.id_property,
                         self.optimize,
                         self.path,
+                        self.ncpu,
+                        self.single_file,
                     )
                 )
             elif filetype == FileFormat.FILE:
                 ligands.extend(
                     LigandSupply.get_ligands_from_file(
-                        filepath, self.use_3d, self.optimize, self.path
+                        filepath, self.use_3d, self.optimize, self.path, self.ncpu, self.single_file
                     )
                 )
             elif filetype == FileFormat.SDF:
                 ligands.extend(
                     LigandSupply.get_ligands_from_sdf(
-                        filepath, self.id_property, self.use_3d, self.optimize, self.path
+                        filepath,
+                        self.id_property,
+                        self.use_3d,
+                        self.optimize,
+                        self.path,
+                        self.ncpu,
+                        self.single_file,
+                    )
+                )
+            elif filetype in (FileFormat.PARQUET, FileFormat.ARROW):
+                ligands.extend(
+                    LigandSupply.get_ligands_from_table(
+                        filepath,
+                        filetype,
+                        self.smiles_col,
+                        self.filters,
+                        self.optimize,
+                        self.path,
+                        self.ncpu,
+                        self.single_file,
                     )
                 )
             elif filetype == FileFormat.SMI:
                 ligands.extend(
                     LigandSupply.get_ligands_from_smi(
-                        filepath, self.id_property, self.optimize, self.path
+                        filepath,
+                        self.id_property,
+                        self.optimize,
+                        self.path,
+                        self.title_line,
+                        self.smiles_col,
+                        self.ncpu,
+                        self.single_file,
                     )
                 )
-        if smis is not None:
+
+        if self.smis is not None:
             if not self.optimize:
-                ligands.extend(smis)
+                ligands.extend(self.smis)
             else:
-                mols = [Chem.MolFromSmiles(smi) for smi in smis]
+                mols = [Chem.MolFromSmiles(smi) for smi in self.smis]
                 ligands.extend(
-                    LigandSupply.optimize_and_write_mols(mols, Path("ligand"), self.path)
+                    LigandSupply.optimize_and_write_mols(
+                        mols, Path("ligand"), self.path, 0, self.ncpu, self.single_file
+                    )
                 )
-        self.ligands = ligands
 
-    def __len__(self):
-        return len(self.ligands)
+        return ligands
 
-    def __iter__(self) -> Iterable[str]:
-        return iter(self.ligands)
+    def iter_ligands(self) -> Iterator[str]:
+        """lazily yield the ligands from each of the input files followed by the input SMILES
+        strings"""
+        for filepath, filetype in zip(self.filepaths, self.formats):
+            partitioned = self.shard is not None and self.partitionable(filepath, filetype)
 
-    def __getitem__(self, i: int) -> str:
-        return self.ligands[i]
+            if partitioned:
+                ligands = self.iter_shard(filepath, filetype)
+            elif filetype == FileFormat.CSV:
+                ligands = LigandSupply.iter_ligands_from_csv(
+                    filepath, self.title_line, self.smiles_col
+                )
+            elif filetype == FileFormat.SMI:
+                ligands = LigandSupply.iter_ligands_from_smi(
+                    filepath, self.title_line, self.smiles_col
+                )
+            elif filetype in (FileFormat.PARQUET, FileFormat.ARROW):
+                ligands = LigandSupply.iter_ligands_from_table(
+                    filepath, filetype, self.smiles_col, self.filters
+                )
+            elif (
+                self.use_3d
+                and filetype == FileFormat.SDF
+                and self.single_file
+                and compression(filepath) is None
+            ):
+                yield from self.select(LigandSupply.index_file(filepath))
+                continue
+            elif self.use_3d:
+                yield from LigandSupply.iter_split_file(filepath, self.path, self.shard)
+                continue
+            elif filetype == FileFormat.SDF and self.ncpu > 1:
+                ligands = LigandSupply.iter_parsed_ligands(filepath, filetype, self.ncpu)
+            elif filetype == FileFormat.SDF:
+                ligands = LigandSupply.iter_ligands_from_sdf(filepath)
+            else:
+                ligands = (mol.write().split()[0] for mol in LigandSupply.read_mols(filepath))
+
+            if not partitioned:
+                ligands = self.select(ligands)
+
+            if self.optimize:
+                yield from LigandSupply.iter_optimized_ligands(
+                    ligands, filepath, self.path, self.ncpu, self.single_file
+                )
+            else:
+                yield from ligands
+
+        if self.smis is not None:
+            if self.optimize:
+                yield from LigandSupply.iter_optimized_ligands(
+                    self.select(self.smis), Path("ligand"), self.path, self.ncpu, self.single_file
+                )
+            else:
+                yield from self.select(self.smis)
+
+    def partitionable(self, filepath: Path, fmt: FileFormat) -> bool:
+        """whether the input file can be sharded into contiguous ranges of bytes"""
+        if compression(filepath) is not None:
+            return False
+
+        return fmt in (FileFormat.CSV, FileFormat.SMI) or fmt == FileFormat.SDF and not self.use_3d
+
+    def iter_shard(self, filepath: Path, fmt: FileFormat) -> Iterator[str]:
+        """lazily yield the ligands in the shard of an uncompressed CSV, SMI, or SDF file, reading
+        only its range of bytes. SDF records are parsed in parallel if `ncpu` is greater than 1"""
+        i, n = self.shard
+        terminator = b"$$$$" if fmt == FileFormat.SDF else None
+        title_line = self.title_line and fmt != FileFormat.SDF
+
+        start, stop = shard_byte_range(filepath, i, n, terminator, title_line)
+        m = max(self.ncpu, (stop - start) // LigandSupply.RANGE_SIZE, 1)
+        ranges = split_byte_ranges(filepath, m, terminator, byte_range=(start, stop))
+
+        if fmt == FileFormat.SDF:
+            argss = ((filepath, fmt, start, stop) for start, stop in ranges)
+            if self.ncpu > 1:
+                smiss = imap(LigandSupply.parse_byte_range, argss, self.ncpu)
+            else:
+                smiss = (LigandSupply.parse_byte_range(*args) for args in argss)
+        else:
+            smiss = (
+                LigandSupply.read_byte_range(filepath, fmt, start, stop, self.smiles_col)
+                for start, stop in ranges
+            )
+
+        for smis in smiss:
+            yield from smis
+
+    def select(self, ligands: Iterable) -> Iterable:
+        """select every `n`-th item of the iterable, starting from the `i`-th, where `(i, n)` is
+        the shard of this supply. If the supply is not sharded, return the iterable as-is"""
+        if self.shard is None:
+            return ligands
+
+        i, n = self.shard
+
+        return islice(ligands, i, None, n)
+
+    def iter_chunks(self, size: Optional[int] = None) -> Iterator[list[str]]:
+        """yield the ligands of this supply in chunks of the given size. If None, use
+        `LigandSupply.CHUNKSIZE`"""
+        return chunks(self, size or LigandSupply.CHUNKSIZE)
+
+    def iter_byte_ranges(
+        self, size: Optional[int] = None
+    ) -> Iterator[tuple[Path, FileFormat, int, int]]:
+        """yield the byte ranges of the input files of a lazy supply, each containing at most
+        `size` records. These may be handed to workers in place of the ligands themselves and read
+        via `LigandSupply.read_byte_range()`. NOTE: the input SMILES strings are not included.
+
+        Yields
+        ------
+        filepath : Path
+            the input file
+        fmt : FileFormat
+            the format of the input file
+        start : int
+            the starting byte offset of the range
+        stop : int
+            the ending byte offset of the range
+        """
+        size = size or LigandSupply.CHUNKSIZE
+
+        for filepath, fmt, index in zip(self.filepaths, self.formats, self.indices):
+            for i in range(0, len(index), size):
+                yield (filepath, fmt, *index.byte_range(i, i + size))
 
     @staticmethod
     def get_ligands_from_csv(
@@ -158,8 +511,10 @@ class LigandSupply(Iterable):
         name_col: int = 1,
         optimize: bool = False,
         path: Optional[Path] = None,
+        ncpu: int = 1,
+        single_file: bool = False,
     ) -> list[str]:
-        with open(filepath) as fid:
+        with open_file(filepath) as fid:
             reader = csv.reader(fid)
             if title_line:
                 next(reader)
@@ -170,18 +525,21 @@ class LigandSupply(Iterable):
 
         mols = [Chem.MolFromSmiles(smi) for smi in smis]
 
-        return LigandSupply.optimize_and_write_mols(mols, filepath, path)
+        return LigandSupply.optimize_and_write_mols(mols, filepath, path, 0, ncpu, single_file)
 
     @staticmethod
     def get_ligands_from_file(
-        filepath: Path, use_3d: bool = False, optimize: bool = False, path: Optional[Path] = None
+        filepath: Path,
+        use_3d: bool = False,
+        optimize: bool = False,
+        path: Optional[Path] = None,
+        ncpu: int = 1,
+        single_file: bool = False,
     ) -> list[str]:
         if use_3d:
             return LigandSupply.split_file(filepath)
 
-        fmt = Path(filepath).suffix.strip(".")
-
-        mols = list(pybel.readfile(fmt, filepath))
+        mols = list(LigandSupply.read_mols(filepath))
         smis = [mol.write() for mol in mols]
 
         if not optimize:
@@ -189,7 +547,7 @@ class LigandSupply(Iterable):
 
         mols = [Chem.MolFromSmiles(smi) for smi in smis]
 
-        return LigandSupply.optimize_and_write_mols(mols, filepath, path)
+        return LigandSupply.optimize_and_write_mols(mols, filepath, path, 0, ncpu, single_file)
 
     @staticmethod
     def get_ligands_from_sdf(
@@ -198,16 +556,27 @@ class LigandSupply(Iterable):
         use_3d: bool = False,
         optimize: bool = False,
         path: Optional[Path] = None,
+        ncpu: int = 1,
+        single_file: bool = False,
     ) -> list[str]:
+        if use_3d and single_file:
+            return list(LigandSupply.index_file(filepath))
         if use_3d:
             return LigandSupply.split_file(filepath, path)
 
-        mols = Chem.SDMolSupplier(str(filepath))
+        if ncpu > 1 or compression(filepath) is not None:
+            smis = list(LigandSupply.iter_parsed_ligands(filepath, FileFormat.SDF, ncpu))
+            if not optimize:
+                return smis
+
+            mols = [Chem.MolFromSmiles(smi) for smi in smis]
+        else:
+            mols = Chem.SDMolSupplier(str(filepath))
 
         if not optimize:
             return [Chem.MolToSmiles(mol) for mol in mols]
 
-        return LigandSupply.optimize_and_write_mols(mols, filepath, path)
+        return LigandSupply.optimize_and_write_mols(mols, filepath, path, 0, ncpu, single_file)
 
     @staticmethod
     def get_ligands_from_smi(
@@ -215,44 +584,412 @@ class LigandSupply(Iterable):
         id_property: Optional[str] = None,
         optimize: bool = False,
         path: Optional[Path] = None,
+        title_line: bool = True,
+        smiles_col: int = 0,
+        ncpu: int = 1,
+        single_file: bool = False,
     ) -> list[str]:
-        mols = Chem.SmilesMolSupplier(str(filepath))
+        if ncpu > 1 or compression(filepath) is not None:
+            smis = list(
+                LigandSupply.iter_parsed_ligands(
+                    filepath, FileFormat.SMI, ncpu, title_line, smiles_col
+                )
+            )
+            if not optimize:
+                return smis
+
+            mols = [Chem.MolFromSmiles(smi) for smi in smis]
+        else:
+            mols = Chem.SmilesMolSupplier(
+                str(filepath), smilesColumn=smiles_col, nameColumn=-1, titleLine=title_line
+            )
 
         if not optimize:
             return [Chem.MolToSmiles(mol) for mol in mols]
 
-        return LigandSupply.optimize_and_write_mols(mols, filepath, path)
+        return LigandSupply.optimize_and_write_mols(mols, filepath, path, 0, ncpu, single_file)
+
+    @staticmethod
+    def get_ligands_from_table(
+        filepath: Path,
+        fmt: FileFormat,
+        smiles_col: Union[int, str] = 0,
+        filters: Optional[Mapping[str, tuple[Optional[float], Optional[float]]]] = None,
+        optimize: bool = False,
+        path: Optional[Path] = None,
+        ncpu: int = 1,
+        single_file: bool = False,
+    ) -> list[str]:
+        smis = list(LigandSupply.iter_ligands_from_table(filepath, fmt, smiles_col, filters))
+
+        if not optimize:
+            return smis
+
+        mols = [Chem.MolFromSmiles(smi) for smi in smis]
+
+        return LigandSupply.optimize_and_write_mols(mols, filepath, path, 0, ncpu, single_file)
 
     @staticmethod
     def optimize_and_write_mols(
-        mols: Iterable[Chem.Mol], filepath: Path, path: Optional[Path] = None
+        mols: Iterable[Chem.Mol],
+        filepath: Path,
+        path: Optional[Path] = None,
+        offset: int = 0,
+        ncpu: int = 1,
+        single_file: bool = False,
     ) -> list[str]:
-        base_name = (path or filepath.parent) / filepath.stem
-        # NOTE(degraff): this can parallelized later
+        """optimize the geometry of each molecule and write it to disk. Invalid molecules are
+        skipped
+
+        Parameters
+        ----------
+        mols : Iterable[Chem.Mol]
+            the molecules to optimize
+        filepath : Path
+            the file from which the molecules were read. Output files are named after this file
+        path : Optional[Path], default=None
+            the path under which to write the output files. If None, use the parent directory of
+            `filepath`
+        offset : int, default=0
+            the index of the first molecule, used to name the output file(s)
+        ncpu : int, default=1
+            the number of processes (or ray tasks) over which to optimize the molecules
+        single_file : bool, default=False
+            whether to write all of the geometries to a single multi-record SDF file rather than
+            one MOL file per molecule
+
+        Returns
+        -------
+        list[str]
+            the filename of each optimized molecule or, if `single_file` is True, the reference to
+            its record in the output SDF file
+        """
+        base_name = (path or filepath.parent) / strip_compression(filepath).stem
+
+        mols = [mol for mol in mols if mol is not None]
+        if ncpu > 1:
+            size = max(1, -(-len(mols) // (4 * ncpu)))
+            argss = ((mols_chunk,) for mols_chunk in chunks(mols, size))
+            mols = [
+                mol
+                for mols_chunk in imap(LigandSupply.optimize_mols, argss, ncpu)
+                for mol in mols_chunk
+            ]
+        else:
+            mols = LigandSupply.optimize_mols(mols)
+
+        if not single_file:
+            filenames = [f"{base_name}_{i}.mol" for i in range(offset, offset + len(mols))]
+            [Chem.MolToMolFile(mol, filename) for mol, filename in zip(mols, filenames)]
+
+            return filenames
+
+        filename = f"{base_name}_optimized_{offset}.sdf"
+        writer = Chem.SDWriter(filename)
+        [writer.write(mol) for mol in mols]
+        writer.close()
+
+        index = OffsetIndex(filename, terminator=b"$$$$")
+
+        return [format_reference(filename, i) for i in range(len(index))]
+
+    @staticmethod
+    def optimize_mols(mols: Iterable[Chem.Mol]) -> list[Chem.Mol]:
+        """add hydrogens to, embed, and MMFF-optimize each molecule"""
         mols = [Chem.AddHs(mol) for mol in mols]
-        [Chem.EmbedMolecule(mol) for mol in mols]
-        [Chem.MMFFOptimizeMolecule(mol) for mol in mols]
+        for mol in mols:
+            if Chem.EmbedMolecule(mol) == 0:
+                Chem.MMFFOptimizeMolecule(mol)
 
-        filenames = [f"{base_name}_{i}.mol" for i in range(len(mols))]
-        [Chem.MolToMolFile(mol, filename) for mol, filename in zip(mols, filenames)]
+        return mols
 
-        return filenames
+    @staticmethod
+    def read_mols(filepath: Path) -> Iterator[pybel.Molecule]:
+        """lazily read the molecules of a (possibly) compressed file with OpenBabel. OpenBabel
+        only decompresses gzip-compressed files itself, so the molecules of SDF files with any other
+        compression are parsed record by record from the decompressed stream
+
+        Raises
+        ------
+        ValueError
+            if the file is neither uncompressed, gzip-compressed, nor a compressed SDF file
+        """
+        fmt = strip_compression(filepath).suffix.strip(".")
+        if compression(filepath) in (None, "gzip"):
+            yield from pybel.readfile(fmt, str(filepath))
+            return
+
+        if fmt.lower() != "sdf":
+            raise ValueError(
+                "Only gzip-compressed files may be read with OpenBabel, except for SDF files! "
+                f'got: "{filepath}"'
+            )
+
+        with open_file(filepath) as fid:
+            lines = []
+            for line in fid:
+                lines.append(line)
+                if line.startswith("$$$$"):
+                    yield pybel.readstring(fmt, "".join(lines))
+                    lines = []
+
+        if "".join(lines).strip():
+            yield pybel.readstring(fmt, "".join(lines))
+
+    @staticmethod
+    def index_file(filepath: Path) -> Iterator[str]:
+        """yield a reference to each record of the SDF file without splitting it"""
+        index = OffsetIndex(filepath, terminator=b"$$$$")
+
+        return (format_reference(filepath, i) for i in range(len(index)))
 
     @staticmethod
     def split_file(filepath: Path, path: Optional[Path] = None) -> list[str]:
-        fmt = filepath.suffix.strip(".")
-        base_name = (path or filepath.parent) / filepath.stem
+        fmt = strip_compression(filepath).suffix.strip(".")
+        base_name = (path or filepath.parent) / strip_compression(filepath).stem
 
-        mols = list(pybel.readfile(fmt, str(filepath)))
+        mols = list(LigandSupply.read_mols(filepath))
 
         filenames = [f"{base_name}_{i}.{fmt}" for i in range(len(mols))]
         [mol.write(fmt, filename, True) for mol, filename in zip(mols, filenames)]
 
         return filenames
 
+    @staticmethod
+    def iter_ligands_from_csv(
+        filepath: Path, title_line: bool = True, smiles_col: int = 0
+    ) -> Iterator[str]:
+        with open_file(filepath) as fid:
+            reader = csv.reader(fid)
+            if title_line:
+                next(reader, None)
+
+            for row in reader:
+                if row:
+                    yield row[smiles_col]
+
+    @staticmethod
+    def iter_ligands_from_smi(
+        filepath: Path, title_line: bool = True, smiles_col: int = 0
+    ) -> Iterator[str]:
+        with open_file(filepath) as fid:
+            if title_line:
+                next(fid, None)
+
+            for line in fid:
+                tokens = line.split()
+                if tokens:
+                    yield tokens[smiles_col]
+
+    @staticmethod
+    def iter_ligands_from_sdf(filepath: Path) -> Iterator[str]:
+        with open_file(filepath, "rb") as fid:
+            for mol in Chem.ForwardSDMolSupplier(fid):
+                if mol is not None:
+                    yield Chem.MolToSmiles(mol)
+
+    @staticmethod
+    def iter_ligands_from_table(
+        filepath: Path,
+        fmt: FileFormat,
+        smiles_col: Union[int, str] = 0,
+        filters: Optional[Mapping[str, tuple[Optional[float], Optional[float]]]] = None,
+    ) -> Iterator[str]:
+        """lazily yield the SMILES strings of a Parquet or Arrow IPC (Feather) file
+
+        Only the SMILES column is read from a memory-mapped view of the file in batches of
+        records, and any property range filters are evaluated by the reader before the SMILES
+        strings are materialized
+
+        Parameters
+        ----------
+        filepath : Path
+            the Parquet or Arrow IPC file
+        fmt : FileFormat
+            the format of the file
+        smiles_col : Union[int, str], default=0
+            the index or name of the column containing the SMILES strings
+        filters : Optional[Mapping[str, tuple[Optional[float], Optional[float]]]], default=None
+            a mapping from column name to its allowed (inclusive) range. A bound of None is
+            unbounded
+
+        Yields
+        ------
+        str
+            the SMILES string of each (non-null) row of the file that satisfies the filters
+        """
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+
+        dataset = ds.dataset(
+            str(Path(filepath).resolve()),
+            format="parquet" if fmt == FileFormat.PARQUET else "ipc",
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+        )
+        if isinstance(smiles_col, int):
+            smiles_col = dataset.schema.names[smiles_col]
+
+        conditions = []
+        for column, (lo, hi) in (filters or {}).items():
+            if lo is not None:
+                conditions.append(ds.field(column) >= lo)
+            if hi is not None:
+                conditions.append(ds.field(column) <= hi)
+        expr = functools.reduce(operator.and_, conditions) if conditions else None
+
+        for batch in dataset.to_batches(columns=[smiles_col], filter=expr):
+            yield from (smi for smi in batch.column(0).to_pylist() if smi is not None)
+
+    @staticmethod
+    def iter_optimized_ligands(
+        smis: Iterable[str],
+        filepath: Path,
+        path: Optional[Path] = None,
+        ncpu: int = 1,
+        single_file: bool = False,
+    ) -> Iterator[str]:
+        """optimize and write the molecules corresponding to the SMILES strings in chunks and
+        yield the resulting filenames (or references.) If `single_file` is True, each chunk is
+        written to its own SDF file"""
+        offset = 0
+        for smis_chunk in chunks(smis, LigandSupply.CHUNKSIZE):
+            mols = [Chem.MolFromSmiles(smi) for smi in smis_chunk]
+            yield from LigandSupply.optimize_and_write_mols(
+                mols, filepath, path, offset, ncpu, single_file
+            )
+            offset += len(mols)
+
+    @staticmethod
+    def iter_split_file(
+        filepath: Path, path: Optional[Path] = None, shard: Optional[tuple[int, int]] = None
+    ) -> Iterator[str]:
+        fmt = strip_compression(filepath).suffix.strip(".")
+        base_name = (path or filepath.parent) / strip_compression(filepath).stem
+
+        for i, mol in enumerate(LigandSupply.read_mols(filepath)):
+            if shard is not None and i % shard[1] != shard[0]:
+                continue
+
+            filename = f"{base_name}_{i}.{fmt}"
+            mol.write(fmt, filename, True)
+            yield filename
+
+    @staticmethod
+    def read_byte_range(
+        filepath: Path, fmt: FileFormat, start: int, stop: int, smiles_col: int = 0
+    ) -> list[str]:
+        """read the SMILES strings of the records in the given byte range of a CSV or SMI file"""
+        return [
+            LigandSupply.parse_record(record, fmt, smiles_col)
+            for record in read_records(filepath, start, stop)
+        ]
+
+    @staticmethod
+    def iter_parsed_ligands(
+        filepath: Path,
+        fmt: FileFormat,
+        ncpu: int = 1,
+        title_line: bool = False,
+        smiles_col: int = 0,
+    ) -> Iterator[str]:
+        """parse the molecules of an SDF or SMI file in parallel and yield their canonical SMILES
+        strings in the order of the file. Compressed files are decompressed as a stream in the
+        calling process and only the parsing of each decompressed chunk is parallelized
+
+        Parameters
+        ----------
+        filepath : Path
+            the SDF or SMI file to parse
+        fmt : FileFormat
+            the format of the file
+        ncpu : int, default=1
+            the number of processes (or ray tasks) over which to parse the file
+        title_line : bool, default=False
+            whether there is a title line in the SMI file
+        smiles_col : int, default=0
+            the column containing the SMILES string in each line of the SMI file
+
+        Yields
+        ------
+        str
+            the canonical SMILES string of each valid molecule in the file
+        """
+        terminator = b"$$$$" if fmt == FileFormat.SDF else None
+        title_line = title_line and fmt != FileFormat.SDF
+
+        if compression(filepath) is not None:
+            yield from LigandSupply.iter_parsed_stream(filepath, fmt, ncpu, title_line, smiles_col)
+            return
+
+        n = max(4 * ncpu, os.path.getsize(filepath) // LigandSupply.RANGE_SIZE)
+
+        ranges = split_byte_ranges(filepath, n, terminator, title_line)
+        argss = ((filepath, fmt, start, stop, smiles_col) for start, stop in ranges)
+
+        for smis in imap(LigandSupply.parse_byte_range, argss, ncpu):
+            yield from smis
+
+    @staticmethod
+    def iter_parsed_stream(
+        filepath: Path,
+        fmt: FileFormat,
+        ncpu: int = 1,
+        title_line: bool = False,
+        smiles_col: int = 0,
+    ) -> Iterator[str]:
+        """parse the molecules of a compressed SDF or SMI file in record-aligned chunks of the
+        decompressed stream and yield their canonical SMILES strings in the order of the file"""
+        terminator = b"$$$$" if fmt == FileFormat.SDF else None
+
+        with open_file(filepath, "rb") as fid:
+            if title_line:
+                fid.readline()
+
+            bufs = iter_record_chunks(fid, LigandSupply.RANGE_SIZE, terminator)
+            argss = ((buf, fmt, smiles_col) for buf in bufs)
+            if ncpu > 1:
+                smiss = imap(LigandSupply.parse_buffer, argss, ncpu)
+            else:
+                smiss = (LigandSupply.parse_buffer(*args) for args in argss)
+
+            for smis in smiss:
+                yield from smis
+
+    @staticmethod
+    def parse_byte_range(
+        filepath: Path, fmt: FileFormat, start: int, stop: int, smiles_col: int = 0
+    ) -> list[str]:
+        """parse the molecules in a record-aligned range of bytes of an SDF or SMI file with RDKit
+        and return their canonical SMILES strings. Invalid molecules are skipped"""
+        with open(filepath, "rb") as fid:
+            fid.seek(start)
+            buf = fid.read(stop - start)
+
+        return LigandSupply.parse_buffer(buf, fmt, smiles_col)
+
+    @staticmethod
+    def parse_buffer(buf: bytes, fmt: FileFormat, smiles_col: int = 0) -> list[str]:
+        """parse the molecules in a record-aligned buffer of an SDF or SMI file with RDKit and
+        return their canonical SMILES strings. The SMILES string of each line of an SMI file is
+        read from its `smiles_col`-th column. Invalid molecules are skipped"""
+        if fmt == FileFormat.SDF:
+            mols = Chem.ForwardSDMolSupplier(io.BytesIO(buf))
+        else:
+            mols = (Chem.MolFromSmiles(line.split()[smiles_col]) for line in OffsetIndex.split(buf))
+
+        return [Chem.MolToSmiles(mol) for mol in mols if mol is not None]
+
+    @staticmethod
+    def parse_record(record: str, fmt: FileFormat, smiles_col: int = 0) -> str:
+        """parse the SMILES string from a single record (i.e., line) of a CSV or SMI file"""
+        if fmt == FileFormat.CSV:
+            return next(csv.reader([record]))[smiles_col]
+
+        return record.split()[smiles_col]
+
     @staticmethod
     def guess_format(filepath: Path) -> FileFormat:
         try:
-            return FileFormat.from_str(filepath.suffix.strip("."))
+            return FileFormat.from_str(strip_compression(filepath).suffix.strip("."))
         except KeyError:
             return FileFormat.FILE
@@ -0,0 +1,178 @@
+"""This module contains utilities for pinning docking simulations to disjoint sets of cores on each
+node and guarding against CPU oversubscription
+
+Ray's CPU reservations are only logical, so the threads of concurrent docking programs are free to
+float over (and contend for) the same cores. Instead, each pinned simulation acquires a node-local
+core slot, a disjoint set of `ncpu` cores, and restricts itself (and thus the docking program
+processes it starts) to those cores for its duration. Slots are coordinated between the worker
+processes of a node via file locks, which are released automatically if a worker dies."""
+from contextlib import contextmanager
+import fcntl
+import functools
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import warnings
+
+import ray
+
+from pyscreener.warnings import OversubscriptionWarning
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+CHECK_INTERVAL = 60.0
+
+LAST_CHECK = float("-inf")
+
+
+class CoreSlots:
+    """A CoreSlots object allocates disjoint slots of `ncpu` cores from a pool of cores between
+    the processes of a single node
+
+    Parameters
+    ----------
+    ncpu : int
+        the number of cores in each slot
+    cores : Optional[Sequence[int]], default=None
+        the pool of cores from which to allocate slots. If None, use the cores on which the current
+        process may run
+    path : Optional[Path], default=None
+        the node-local directory under which to place the lock file of each slot. If None, use a
+        directory in the temp directory
+    """
+
+    def __init__(
+        self, ncpu: int, cores: Optional[Sequence[int]] = None, path: Optional[Path] = None
+    ):
+        if ncpu < 1:
+            raise ValueError(f'arg "ncpu" must be positive! got: "{ncpu}"')
+
+        self.cores = sorted(cores if cores is not None else os.sched_getaffinity(0))
+        self.slots = [self.cores[i : i + ncpu] for i in range(0, len(self.cores) - ncpu + 1, ncpu)]
+
+        self.path = Path(path or Path(tempfile.gettempdir()) / "pyscreener" / f"cores_{ncpu}")
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @contextmanager
+    def acquire(self) -> Iterator[Optional[List[int]]]:
+        """acquire a free slot for the duration of the context
+
+        Yields
+        ------
+        Optional[List[int]]
+            the cores of the slot. None if every slot is in use
+        """
+        for i, cores in enumerate(self.slots):
+            fid = open(self.path / f"slot_{i}.lock", "w")
+            try:
+                fcntl.flock(fid, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fid.close()
+                continue
+
+            try:
+                yield cores
+            finally:
+                fcntl.flock(fid, fcntl.LOCK_UN)
+                fid.close()
+            return
+
+        yield None
+
+
+@functools.lru_cache(maxsize=None)
+def core_slots(ncpu: int) -> CoreSlots:
+    """get the core slots of size `ncpu` of the current node. The pool of cores is determined only
+    once per process (i.e., once per worker)"""
+    return CoreSlots(ncpu)
+
+
+@contextmanager
+def pinned(cores: Optional[Sequence[int]]):
+    """restrict the current process (and any processes it starts) to the given cores for the
+    duration of the context. Do nothing if `cores` is None"""
+    if cores is None:
+        yield
+        return
+
+    mask = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cores)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, mask)
+
+
+def thread_env(ncpu: int) -> Dict[str, str]:
+    """the environment variables that limit the number of threads of OpenMP and BLAS libraries in
+    a worker to the number of CPUs reserved by its task"""
+    return {var: str(ncpu) for var in THREAD_ENV_VARS}
+
+
+def check_load(num_cores: int, interval: float = CHECK_INTERVAL) -> bool:
+    """check whether the 1-minute load average of the node exceeds its number of cores, warning if
+    so. The load is checked at most once every `interval` seconds per process
+
+    Returns
+    -------
+    bool
+        whether the node is oversubscribed. False if the load was not checked
+    """
+    global LAST_CHECK
+
+    now = time.monotonic()
+    if now - LAST_CHECK < interval:
+        return False
+    LAST_CHECK = now
+
+    load = os.getloadavg()[0]
+    if load <= num_cores:
+        return False
+
+    warnings.warn(
+        f"Load average ({load:0.1f}) exceeds the number of cores on this node ({num_cores})! "
+        "Docking simulations may be slowed by contention from other processes on this node.",
+        OversubscriptionWarning,
+    )
+    return True
+
+
+def run_pinned(func: Callable, ncpu: int, *args) -> Any:
+    """call the function while pinned to a free core slot of size `ncpu` on the current node. If
+    no slot is free (i.e., the node is oversubscribed), the function is run unpinned"""
+    slots = core_slots(ncpu)
+    check_load(len(slots.cores))
+
+    with slots.acquire() as cores:
+        if cores is None:
+            warnings.warn(
+                f"No free core slots of size {ncpu}! Running unpinned ...", OversubscriptionWarning
+            )
+        with pinned(cores):
+            return func(*args)
+
+
+class PinnedRemote:
+    """A PinnedRemote runs each call of a function as a ray task pinned to a disjoint slot of
+    `ncpu` cores on its node, with the thread counts of OpenMP and BLAS libraries limited to `ncpu`
+
+    Parameters
+    ----------
+    func : Callable
+        the function to call
+    ncpu : int
+        the number of CPUs to reserve for (and pin) each call
+    """
+
+    def __init__(self, func: Callable, ncpu: int):
+        self.func = func
+        self.ncpu = ncpu
+        self.f = ray.remote(num_cpus=ncpu, runtime_env={"env_vars": thread_env(ncpu)})(run_pinned)
+
+    def remote(self, *args) -> ray.ObjectRef:
+        """asynchronously call the function with the given arguments"""
+        return self.f.remote(self.func, self.ncpu, *args)
@@ -0,0 +1,105 @@
+"""This module contains functions for checking whether a ligand can geometrically fit inside of a
+docking box before it is docked"""
+from itertools import tee
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+from pyscreener.utils.utils import chunks, imap
+
+CHUNKSIZE = 32
+
+
+def embed(smi: str, seed: int = 42) -> Optional[np.ndarray]:
+    """the heavy atom coordinates of the first embedded conformer of the molecule
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        an `n x 3` array of the heavy atom coordinates. None if the molecule could not be parsed or
+        embedded
+    """
+    mol = Chem.MolFromSmiles(smi)
+    if mol is None:
+        return None
+
+    mol = Chem.AddHs(mol)
+    if AllChem.EmbedMolecule(mol, randomSeed=seed) != 0:
+        return None
+
+    X = mol.GetConformer().GetPositions()
+    heavy = np.array([atom.GetAtomicNum() > 1 for atom in mol.GetAtoms()])
+
+    return X[heavy]
+
+
+def span(X: np.ndarray) -> float:
+    """the maximum distance between any two of the given `n x 3` coordinates"""
+    D = np.sqrt(((X[:, None, :] - X[None, :, :]) ** 2).sum(-1))
+
+    return float(D.max())
+
+
+def fits(X: np.ndarray, size: Sequence[float], tolerance: float = 0.0) -> bool:
+    """can the coordinates fit inside a box of the given size?
+
+    The coordinates are considered to fit unless their maximum span is larger than the diagonal of
+    the box plus the given tolerance. This is a necessary but not sufficient condition: no
+    arrangement of the coordinates whose span exceeds the diagonal can fit inside the box, but
+    some that don't exceed it still cannot. A ligand is therefore never falsely rejected (e.g., a
+    rigid rod lying along the diagonal of the box), at the cost of docking some that don't fit
+
+    Parameters
+    ----------
+    X : np.ndarray
+        an `n x 3` array of coordinates
+    size : Sequence[float]
+        the x-, y-, and z-dimensions of the box
+    tolerance : float, default=0.0
+        the amount (in Angstroms) by which the coordinates may exceed the box
+
+    Returns
+    -------
+    bool
+        whether the coordinates fit inside the box
+    """
+    return bool(span(X) <= np.linalg.norm(np.array(size, dtype=float)) + tolerance)
+
+
+def check_fits(
+    smis: Sequence[str], size: Sequence[float], tolerance: float = 0.0, seed: int = 42
+) -> List[bool]:
+    """check whether each molecule can fit inside a box of the given size. Molecules that cannot
+    be embedded are assumed to fit"""
+    fitss = []
+    for smi in smis:
+        X = embed(smi, seed)
+        fitss.append(True if X is None or len(X) == 0 else fits(X, size, tolerance))
+
+    return fitss
+
+
+def iter_fits(
+    smis: Iterable[str],
+    size: Sequence[float],
+    tolerance: float = 0.0,
+    ncpu: int = 1,
+    chunksize: int = CHUNKSIZE,
+    seed: int = 42,
+) -> Iterator[Tuple[str, bool]]:
+    """lazily check whether each molecule in a stream of SMILES strings can fit inside a box of the
+    given size in parallel chunks
+
+    Yields
+    ------
+    Tuple[str, bool]
+        each SMILES string and whether the molecule fits inside the box, in the order of the input
+    """
+    smiss, smiss_ = tee(chunks(smis, chunksize))
+    argss = ((smis_chunk, size, tolerance, seed) for smis_chunk in smiss_)
+    fitsss = imap(check_fits, argss, ncpu) if ncpu > 1 else (check_fits(*a) for a in argss)
+
+    for smis_chunk, fitss in zip(smiss, fitsss):
+        yield from zip(smis_chunk, fitss)
@@ -0,0 +1,111 @@
+"""This module contains functions for transparently reading (possibly) compressed input files, e.g.,
+"ligands.smi.gz", in a streaming fashion"""
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def compression(filepath: Union[str, Path]) -> Optional[str]:
+    """the compression of the file ("gzip", "bz2", "xz", or "zstd") as determined by its suffix.
+    None if the file is not compressed"""
+    return COMPRESSIONS.get(Path(filepath).suffix.lower())
+
+
+def strip_compression(filepath: Union[str, Path]) -> Path:
+    """the filepath with its compression suffix, if any, removed (e.g., "ligands.smi.gz" ->
+    "ligands.smi")"""
+    filepath = Path(filepath)
+
+    return filepath.with_suffix("") if compression(filepath) is not None else filepath
+
+
+def open_file(filepath: Union[str, Path], mode: str = "rt") -> IO:
+    """open the (possibly) compressed file for streaming decompression
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the file to open
+    mode : str, default="rt"
+        the mode in which to open the file
+
+    Returns
+    -------
+    IO
+        the file object
+
+    Raises
+    ------
+    ImportError
+        if the file is zstd-compressed and the `zstandard` package is not installed
+    """
+    codec = compression(filepath)
+
+    if codec == "gzip":
+        return gzip.open(filepath, mode)
+    if codec == "bz2":
+        return bz2.open(filepath, mode)
+    if codec == "xz":
+        return lzma.open(filepath, mode)
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                f'Reading zstd-compressed file "{filepath}" requires the "zstandard" package!'
+            )
+
+        return zstandard.open(filepath, mode)
+
+    return open(filepath, mode)
+
+
+def iter_record_chunks(
+    fid: IO[bytes], size: int, terminator: Optional[bytes] = None
+) -> Iterator[bytes]:
+    """read a binary stream in chunks of at least `size` bytes (excluding the last chunk) that are
+    aligned to record boundaries
+
+    Parameters
+    ----------
+    fid : IO[bytes]
+        the binary stream
+    size : int
+        the minimum number of bytes to read at a time
+    terminator : Optional[bytes], default=None
+        the prefix of the line which terminates each record, e.g., b"$$$$" for an SDF file. If
+        None, each line is considered a record
+
+    Yields
+    ------
+    bytes
+        a chunk of the stream containing only whole records
+    """
+    delimiter = b"\n" if terminator is None else b"\n" + terminator
+
+    remainder = b""
+    while True:
+        block = fid.read(size)
+        if not block:
+            break
+
+        buf = remainder + block
+        pos = buf.rfind(delimiter)
+        if pos == -1:
+            remainder = buf
+            continue
+
+        end = pos + 1 if terminator is None else buf.find(b"\n", pos + 1) + 1
+        if end == 0:
+            remainder = buf
+            continue
+
+        yield buf[:end]
+        remainder = buf[end:]
+
+    if remainder.strip():
+        yield remainder
@@ -0,0 +1,210 @@
+"""This module contains the ConformerStore class, a persistent on-disk store of the 3D conformers
+of ligands that may be shared across screens, docking programs, and receptors, and functions for
+reproducibly generating ligand conformers"""
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Optional, Tuple, Union
+import warnings
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+from rdkit.Geometry import Point3D
+
+from pyscreener.warnings import ConformerWarning
+
+SEED = 42
+TIMEOUT = 60.0
+LOCAL = threading.local()
+
+
+class ConformerStore:
+    """A ConformerStore is a SQLite database mapping the canonical SMILES string of a ligand to
+    the 3D conformer of its hydrogen-added molecule.
+
+    Each conformer is stored as packed arrays of the atomic number (i.e., the atom ordering),
+    coordinates, and Gasteiger charge of each atom in the molecule built from the canonical SMILES
+    string, so a conformer may be restored without any re-parsing of molecular file formats. A
+    stored conformer is only returned if its atom ordering matches that of the molecule rebuilt
+    from its SMILES string.
+
+    The database is opened in write-ahead logging mode, so it may be safely read and written by
+    multiple processes on the same node. It should *not* be placed on a network filesystem.
+
+    Attributes
+    ----------
+    filepath : Path
+        the filepath of the database
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the filepath of the database. Will be created if it does not exist
+    """
+
+    def __init__(self, filepath: Union[str, Path]):
+        self.filepath = Path(filepath)
+
+        self.conn = sqlite3.connect(str(self.filepath), timeout=TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS conformers "
+            "(smiles TEXT PRIMARY KEY, atoms BLOB, coords BLOB, charges BLOB)"
+        )
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM conformers").fetchone()[0]
+
+    def __contains__(self, smi: str) -> bool:
+        query = "SELECT 1 FROM conformers WHERE smiles = ?"
+
+        return self.conn.execute(query, (canonicalize(smi),)).fetchone() is not None
+
+    def get(self, smi: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """the atomic numbers, coordinates, and charges of the stored conformer of the molecule.
+        None if the molecule is not in the store"""
+        query = "SELECT atoms, coords, charges FROM conformers WHERE smiles = ?"
+        row = self.conn.execute(query, (canonicalize(smi),)).fetchone()
+        if row is None:
+            return None
+
+        atoms, coords, charges = row
+
+        return (
+            np.frombuffer(atoms, np.uint8),
+            np.frombuffer(coords, np.float32).reshape(-1, 3),
+            np.frombuffer(charges, np.float32),
+        )
+
+    def put(self, smi: str, atoms: np.ndarray, coords: np.ndarray, charges: np.ndarray):
+        """store the conformer of the molecule, if one is not already stored"""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO conformers VALUES (?, ?, ?, ?)",
+            (
+                canonicalize(smi),
+                np.asarray(atoms, np.uint8).tobytes(),
+                np.asarray(coords, np.float32).tobytes(),
+                np.asarray(charges, np.float32).tobytes(),
+            ),
+        )
+        self.conn.commit()
+
+    def load(self, smi: str) -> Optional[Chem.Mol]:
+        """the hydrogen-added molecule with its stored conformer and Gasteiger charges (as the
+        "_GasteigerCharge" property of each atom). None if the molecule is not in the store or
+        its atom ordering does not match that of the stored conformer"""
+        record = self.get(smi)
+        if record is None:
+            return None
+
+        atoms, coords, charges = record
+        mol = Chem.MolFromSmiles(canonicalize(smi))
+        mol = Chem.AddHs(mol)
+        if not np.array_equal(atoms, [a.GetAtomicNum() for a in mol.GetAtoms()]):
+            return None
+
+        conf = Chem.Conformer(mol.GetNumAtoms())
+        for i, (x, y, z) in enumerate(coords.astype(float)):
+            conf.SetAtomPosition(i, Point3D(x, y, z))
+        conf.Set3D(True)
+        mol.AddConformer(conf, assignId=True)
+
+        for atom, q in zip(mol.GetAtoms(), charges.astype(float)):
+            atom.SetDoubleProp("_GasteigerCharge", q)
+
+        return mol
+
+    def store(self, smi: str, mol: Chem.Mol):
+        """store the conformer of the hydrogen-added molecule built from the canonical SMILES
+        string of `smi`"""
+        if mol.GetNumConformers() == 0:
+            return
+
+        AllChem.ComputeGasteigerCharges(mol)
+        atoms = [atom.GetAtomicNum() for atom in mol.GetAtoms()]
+        charges = [atom.GetDoubleProp("_GasteigerCharge") for atom in mol.GetAtoms()]
+
+        self.put(smi, atoms, mol.GetConformer().GetPositions(), np.nan_to_num(charges))
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(filepath: Union[str, Path]) -> ConformerStore:
+    """open the conformer store at the given filepath. The store is only opened once per thread of
+    each process (i.e., once per worker thread), as SQLite connections may only be used by the
+    thread that created them"""
+    stores = LOCAL.__dict__.setdefault("stores", {})
+    if filepath not in stores:
+        stores[filepath] = ConformerStore(filepath)
+
+    return stores[filepath]
+
+
+def canonicalize(smi: str) -> str:
+    """the canonical SMILES string of the input SMILES string. If the input can't be parsed by
+    RDKit, return it as-is"""
+    mol = Chem.MolFromSmiles(smi)
+
+    return smi if mol is None else Chem.MolToSmiles(mol)
+
+
+def embed(smi: str, seed: int = SEED) -> Optional[Chem.Mol]:
+    """generate a reproducible, MMFF-optimized 3D conformer of the molecule built from the
+    canonical SMILES string of the input
+
+    Returns
+    -------
+    Optional[Chem.Mol]
+        the hydrogen-added molecule. It will have no conformer if embedding failed. None if the
+        SMILES string is invalid
+    """
+    mol = Chem.MolFromSmiles(smi)
+    if mol is None:
+        return None
+
+    mol = Chem.AddHs(Chem.MolFromSmiles(Chem.MolToSmiles(mol)))
+    try:
+        AllChem.EmbedMolecule(mol, randomSeed=seed)
+        AllChem.MMFFOptimizeMolecule(mol)
+    except ValueError:
+        warnings.warn("Could not generate 3D conformer of molecule!", ConformerWarning)
+
+    return mol
+
+
+def get_conformer(
+    smi: str, store: Optional[Union[str, Path]] = None, seed: int = SEED
+) -> Optional[Chem.Mol]:
+    """get the 3D conformer of the molecule from the conformer store, if one is supplied and
+    contains it, or generate it and add it to the store otherwise
+
+    Parameters
+    ----------
+    smi : str
+        the SMILES string of the molecule
+    store : Optional[Union[str, Path]], default=None
+        the filepath of a conformer store. If None, always generate the conformer
+    seed : int, default=SEED
+        the random seed to use when embedding the molecule
+
+    Returns
+    -------
+    Optional[Chem.Mol]
+        the hydrogen-added molecule with its 3D conformer. None if the SMILES string is invalid
+    """
+    if store is None:
+        return embed(smi, seed)
+
+    store = open_store(str(store))
+    mol = store.load(smi)
+    if mol is not None:
+        return mol
+
+    mol = embed(smi, seed)
+    if mol is not None:
+        store.store(smi, mol)
+
+    return mol
@@ -0,0 +1,417 @@
+"""This module contains functions for writing docking-ready PDBQT and MOL2 files directly from
+RDKit molecules using RDKit's Gasteiger charges, with OpenBabel as a fallback"""
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import warnings
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+from pyscreener.warnings import ChargeWarning
+
+AD_TYPES = {
+    9: "F",
+    12: "Mg",
+    15: "P",
+    17: "Cl",
+    20: "Ca",
+    25: "Mn",
+    26: "Fe",
+    30: "Zn",
+    35: "Br",
+    53: "I",
+}
+ROTATABLE = Chem.MolFromSmarts(
+    "[!#1;!$(*#*);$(*(~[!#1])~[!#1])]-&!@[!#1;!$(*#*);$(*(~[!#1])~[!#1])]"
+)
+SYBYL_ELEMENTS = {1: "H", 9: "F", 15: "P.3", 17: "Cl", 35: "Br", 53: "I"}
+
+
+def get_atoms(mol: Chem.Mol) -> List[Chem.Atom]:
+    """the atoms of the molecule. Faster than iterating over `mol.GetAtoms()`"""
+    return [mol.GetAtomWithIdx(i) for i in range(mol.GetNumAtoms())]
+
+
+def gasteiger_charges(mol: Chem.Mol) -> np.ndarray:
+    """the Gasteiger charge of each atom in the molecule. Charges already assigned to the molecule
+    (e.g., those of a molecule loaded from a `ConformerStore`) are reused"""
+    atoms = get_atoms(mol)
+    if not all(atom.HasProp("_GasteigerCharge") for atom in atoms):
+        AllChem.ComputeGasteigerCharges(mol)
+
+    charges = np.array([atom.GetDoubleProp("_GasteigerCharge") for atom in atoms])
+    if not np.isfinite(charges).all():
+        warnings.warn("Could not calculate charges for ligand!", ChargeWarning)
+
+    return np.nan_to_num(charges, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def ad_type(atom: Chem.Atom) -> str:
+    """the AutoDock atom type of the atom
+
+    Raises
+    ------
+    ValueError
+        if the element of the atom has no AutoDock atom type
+    """
+    z = atom.GetAtomicNum()
+
+    if z == 1:
+        polar = any(n.GetAtomicNum() in (7, 8) for n in atom.GetNeighbors())
+        return "HD" if polar else "H"
+    if z == 6:
+        return "A" if atom.GetIsAromatic() else "C"
+    if z == 7:
+        return "NA" if is_acceptor(atom) else "N"
+    if z == 8:
+        return "OA"
+    if z == 16:
+        return "SA"
+
+    try:
+        return AD_TYPES[z]
+    except KeyError:
+        raise ValueError(f'No AutoDock atom type for element "{atom.GetSymbol()}"!')
+
+
+def is_acceptor(atom: Chem.Atom) -> bool:
+    """is the nitrogen atom a hydrogen bond acceptor?"""
+    if atom.GetFormalCharge() > 0 or atom.GetTotalDegree() >= 4:
+        return False
+    if atom.GetIsAromatic():
+        return atom.GetTotalDegree() == 2
+    if atom.GetTotalDegree() == 3 and is_conjugated(atom):
+        return False
+
+    return True
+
+
+def is_conjugated(atom: Chem.Atom) -> bool:
+    return any(bond.GetIsConjugated() for bond in atom.GetBonds())
+
+
+def is_amide(bond: Chem.Bond) -> bool:
+    """is the bond a C-N amide (or thioamide) bond?"""
+    for c, n in (
+        (bond.GetBeginAtom(), bond.GetEndAtom()),
+        (bond.GetEndAtom(), bond.GetBeginAtom()),
+    ):
+        if c.GetAtomicNum() != 6 or n.GetAtomicNum() != 7:
+            continue
+
+        oxo = [
+            b.GetOtherAtom(c).GetAtomicNum()
+            for b in c.GetBonds()
+            if b.GetBondType() == Chem.BondType.DOUBLE
+        ]
+        if 8 in oxo or 16 in oxo:
+            return True
+
+    return False
+
+
+def rotatable_bonds(mol: Chem.Mol) -> List[Tuple[int, int]]:
+    """the (begin, end) atom indices of the rotatable bonds of the molecule, i.e., acyclic single
+    bonds between two non-terminal heavy atoms that are neither amide bonds nor part of a linear
+    (i.e., triple-bonded) group"""
+    matches = mol.GetSubstructMatches(ROTATABLE, maxMatches=mol.GetNumBonds())
+
+    return [(i, j) for i, j in matches if not is_amide(mol.GetBondBetweenAtoms(i, j))]
+
+
+def fragment_labels(mol: Chem.Mol, bonds: List[Tuple[int, int]]) -> List[int]:
+    """the label of the rigid fragment of each atom in the molecule after breaking the given bonds,
+    where fragments are labeled in order of their lowest atom index"""
+    broken = {(i, j) for i, j in bonds} | {(j, i) for i, j in bonds}
+
+    parents = list(range(mol.GetNumAtoms()))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(Chem.GetAdjacencyMatrix(mol)))):
+        if (i, j) not in broken:
+            parents[max(find(i), find(j))] = min(find(i), find(j))
+
+    roots = [find(i) for i in range(len(parents))]
+    labels = {root: k for k, root in enumerate(dict.fromkeys(roots))}
+
+    return [labels[root] for root in roots]
+
+
+def torsion_tree(mol: Chem.Mol) -> Tuple[List[int], Dict[int, List[Tuple[int, int, List[int]]]]]:
+    """build the torsion tree of the molecule
+
+    The molecule is split into rigid fragments along its rotatable bonds, and the fragment with the
+    most atoms is taken as the root
+
+    Returns
+    -------
+    root : List[int]
+        the indices of the atoms in the root fragment
+    branches : Dict[int, List[Tuple[int, int, List[int]]]]
+        a mapping from the index of each fragment (i.e., the index of its first atom) to a list of
+        its child branches of the form (parent_atom, child_atom, atoms), where `atoms` are the
+        indices of the atoms in the child fragment, starting with `child_atom`
+    """
+    bonds = rotatable_bonds(mol)
+
+    labels = fragment_labels(mol, bonds)
+    num_fragments = max(labels) + 1
+
+    fragments = [[] for _ in range(num_fragments)]
+    for i, label in enumerate(labels):
+        fragments[label].append(i)
+
+    edges = defaultdict(list)
+    for i, j in bonds:
+        edges[labels[i]].append((i, j))
+        edges[labels[j]].append((j, i))
+
+    i_root = max(range(num_fragments), key=lambda k: len(fragments[k]))
+
+    branches = {}
+    visited = {i_root}
+    queue = deque([fragments[i_root]])
+    while queue:
+        atoms = queue.popleft()
+        children = []
+        for a, b in edges[labels[atoms[0]]]:
+            if labels[b] in visited:
+                continue
+
+            visited.add(labels[b])
+            child = [b, *(k for k in fragments[labels[b]] if k != b)]
+            children.append((a, b, child))
+            queue.append(child)
+        branches[atoms[0]] = children
+
+    return fragments[i_root], branches
+
+
+def to_pdbqt(mol: Chem.Mol, name: Optional[str] = None) -> str:
+    """the PDBQT block of the molecule, using the coordinates of its first conformer, AutoDock
+    atom types, and Gasteiger charges. All hydrogens are retained
+
+    NOTE: only bonds between two non-terminal heavy atoms are active torsions (see
+    `rotatable_bonds()`), so unlike AutoDockTools and OpenBabel, the hydrogens of hydroxyl and
+    amine groups (e.g., C-OH or C-NH2) are not rotated during docking
+
+    Raises
+    ------
+    ValueError
+        if the molecule has no conformer, contains an element with no AutoDock atom type, or
+        contains multiple disconnected fragments (e.g., a salt)
+    """
+    if mol.GetNumConformers() == 0:
+        raise ValueError("Molecule has no conformer!")
+    if len(Chem.GetMolFrags(mol)) > 1:
+        raise ValueError("Molecule contains multiple fragments!")
+
+    X = mol.GetConformer().GetPositions().tolist()
+    charges = gasteiger_charges(mol).tolist()
+    types = [ad_type(atom) for atom in get_atoms(mol)]
+    root, branches = torsion_tree(mol)
+    torsdof = sum(len(children) for children in branches.values())
+
+    name = name or (mol.GetProp("_Name") if mol.HasProp("_Name") else "") or "ligand"
+
+    serials = {}
+    lines = [f"REMARK  Name = {name}", f"REMARK  {torsdof} active torsions"]
+
+    def write_atoms(atoms: List[int]):
+        for i in atoms:
+            serials[i] = len(serials) + 1
+            atom = mol.GetAtomWithIdx(i)
+            atom_name = f"{atom.GetSymbol()}{i + 1}"[:4]
+            x, y, z = X[i]
+            lines.append(
+                f"ATOM  {serials[i]:>5} {atom_name:<4} UNL     1    {x:8.3f}{y:8.3f}{z:8.3f}"
+                f"{0:6.2f}{0:6.2f}    {charges[i]:+6.3f} {types[i]:<2}"
+            )
+
+    def write_branches(atoms: List[int]):
+        for a, b, child in branches[atoms[0]]:
+            lines.append(f"BRANCH {serials[a]:>3} {len(serials) + 1:>3}")
+            write_atoms(child)
+            write_branches(child)
+            lines.append(f"ENDBRANCH {serials[a]:>3} {serials[b]:>3}")
+
+    lines.append("ROOT")
+    write_atoms(root)
+    lines.append("ENDROOT")
+    write_branches(root)
+    lines.append(f"TORSDOF {torsdof}")
+
+    return "\n".join(lines) + "\n"
+
+
+def double_bonded(atom: Chem.Atom) -> List[int]:
+    """the atomic numbers of the atoms double-bonded to the atom"""
+    return [
+        b.GetOtherAtom(atom).GetAtomicNum()
+        for b in atom.GetBonds()
+        if b.GetBondType() == Chem.BondType.DOUBLE
+    ]
+
+
+def sybyl_c(atom: Chem.Atom) -> str:
+    if atom.GetIsAromatic():
+        return "C.ar"
+    if atom.GetHybridization() == Chem.HybridizationType.SP:
+        return "C.1"
+    if atom.GetHybridization() == Chem.HybridizationType.SP2:
+        return "C.2"
+    return "C.3"
+
+
+def sybyl_n(atom: Chem.Atom) -> str:
+    if atom.GetIsAromatic():
+        return "N.ar"
+    if any(is_amide(b) for b in atom.GetBonds()):
+        return "N.am"
+    if atom.GetHybridization() == Chem.HybridizationType.SP:
+        return "N.1"
+    if atom.GetTotalDegree() == 4:
+        return "N.4"
+    if atom.GetTotalDegree() == 3 and (double_bonded(atom) or is_conjugated(atom)):
+        return "N.pl3"
+    if double_bonded(atom):
+        return "N.2"
+    return "N.3"
+
+
+def sybyl_o(atom: Chem.Atom) -> str:
+    nbrs = list(atom.GetNeighbors())
+    if len(nbrs) == 1 and nbrs[0].GetAtomicNum() == 6:
+        oxygens = [
+            n for n in nbrs[0].GetNeighbors() if n.GetAtomicNum() == 8 and n.GetDegree() == 1
+        ]
+        if len(oxygens) == 2 and any(o.GetFormalCharge() < 0 for o in oxygens):
+            return "O.co2"
+    if double_bonded(atom):
+        return "O.2"
+    return "O.3"
+
+
+def sybyl_s(atom: Chem.Atom) -> str:
+    num_oxo = double_bonded(atom).count(8)
+    if num_oxo >= 2:
+        return "S.O2"
+    if num_oxo == 1:
+        return "S.O"
+    if double_bonded(atom) or atom.GetIsAromatic():
+        return "S.2"
+    return "S.3"
+
+
+SYBYL_TYPERS = {6: sybyl_c, 7: sybyl_n, 8: sybyl_o, 16: sybyl_s}
+
+
+def sybyl_type(atom: Chem.Atom) -> str:
+    """the SYBYL atom type of the atom"""
+    z = atom.GetAtomicNum()
+    if z in SYBYL_TYPERS:
+        return SYBYL_TYPERS[z](atom)
+
+    return SYBYL_ELEMENTS.get(z, atom.GetSymbol())
+
+
+def sybyl_bond_type(bond: Chem.Bond) -> str:
+    if bond.GetIsAromatic():
+        return "ar"
+    if is_amide(bond):
+        return "am"
+
+    return {Chem.BondType.SINGLE: "1", Chem.BondType.DOUBLE: "2", Chem.BondType.TRIPLE: "3"}.get(
+        bond.GetBondType(), "1"
+    )
+
+
+def to_mol2(mol: Chem.Mol, name: Optional[str] = None) -> str:
+    """the Tripos MOL2 block of the molecule, using the coordinates of its first conformer, SYBYL
+    atom types, and Gasteiger charges
+
+    Raises
+    ------
+    ValueError
+        if the molecule has no conformer
+    """
+    if mol.GetNumConformers() == 0:
+        raise ValueError("Molecule has no conformer!")
+
+    X = mol.GetConformer().GetPositions().tolist()
+    charges = gasteiger_charges(mol).tolist()
+    name = name or (mol.GetProp("_Name") if mol.HasProp("_Name") else "") or "ligand"
+
+    lines = [
+        "@<TRIPOS>MOLECULE",
+        name,
+        f"{mol.GetNumAtoms()} {mol.GetNumBonds()} 1 0 0",
+        "SMALL",
+        "GASTEIGER",
+        "",
+        "@<TRIPOS>ATOM",
+    ]
+    for atom, (x, y, z), q in zip(get_atoms(mol), X, charges):
+        i = atom.GetIdx() + 1
+        atom_name = f"{atom.GetSymbol()}{i}"
+        lines.append(
+            f"{i:>7} {atom_name:<8}{x:>10.4f}{y:>10.4f}{z:>10.4f} {sybyl_type(atom):<6}"
+            f"{1:>5}  UNL1{q:>14.4f}"
+        )
+
+    lines.append("@<TRIPOS>BOND")
+    for i, bond in enumerate(map(mol.GetBondWithIdx, range(mol.GetNumBonds())), 1):
+        a, b = bond.GetBeginAtomIdx() + 1, bond.GetEndAtomIdx() + 1
+        lines.append(f"{i:>6}{a:>6}{b:>6} {sybyl_bond_type(bond)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_openbabel(mol: Chem.Mol, filepath: Union[str, Path], fmt: str):
+    """write the molecule to a file of the given format via OpenBabel, calculating its charges
+    with OpenBabel"""
+    from openbabel import pybel
+
+    mol = pybel.readstring("mol", Chem.MolToMolBlock(mol))
+
+    try:
+        mol.calccharges(model="gasteiger")
+    except Exception:
+        warnings.warn("Could not calculate charges for ligand!", ChargeWarning)
+
+    mol.write(fmt, str(filepath), overwrite=True, opt={"h": None})
+
+
+def write_ligand(mol: Chem.Mol, filepath: Union[str, Path], fmt: str, name: Optional[str] = None):
+    """write the molecule to a PDBQT or MOL2 file natively, falling back to OpenBabel if the
+    molecule can't be written natively
+
+    Parameters
+    ----------
+    mol : Chem.Mol
+        the molecule, with hydrogens and a 3D conformer
+    filepath : Union[str, Path]
+        the filepath to write to
+    fmt : str
+        the format of the file, either "pdbqt" or "mol2"
+    name : Optional[str], default=None
+        the name of the molecule
+    """
+    writers = {"pdbqt": to_pdbqt, "mol2": to_mol2}
+    if fmt not in writers:
+        raise ValueError(f'Unsupported ligand format: "{fmt}"')
+
+    try:
+        block = writers[fmt](mol, name)
+    except ValueError:
+        write_openbabel(mol, filepath, fmt)
+        return
+
+    Path(filepath).write_text(block)
@@ -0,0 +1,370 @@
+"""This module contains the OffsetIndex class, an on-disk index of the byte offsets of each record
+in a line-based (e.g., CSV or SMI) or multi-record (e.g., SDF) text file that allows for random
+access into the file, and functions for splitting files into record-aligned byte ranges"""
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+CHUNKSIZE = 1 << 26
+HEADER_SIZE = 4
+WHITESPACE = np.frombuffer(b" \t\n\r\x0b\x0c", np.uint8)
+SUFFIX = ".offsets.npy"
+
+
+class OffsetIndex:
+    """An OffsetIndex is an index of the starting byte offset of each record in a line-based or
+    multi-record text file backed by a memory-mapped view of that file.
+
+    Building the index requires a single vectorized pass over the file, after which `len()`,
+    random access, and contiguous slicing are O(1) in memory. The index is cached next to the
+    input file (i.e., as "<filepath>.offsets.npy") and reused as long as the size and modification
+    time of the file are unchanged. The first `HEADER_SIZE` entries of the cached array contain the
+    size, modification time (in ns), title line flag, and terminator flag of the indexed file.
+    Blank lines are not considered records.
+
+    Attributes
+    ----------
+    filepath : Path
+        the filepath of the indexed file
+    title_line : bool
+        whether the first line of the file is a title line and should not be indexed
+    terminator : Optional[bytes]
+        the prefix of the line which terminates each record. If None, each line is a record
+    offsets : np.ndarray
+        a vector of length `n + 1`, where `n` is the number of records in the file, containing the
+        starting byte offset of each record followed by the size of the file
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the filepath of the file to index
+    title_line : bool, default=False
+        whether the first line of the file is a title line and should not be indexed
+    cache : bool, default=True
+        whether to read (and write) the index from (to) disk
+    terminator : Optional[bytes], default=None
+        the prefix of the line which terminates each record, e.g., b"$$$$" for an SDF file. If
+        None, each line is considered a record. The title line flag is ignored if specified.
+    """
+
+    def __init__(
+        self,
+        filepath: Union[str, Path],
+        title_line: bool = False,
+        cache: bool = True,
+        terminator: Optional[bytes] = None,
+    ):
+        self.filepath = Path(filepath)
+        self.title_line = title_line and terminator is None
+        self.terminator = terminator
+
+        self.offsets = self.load() if cache else None
+        if self.offsets is None:
+            if terminator is None:
+                self.offsets = OffsetIndex.build(self.filepath, title_line)
+            else:
+                self.offsets = OffsetIndex.build_multirecord(self.filepath, terminator)
+            if cache:
+                self.save()
+
+        self.__mmap = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[str, List[str]]:
+        """the record(s) at the given index (or slice) with trailing whitespace stripped"""
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1 or self.terminator is not None:
+                return [self[i] for i in range(start, stop, step)]
+
+            return self.read(*self.byte_range(start, stop))
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"index {idx} out of range for OffsetIndex of length {len(self)}")
+
+        return self.mmap[self.offsets[idx] : self.offsets[idx + 1]].decode().rstrip()
+
+    @property
+    def cache_file(self) -> Path:
+        return self.filepath.with_name(f"{self.filepath.name}{SUFFIX}")
+
+    @property
+    def header(self) -> np.ndarray:
+        stat = os.stat(self.filepath)
+
+        return np.array(
+            [stat.st_size, stat.st_mtime_ns, self.title_line, self.terminator is not None],
+            dtype=np.int64,
+        )
+
+    @property
+    def mmap(self) -> Union[mmap.mmap, bytes]:
+        """a read-only memory-mapped view of the indexed file"""
+        if self.__mmap is None:
+            if self.offsets[-1] == 0:
+                return b""
+
+            with open(self.filepath, "rb") as fid:
+                self.__mmap = mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self.__mmap
+
+    def byte_range(self, i: int, j: int) -> Tuple[int, int]:
+        """the range of bytes in the indexed file containing the records [i, j)"""
+        j = max(i, min(j, len(self)))
+
+        return int(self.offsets[i]), int(self.offsets[j])
+
+    def read(self, start: int, stop: int) -> List[str]:
+        """the records in the given range of bytes of the indexed file"""
+        return OffsetIndex.split(self.mmap[start:stop])
+
+    def load(self) -> Optional[np.ndarray]:
+        """load the cached index from disk if it exists and is valid. Otherwise, return None"""
+        try:
+            arr = np.load(self.cache_file, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        if len(arr) <= HEADER_SIZE or not np.array_equal(arr[:HEADER_SIZE], self.header):
+            return None
+
+        return arr[HEADER_SIZE:]
+
+    def save(self):
+        """write the index to disk, if possible. The index is written to a temporary file that is
+        then atomically moved into place, so concurrent processes never read a partial index"""
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, "wb") as fid:
+                np.save(fid, np.concatenate((self.header, self.offsets)))
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+
+    @staticmethod
+    def build(filepath: Union[str, Path], title_line: bool = False) -> np.ndarray:
+        """build the vector of byte offsets of each record in the file followed by its size"""
+        with open(filepath, "rb") as fid:
+            if title_line:
+                fid.readline()
+            base = fid.tell()
+
+            starts = [np.array([base])]
+            nonblanks = []
+            pending = False
+            while True:
+                chunk = fid.read(CHUNKSIZE)
+                if not chunk:
+                    break
+
+                arr = np.frombuffer(chunk, np.uint8)
+                newlines = np.flatnonzero(arr == ord("\n"))
+                counts = np.cumsum(~np.isin(arr, WHITESPACE))
+                # a line is blank if it contains no non-whitespace bytes. `pending` tracks whether
+                # the line continued from the previous chunk contains any
+                nonblank = np.diff(counts[newlines], prepend=0) > 0
+                if len(newlines) > 0:
+                    nonblank[0] |= pending
+                    pending = bool(counts[-1] > counts[newlines[-1]])
+                else:
+                    pending = pending or bool(counts[-1] > 0)
+                nonblanks.append(nonblank)
+
+                starts.append(newlines + base + 1)
+                base += len(chunk)
+
+        offsets = np.concatenate(starts).astype(np.int64)
+        nonblank = np.concatenate([np.zeros(0, bool), *nonblanks])
+        if offsets[-1] != base:
+            offsets = np.append(offsets, base)
+            nonblank = np.append(nonblank, pending)
+
+        return np.append(offsets[:-1][nonblank], base)
+
+    @staticmethod
+    def build_multirecord(filepath: Union[str, Path], terminator: bytes) -> np.ndarray:
+        """build the vector of byte offsets of each record in a multi-record file, i.e., a file in
+        which each record is terminated by a line starting with `terminator`, followed by its size.
+        Trailing whitespace after the last terminator is not considered a record"""
+        size = os.path.getsize(filepath)
+        if size == 0:
+            return np.array([0], dtype=np.int64)
+
+        pattern = re.compile(b"^" + re.escape(terminator) + rb"[^\n]*\n?", re.MULTILINE)
+        with open(filepath, "rb") as fid:
+            with mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                ends = [match.end() for match in pattern.finditer(buf)]
+                trailing = ends[-1] if ends else 0
+                unterminated = buf[trailing:].strip() != b""
+
+        starts = [0, *ends] if unterminated else [0, *ends][:-1]
+
+        return np.array([*starts, size], dtype=np.int64)
+
+    @staticmethod
+    def split(buf: bytes) -> List[str]:
+        """split a buffer of bytes into its non-blank records"""
+        return [line for line in buf.decode().splitlines() if line.strip()]
+
+
+def read_records(filepath: Union[str, Path], start: int, stop: int) -> List[str]:
+    """read the records in the range of bytes [start, stop) of the given file. The range should be
+    aligned to record boundaries, e.g., as given by `OffsetIndex.byte_range()`"""
+    with open(filepath, "rb") as fid:
+        fid.seek(start)
+        return OffsetIndex.split(fid.read(stop - start))
+
+
+def split_byte_ranges(
+    filepath: Union[str, Path],
+    n: int,
+    terminator: Optional[bytes] = None,
+    title_line: bool = False,
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> List[Tuple[int, int]]:
+    """split a file (or a record-aligned range of bytes of a file) into at most `n` contiguous,
+    record-aligned ranges of bytes of roughly equal size without reading the entire file
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the file to split
+    n : int
+        the number of ranges into which to split the file
+    terminator : Optional[bytes], default=None
+        the prefix of the line which terminates each record, e.g., b"$$$$" for an SDF file. If
+        None, each line is considered a record
+    title_line : bool, default=False
+        whether the first line of the file is a title line and should be excluded
+    byte_range : Optional[Tuple[int, int]], default=None
+        the record-aligned (start, stop) byte offsets of the portion of the file to split. If
+        None, split the entire file
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        the (start, stop) byte offsets of each range
+    """
+    size = os.path.getsize(filepath)
+
+    with open(filepath, "rb") as fid:
+        start = len(fid.readline()) if title_line else 0
+        if byte_range is not None:
+            start, size = byte_range
+
+        bounds = [start]
+        for k in range(1, n):
+            pos = start + (size - start) * k // n
+            if pos <= bounds[-1]:
+                continue
+
+            pos = next_record(fid, pos, terminator)
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+
+    bounds.append(size)
+
+    return [(i, j) for i, j in zip(bounds[:-1], bounds[1:]) if i < j]
+
+
+def shard_byte_range(
+    filepath: Union[str, Path],
+    i: int,
+    n: int,
+    terminator: Optional[bytes] = None,
+    title_line: bool = False,
+) -> Tuple[int, int]:
+    """the record-aligned range of bytes of the `i`-th of `n` contiguous shards of a file
+
+    The shard boundaries are determined solely by the size of the file, so independent processes
+    may each compute their own shard without coordination and the `n` shards are guaranteed to
+    partition the records of the file. Shards of small files may be empty.
+
+    Parameters
+    ----------
+    filepath : Union[str, Path]
+        the file to shard
+    i : int
+        the index of the shard
+    n : int
+        the total number of shards
+    terminator : Optional[bytes], default=None
+        the prefix of the line which terminates each record, e.g., b"$$$$" for an SDF file. If
+        None, each line is considered a record
+    title_line : bool, default=False
+        whether the first line of the file is a title line and should be excluded
+
+    Returns
+    -------
+    Tuple[int, int]
+        the (start, stop) byte offsets of the shard
+    """
+    size = os.path.getsize(filepath)
+
+    with open(filepath, "rb") as fid:
+        base = len(fid.readline()) if title_line else 0
+
+        bounds = []
+        for k in (i, i + 1):
+            if k == 0:
+                bounds.append(base)
+            elif k == n:
+                bounds.append(size)
+            else:
+                pos = base + (size - base) * k // n
+                bounds.append(min(next_record(fid, pos, terminator), size))
+
+    return bounds[0], bounds[1]
+
+
+def next_record(fid, pos: int, terminator: Optional[bytes] = None) -> int:
+    """the byte offset of the first record starting at or after `pos` in the binary file `fid`"""
+    if terminator is None:
+        if pos <= 0:
+            return 0
+
+        fid.seek(pos - 1)
+        return pos - 1 + len(fid.readline())
+
+    fid.seek(pos)
+    fid.readline()
+    for line in iter(fid.readline, b""):
+        if line.startswith(terminator):
+            return fid.tell()
+
+    return fid.tell()
+
+
+def format_reference(filepath: Union[str, Path], i: int) -> str:
+    """the reference of the form "<filepath>#<i>" to the `i`-th record of a multi-record file"""
+    return f"{filepath}#{i}"
+
+
+def read_reference(reference: Union[str, Path]) -> Tuple[str, Optional[str]]:
+    """read the record referred to by a reference of the form "<filepath>#<i>" from the
+    multi-record (i.e., SDF) file via its OffsetIndex
+
+    Returns
+    -------
+    filepath : str
+        the filepath of the referenced file
+    record : Optional[str]
+        the contents of the referenced record. None if the input is a plain filepath, i.e., the
+        entire file is the record
+    """
+    match = re.fullmatch(r"(.+)#(\d+)", str(reference))
+    if match is None:
+        return str(reference), None
+
+    filepath, i = match.groups()
+
+    return filepath, OffsetIndex(filepath, terminator=b"$$$$")[int(i)]
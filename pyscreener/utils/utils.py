@@ -3,15 +3,18 @@ __all__ = [
     "Reduction",
     "FileFormat",
     "chunks",
+    "imap",
     "reduce_scores",
     "reduce_scores",
     "run_on_all_nodes",
 ]
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
 import functools
 from itertools import islice
-from typing import Callable, Iterable, Iterator, List, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
 
 import numpy as np
 import ray
@@ -39,13 +42,22 @@ class Reduction(AutoName):
 
 class FileFormat(AutoName):
     """The format of a molecular suppy file. FILE represents the format of all molecular supply
-    files with no explicit support (i.e., CSV, SDF, and SMI.)"""
+    files with no explicit support (i.e., CSV, SDF, SMI, Parquet, and Arrow IPC/Feather.)"""
 
+    ARROW = auto()
     CSV = auto()
     FILE = auto()
+    PARQUET = auto()
     SDF = auto()
     SMI = auto()
 
+    @classmethod
+    def from_str(cls, s):
+        if s.lower() in ("feather", "ipc"):
+            return cls.ARROW
+
+        return super().from_str(s)
+
 
 def chunks(it: Iterable, size: int) -> Iterator[List]:
     """chunk an iterable into chunks of given size, with the last chunk being potentially smaller"""
@@ -53,6 +65,48 @@ def chunks(it: Iterable, size: int) -> Iterator[List]:
     return iter(lambda: list(islice(it, size)), [])
 
 
+def imap(func: Callable, argss: Iterable[Sequence], ncpu: int = 1) -> Iterator[Any]:
+    """lazily map a function over an iterable of argument tuples in parallel, yielding the results
+    in order. If ray is initialized, the function is run as ray tasks. Otherwise, it is run in a
+    pool of `ncpu` processes. At most `2 * ncpu` calls are in flight at any given time
+
+    Parameters
+    ----------
+    func : Callable
+        the (picklable) function to map
+    argss : Iterable[Sequence]
+        an iterable of the positional arguments of each call
+    ncpu : int, default=1
+        the number of calls to run concurrently
+
+    Yields
+    ------
+    Any
+        the result of each call
+    """
+    pool = None
+    if ray.is_initialized():
+        func = ray.remote(func)
+        submit, get = func.remote, ray.get
+    else:
+        pool = ProcessPoolExecutor(ncpu)
+        submit, get = functools.partial(pool.submit, func), lambda future: future.result()
+
+    futures = deque()
+    try:
+        for args in argss:
+            futures.append(submit(*args))
+            if len(futures) >= 2 * ncpu:
+                yield get(futures.popleft())
+
+        while futures:
+            yield get(futures.popleft())
+    finally:
+        if pool is not None:
+            [future.cancel() for future in futures]
+            pool.shutdown()
+
+
 def reduce_scores(
     S: np.ndarray, reduction: Reduction = Reduction.BEST, axis: int = -1, k: int = 1
 ) -> Optional[float]:
@@ -8,3 +8,7 @@ class ChargeWarning(Warning):
 
 class SimulationFailureWarning(Warning):
     pass
+
+
+class OversubscriptionWarning(Warning):
+    pass
@@ -0,0 +1,71 @@
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+import numpy as np
+
+from pyscreener.utils.conformers import embed
+from pyscreener.utils.formats import write_ligand, write_openbabel
+
+SMIS = [
+    "CC(=O)Nc1ccc(O)cc1",
+    "CC(C)Cc1ccc(C(C)C(=O)O)cc1",
+    "CN1CCC[C@H]1c1cccnc1",
+    "CCN(CC)CCOC(=O)c1ccc(N)cc1",
+    "COc1ccc2[nH]cc(CCNC(C)=O)c2c1",
+    "CS(=O)(=O)Nc1ccc([N+](=O)[O-])cc1Oc1ccccc1",
+    "O=C(O)c1ccccc1OC(=O)c1ccccc1",
+    "Cc1ccc(cc1)S(=O)(=O)NC(=O)NN1CCCCCC1",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the per-ligand latency of native RDKit and OpenBabel ligand preparation"
+    )
+    parser.add_argument(
+        "-s", "--smis", nargs="+", default=SMIS, help="the SMILES strings to prepare"
+    )
+    parser.add_argument(
+        "-f", "--file", help="a file containing SMILES strings to prepare, one on each line"
+    )
+    parser.add_argument(
+        "-r", "--repeats", type=int, default=5, help="the number of times to prepare each ligand"
+    )
+    args = parser.parse_args()
+
+    smis = args.smis
+    if args.file is not None:
+        smis = [
+            line.split()[0] for line in Path(args.file).read_text().splitlines() if line.strip()
+        ]
+
+    start = time.perf_counter()
+    mols = [embed(smi) for smi in smis]
+    t_embed = (time.perf_counter() - start) / len(smis)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writers = {
+            f"{method} {fmt}": (writer, Path(tmp_dir) / f"ligand.{fmt}", fmt)
+            for fmt in ("pdbqt", "mol2")
+            for method, writer in (("native", write_ligand), ("openbabel", write_openbabel))
+        }
+
+        print(f"embedding: {1000 * t_embed:0.2f} ms/ligand ({len(smis)} ligands)")
+        for name, (writer, filepath, fmt) in writers.items():
+            times = []
+            for _ in range(args.repeats):
+                for mol in mols:
+                    start = time.perf_counter()
+                    writer(mol, filepath, fmt)
+                    times.append(time.perf_counter() - start)
+
+            print(
+                f"{name}: {1000 * np.mean(times):0.3f} ms/ligand "
+                f"(median: {1000 * np.median(times):0.3f} ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
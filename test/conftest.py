@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import pytest
+import ray
+
+from pyscreener.docking import DockingRunner, DockingVirtualScreen, Result, SimulationMetadata
+
+
+def write_executable(path: Path, script: str = "") -> Path:
+    """write the python script to an executable file at the given path"""
+    path.write_text(f"#!{sys.executable}\n{script}")
+    path.chmod(0o755)
+
+    return path
+
+
+@contextmanager
+def stub_executables(*names: str):
+    """temporarily put do-nothing executables with the given names on the PATH, unless they are
+    already installed"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            if shutil.which(name) is None:
+                write_executable(Path(tmp_dir) / name)
+
+        with mock.patch.dict(os.environ, {"PATH": f"{tmp_dir}{os.pathsep}{os.environ['PATH']}"}):
+            yield
+
+
+class FakeMetadata:
+    prepared_ligand = None
+    prepared_receptor = "receptor"
+
+
+class FakeRunner(DockingRunner):
+    """a docking runner that "docks" each ligand to a score of -(length of its SMILES string).
+    The ligands "foo", "fail", and "N" respectively fail to be prepared, raise an exception, and
+    fail to be docked"""
+
+    @classmethod
+    def is_multithreaded(cls):
+        return False
+
+    @staticmethod
+    def prepare_receptor(sim):
+        return sim
+
+    @staticmethod
+    def prepare_ligand(sim):
+        if sim.smi == "foo":
+            return False
+
+        sim.metadata.prepared_ligand = Path(sim.in_path) / f"{sim.name}.txt"
+        sim.metadata.prepared_ligand.write_text(sim.smi)
+
+        return True
+
+    @staticmethod
+    def run(sim):
+        score = -len(Path(sim.metadata.prepared_ligand).read_text())
+        sim.result = Result(sim.smi, sim.name, "node", score)
+
+        return [score]
+
+    @staticmethod
+    def prepare_and_run(sim):
+        if sim.smi == "fail":
+            raise RuntimeError("simulation failed!")
+        if sim.smi == "N":
+            return None
+
+        time.sleep(0.01 * len(sim.smi))
+
+        return Result(sim.smi, sim.name, None, -float(len(sim.smi)), 1.0)
+
+    @staticmethod
+    def validate_metadata(metadata):
+        pass
+
+
+@pytest.fixture(scope="session")
+def build_virtual_screen():
+    """a function that builds a virtual screen of the given runner against the given receptors"""
+    if not ray.is_initialized():
+        ray.init(num_cpus=2)
+
+    def build(path, receptors=("receptor_1", "receptor_2"), runner=FakeRunner, **kwargs):
+        return DockingVirtualScreen(
+            runner,
+            list(receptors),
+            (0, 0, 0),
+            (10, 10, 10),
+            SimulationMetadata(),
+            path=path,
+            **kwargs,
+        )
+
+    return build
+
+
+@pytest.fixture(scope="module")
+def receptors():
+    return ["receptor_1", "receptor_2"]
+
+
+@pytest.fixture(scope="module")
+def virtual_screen(build_virtual_screen, receptors, tmp_path_factory):
+    return build_virtual_screen(tmp_path_factory.mktemp("screen"), receptors)
+
+
+@pytest.fixture
+def smis():
+    return ["CCCCCCCCCC", "C", "CCCCC", "CC", "CCCCCCC"]
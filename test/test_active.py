@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from pyscreener.active import ACQUISITIONS, ActiveLearner, build_surrogate, predict, read_reference
+from pyscreener.postprocessing.fingerprints import gen_packed_fps, unpack
+
+
+class FakeScreen:
+    """a 'virtual screen' that scores each ligand by its number of carbons"""
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def __call__(self, smis, writer=None):
+        self.num_calls += len(smis)
+        return np.array([-float(smi.count("C")) for smi in smis])
+
+
+@pytest.fixture(scope="module")
+def smis():
+    rng = np.random.default_rng(42)
+    return ["".join(rng.choice(["C", "N", "O", "CC"], rng.integers(1, 12))) for _ in range(200)]
+
+
+def test_packed_fps():
+    fps, valid = gen_packed_fps(["CCO", "foo", "c1ccccc1"], length=64)
+
+    assert fps.shape == (3, 8)
+    np.testing.assert_array_equal(valid, [True, False, True])
+    assert unpack(fps, 64).shape == (3, 64)
+    assert not unpack(fps, 64)[1].any()
+
+
+@pytest.mark.parametrize("acquisition", ACQUISITIONS)
+def test_acquisition_shape(acquisition):
+    Y_mean = np.array([0.0, 1.0, 2.0])
+    Y_sd = np.array([1.0, 0.0, 0.5])
+
+    U = ACQUISITIONS[acquisition](Y_mean, Y_sd, 1.0, 2.0, np.random.default_rng(0))
+
+    assert U.shape == (3,)
+    assert np.isfinite(U).all()
+
+
+def test_ucb():
+    U = ACQUISITIONS["ucb"](np.array([0.0, 1.0]), np.array([1.0, 0.0]), 0.0, 2.0, None)
+
+    np.testing.assert_allclose(U, [2.0, 1.0])
+
+
+def test_ei_no_uncertainty():
+    U = ACQUISITIONS["ei"](np.array([0.0, 2.0]), np.zeros(2), 1.0, 2.0, None)
+
+    np.testing.assert_allclose(U, [0.0, 1.0])
+
+
+def test_predict_batches(smis):
+    fps, _ = gen_packed_fps(smis, length=256)
+    y = np.array([smi.count("C") for smi in smis], dtype=float)
+    model = build_surrogate("rf", 0).fit(unpack(fps, 256), y)
+
+    Y_mean, Y_sd = predict(model, fps, 256, batch_size=7)
+    Y_mean_, _ = predict(model, fps, 256)
+
+    np.testing.assert_allclose(Y_mean, Y_mean_)
+    assert (Y_sd >= 0).all()
+
+
+@pytest.mark.parametrize("budget,batch_size", [(50, 10), (45, 20)])
+def test_budget(smis, budget, batch_size):
+    vs = FakeScreen()
+    learner = ActiveLearner(vs, smis, budget, batch_size, acquisition="greedy", length=256, seed=0)
+    scores = learner.run()
+
+    assert vs.num_calls == learner.num_docked == budget
+    assert (~np.isnan(scores)).sum() == budget
+    assert [it.num_docked for it in learner.history][-1] == budget
+
+
+def test_recovery(smis):
+    """a greedy surrogate recovers more of the true top-k than random selection"""
+    reference = [-float(smi.count("C")) for smi in smis]
+
+    recoveries = {}
+    for acquisition in ("random", "greedy"):
+        learner = ActiveLearner(
+            FakeScreen(),
+            smis,
+            60,
+            20,
+            acquisition=acquisition,
+            k=10,
+            length=256,
+            reference=reference,
+            seed=0,
+        )
+        learner.run()
+        recoveries[acquisition] = learner.history[-1].recovery
+
+    assert recoveries["greedy"] > recoveries["random"]
+    assert "recovery" in learner.report()
+
+
+def test_invalid_acquisition(smis):
+    with pytest.raises(ValueError):
+        ActiveLearner(FakeScreen(), smis, 10, acquisition="foo")
+
+
+def test_read_reference(tmp_path):
+    filepath = tmp_path / "scores.csv"
+    filepath.write_text("smiles,score\nCCO,-5.0\nCCC,\nc1ccccc1,-7.5\n")
+
+    assert read_reference(filepath, ["c1ccccc1", "CCC", "CCO", "N"]) == [-7.5, None, -5.0, None]
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from pyscreener.utils import affinity
+from pyscreener.warnings import OversubscriptionWarning
+
+
+@pytest.fixture
+def slots(tmp_path):
+    return affinity.CoreSlots(2, range(5), tmp_path)
+
+
+def test_slots(slots):
+    assert len(slots) == 2
+    assert slots.cores == [0, 1, 2, 3, 4]
+    assert slots.slots == [[0, 1], [2, 3]]
+
+
+def test_slots_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        affinity.CoreSlots(0, range(4), tmp_path)
+
+
+def test_acquire_disjoint(slots):
+    with slots.acquire() as cores1:
+        with slots.acquire() as cores2:
+            with slots.acquire() as cores3:
+                assert cores3 is None
+
+    assert set(cores1).isdisjoint(cores2)
+
+
+def test_acquire_release(slots):
+    with slots.acquire() as cores1:
+        pass
+    with slots.acquire() as cores2:
+        pass
+
+    assert cores1 == cores2
+
+
+def test_pinned():
+    mask = os.sched_getaffinity(0)
+    core = min(mask)
+
+    with affinity.pinned([core]):
+        assert os.sched_getaffinity(0) == {core}
+
+    assert os.sched_getaffinity(0) == mask
+
+
+def test_pinned_none():
+    mask = os.sched_getaffinity(0)
+
+    with affinity.pinned(None):
+        assert os.sched_getaffinity(0) == mask
+
+
+def test_thread_env():
+    assert all(v == "4" for v in affinity.thread_env(4).values())
+
+
+@pytest.mark.parametrize("load,oversubscribed", [(8.0, True), (2.0, False)])
+def test_check_load(monkeypatch, load, oversubscribed):
+    monkeypatch.setattr(os, "getloadavg", lambda: (load, load, load))
+    monkeypatch.setattr(affinity, "LAST_CHECK", float("-inf"))
+
+    if oversubscribed:
+        with pytest.warns(OversubscriptionWarning):
+            assert affinity.check_load(4, interval=0.0)
+    else:
+        assert not affinity.check_load(4, interval=0.0)
+
+
+def test_check_load_interval(monkeypatch):
+    monkeypatch.setattr(os, "getloadavg", lambda: (8.0, 8.0, 8.0))
+    monkeypatch.setattr(affinity, "LAST_CHECK", float("-inf"))
+
+    with pytest.warns(OversubscriptionWarning):
+        affinity.check_load(4, interval=3600)
+    assert not affinity.check_load(4, interval=3600)
+
+
+def test_run_pinned():
+    mask = os.sched_getaffinity(0)
+    cores = affinity.run_pinned(os.sched_getaffinity, 1, 0)
+
+    assert len(cores) == 1
+    assert os.sched_getaffinity(0) == mask
+
+
+def test_run_pinned_check_load(monkeypatch, slots):
+    """the load is checked against all of the cores of the node, not just those in whole slots"""
+    num_cores = []
+    pinned = affinity.pinned
+    monkeypatch.setattr(affinity, "core_slots", lambda ncpu: slots)
+    monkeypatch.setattr(affinity, "check_load", num_cores.append)
+    monkeypatch.setattr(affinity, "pinned", lambda cores: pinned(None))
+
+    assert affinity.run_pinned(lambda x: x, 2, 42) == 42
+    assert num_cores == [5]
@@ -0,0 +1,100 @@
+from collections import Counter
+
+import pytest
+
+from pyscreener.preprocessing.alerts import (
+    INVALID,
+    build_catalog,
+    compile_rule,
+    filter_alerts,
+    iter_alert_filtered,
+    read_smarts_file,
+)
+
+
+@pytest.fixture
+def smis():
+    return [
+        "CCO",
+        "Oc1ccc(O)cc1",
+        "CC(=O)NCCC1=CNc2c1cc(OC)cc2",
+        "c1ccccc1N=Nc1ccccc1",
+        "foo",
+        "CCCCCCCC(=O)Cl",
+        "c1ccccc1C(=O)O",
+    ]
+
+
+@pytest.fixture
+def smarts_file(tmp_path):
+    filepath = tmp_path / "alerts.txt"
+    filepath.write_text("# custom alerts\nC(=O)Cl acyl chloride\n\n[#9]\n")
+
+    return filepath
+
+
+def test_read_smarts_file(smarts_file):
+    assert read_smarts_file(smarts_file) == [("C(=O)Cl", "acyl chloride"), ("[#9]", "[#9]")]
+
+
+def test_compile_rule():
+    rule = compile_rule("[#7]C(=O)[Cl]", "acyl")
+
+    assert rule.elements == {6, 7, 8, 17}
+    assert rule.num_atoms == 4
+
+
+def test_compile_rule_no_elements():
+    rule = compile_rule("[N,O]*", "any")
+
+    assert rule.elements == set()
+
+
+@pytest.mark.parametrize(
+    "smarts,elements",
+    [("A", set()), ("[R]", set()), ("[r]", set()), ("a", set()), ("[C;!R,N]", set()), ("Ac", {6})],
+)
+def test_compile_rule_query_primitives(smarts, elements):
+    """query primitives are not mistaken for element symbols"""
+    assert compile_rule(smarts, "query").elements == elements
+
+
+def test_compile_rule_invalid():
+    with pytest.raises(ValueError):
+        compile_rule("C(", "bad")
+    with pytest.raises(ValueError):
+        compile_rule("[Q]", "bad")
+
+
+def test_build_catalog_invalid():
+    with pytest.raises(ValueError):
+        build_catalog(("foo",))
+
+
+def test_build_catalog_cached(smarts_file):
+    assert build_catalog(("PAINS",), (str(smarts_file),)) is build_catalog(
+        ("PAINS",), (str(smarts_file),)
+    )
+
+
+def test_custom_only(smis, smarts_file):
+    smis_filtered, counts = filter_alerts(smis, (), [smarts_file])
+
+    assert smis_filtered == [smi for i, smi in enumerate(smis) if i not in (4, 5)]
+    assert counts == Counter({INVALID: 1, "acyl chloride": 1})
+
+
+@pytest.mark.parametrize("ncpu", [1, 2])
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_iter_alert_filtered(smis, smarts_file, ncpu, chunksize):
+    counts = Counter()
+    smis_filtered = list(
+        iter_alert_filtered(
+            iter(smis), smarts_files=[smarts_file], ncpu=ncpu, chunksize=chunksize, counts=counts
+        )
+    )
+
+    assert smis_filtered == ["CCO", "CC(=O)NCCC1=CNc2c1cc(OC)cc2", "c1ccccc1C(=O)O"]
+    assert sum(counts.values()) == len(smis) - len(smis_filtered)
+    assert counts[INVALID] == 1
+    assert counts["acyl chloride"] == 1
@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from ray import cloudpickle
+
+
+def test_submit(virtual_screen):
+    num_ligands = len(virtual_screen)
+
+    results = virtual_screen.submit("CCO").result(timeout=30)
+
+    assert [r.score for r in results] == [-3.0, -3.0]
+    assert len(virtual_screen) == num_ligands + 1
+    assert virtual_screen.resultss[-1] == results
+
+
+def test_submit_unique_names(virtual_screen):
+    futures = virtual_screen.submit_many(["CC", "CC", "CC"])
+    names = [f.result(timeout=30)[0].name for f in futures]
+
+    assert len(set(names)) == 3
+
+
+def test_submit_stream_unique_names(virtual_screen, smis):
+    """ligands submitted and streamed through the same screen are never given the same name"""
+    futures = virtual_screen.submit_many(smis)
+    names = [sims[0].name for sims, _ in virtual_screen.stream(smis)]
+    names.extend(f.result(timeout=30)[0].name for f in futures)
+    names.extend(sims[0].name for sims in virtual_screen.setup(smis))
+
+    assert len(set(names)) == 3 * len(smis)
+
+
+def test_record_concurrent(virtual_screen):
+    num_ligands = len(virtual_screen)
+    num_simulations = virtual_screen.num_simulations
+
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(1000):
+            pool.submit(virtual_screen.record, [], [None, None], False)
+
+    assert len(virtual_screen) == num_ligands + 1000
+    assert virtual_screen.num_simulations == num_simulations + 2000
+
+
+def test_pickle(virtual_screen):
+    """the screen is pickled to run its methods on every node of the ray cluster"""
+    virtual_screen_ = cloudpickle.loads(cloudpickle.dumps(virtual_screen))
+
+    assert virtual_screen_.name_ligands(1) == virtual_screen.name_ligands(1)
+
+
+def test_submit_exception(virtual_screen):
+    with pytest.raises(RuntimeError):
+        virtual_screen.submit("fail").result(timeout=30)
+
+
+def test_dock(virtual_screen, smis):
+    S = asyncio.run(virtual_screen.dock(smis))
+
+    np.testing.assert_array_equal(S, [-float(len(smi)) for smi in smis])
+
+
+def test_dock_overlaps(virtual_screen, smis):
+    """the event loop is free to run other coroutines while ligands are docking"""
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(tick())
+        S = await virtual_screen.dock(smis)
+        task.cancel()
+
+        return S, ticks
+
+    S, ticks = asyncio.run(main())
+
+    assert len(S) == len(smis)
+    assert ticks > 1
+
+
+@pytest.mark.parametrize("window", [1, 2, None])
+def test_as_completed(virtual_screen, smis, window):
+    async def main():
+        return [
+            (sims, results)
+            async for sims, results in virtual_screen.as_completed(smis, window=window)
+        ]
+
+    out = asyncio.run(main())
+
+    assert sorted(sims[0].smi for sims, _ in out) == sorted(smis)
+    for sims, results in out:
+        assert [r.smiles for r in results] == [sim.smi for sim in sims]
+
+
+def test_as_completed_async_source(virtual_screen, smis):
+    async def source():
+        for smi in smis:
+            await asyncio.sleep(0)
+            yield smi
+
+    async def main():
+        return [results async for _, results in virtual_screen.as_completed(source(), window=2)]
+
+    out = asyncio.run(main())
+
+    assert sorted(results[0].smiles for results in out) == sorted(smis)
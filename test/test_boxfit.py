@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from pyscreener.utils.boxfit import check_fits, embed, fits, iter_fits, span
+
+
+@pytest.fixture
+def X():
+    return np.array([[0.0, 0.0, 0.0], [10.0, 0.0, 0.0], [0.0, 4.0, 0.0], [10.0, 4.0, 0.0]])
+
+
+def test_span(X):
+    assert span(X) == pytest.approx(np.sqrt(116))
+
+
+def test_span_rotation_invariant(X):
+    theta = np.pi / 5
+    R = np.array([[np.cos(theta), -np.sin(theta), 0], [np.sin(theta), np.cos(theta), 0], [0, 0, 1]])
+
+    assert span(X) == pytest.approx(span(X @ R.T + 3.0))
+
+
+@pytest.mark.parametrize(
+    "size,tolerance,expected",
+    [
+        ((12, 6, 2), 0.0, True),
+        ((2, 6, 12), 0.0, True),
+        ((8, 6, 2), 0.0, False),
+        ((8, 6, 2), 2.0, True),
+        ((6, 6, 6), 0.0, False),
+        ((6, 6, 6), 1.0, True),
+    ],
+)
+def test_fits(X, size, tolerance, expected):
+    assert fits(X, size, tolerance) == expected
+
+
+def test_embed():
+    X = embed("c1ccccc1CCO")
+
+    assert X.shape == (9, 3)
+    assert embed("foo") is None
+
+
+def test_fits_diagonal():
+    """a rigid rod longer than every side of the box fits along its diagonal"""
+    X = np.linspace(0, 30, 16)[:, None] * np.ones(3) / np.sqrt(3)
+
+    assert fits(X, (20, 20, 20))
+    assert not fits(X, (17, 17, 17))
+
+
+def test_fits_principal_extents(X):
+    """coordinates fit even if a principal extent exceeds every side of the box, as long as their
+    span doesn't exceed its diagonal"""
+    assert fits(X, (8, 6, 6))
+    assert fits(X, (9, 5, 4))
+    assert not fits(X, (8, 3, 3))
+
+
+def test_check_fits():
+    smis = ["CCO", "C#C" * 12, "C#C" * 20, "foo"]
+
+    assert check_fits(smis, (20, 20, 20)) == [True, True, False, True]
+
+
+@pytest.mark.parametrize("ncpu", [1, 2])
+def test_iter_fits(ncpu):
+    smis = ["CCO", "C#C" * 20, "c1ccccc1", "c1ccc(cc1)" * 5 + "c1ccccc1"]
+    fitss = list(iter_fits(iter(smis), (20, 20, 20), ncpu=ncpu, chunksize=1))
+
+    assert fitss == list(zip(smis, [True, False, True, True]))
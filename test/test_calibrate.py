@@ -0,0 +1,31 @@
+import pytest
+
+from pyscreener.docking.calibrate import best_ncpu, best_ncpus, candidate_ncpus
+
+
+@pytest.fixture
+def throughputs():
+    return {8: {1: 800.0, 2: 1000.0, 4: 900.0, 8: 500.0}, 4: {1: 600.0, 2: 400.0, 4: 300.0}}
+
+
+@pytest.mark.parametrize(
+    "num_cpus,ncpus", [(1, [1]), (2, [1, 2]), (6, [1, 2, 4, 6]), (8, [1, 2, 4, 8])]
+)
+def test_candidate_ncpus(num_cpus, ncpus):
+    assert candidate_ncpus(num_cpus) == ncpus
+
+
+def test_best_ncpus(throughputs):
+    assert best_ncpus(throughputs) == {8: 2, 4: 1}
+
+
+@pytest.mark.parametrize("num_nodes,ncpu", [({8: 1, 4: 1}, 1), ({8: 4, 4: 1}, 2), ({8: 1}, 2)])
+def test_best_ncpu(throughputs, num_nodes, ncpu):
+    assert best_ncpu(throughputs, num_nodes) == ncpu
+
+
+def test_best_ncpu_unmeasured():
+    """a node type contributes nothing at a number of CPUs larger than its own"""
+    throughputs = {8: {1: 100.0, 8: 150.0}, 1: {1: 100.0}}
+
+    assert best_ncpu(throughputs, {8: 1, 1: 1}) == 1
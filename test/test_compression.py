@@ -0,0 +1,55 @@
+import gzip
+import io
+
+import pytest
+
+from pyscreener.utils.compression import (
+    compression,
+    iter_record_chunks,
+    open_file,
+    strip_compression,
+)
+
+
+@pytest.mark.parametrize(
+    "filepath,codec,inner",
+    [
+        ("ligands.smi", None, "ligands.smi"),
+        ("ligands.smi.gz", "gzip", "ligands.smi"),
+        ("ligands.csv.bz2", "bz2", "ligands.csv"),
+        ("ligands.sdf.xz", "xz", "ligands.sdf"),
+        ("ligands.sdf.zst", "zstd", "ligands.sdf"),
+    ],
+)
+def test_compression(filepath, codec, inner):
+    assert compression(filepath) == codec
+    assert strip_compression(filepath).name == inner
+
+
+def test_open_file(tmp_path):
+    p = tmp_path / "ligands.smi.gz"
+    with gzip.open(p, "wt") as fid:
+        fid.write("CCCC foo\nc1ccccc1 bar\n")
+
+    with open_file(p) as fid:
+        assert fid.read().splitlines() == ["CCCC foo", "c1ccccc1 bar"]
+
+
+@pytest.mark.parametrize("size", [1, 5, 16, 1000])
+def test_iter_record_chunks(size):
+    text = b"".join(f"CCC{'C' * i} ligand_{i}\n".encode() for i in range(20))
+
+    chunks = list(iter_record_chunks(io.BytesIO(text), size))
+
+    assert b"".join(chunks) == text
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+
+
+@pytest.mark.parametrize("size", [1, 5, 16, 1000])
+def test_iter_record_chunks_terminator(size):
+    text = b"".join(f"mol_{i}\nfoo\nbar\n$$$$\n".encode() for i in range(10))
+
+    chunks = list(iter_record_chunks(io.BytesIO(text), size, b"$$$$"))
+
+    assert b"".join(chunks) == text
+    assert all(chunk.endswith(b"$$$$\n") for chunk in chunks)
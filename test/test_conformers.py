@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from rdkit import Chem
+
+from pyscreener.utils.conformers import ConformerStore, embed, get_conformer
+
+
+@pytest.fixture
+def store_file(tmp_path):
+    return tmp_path / "conformers.db"
+
+
+@pytest.fixture
+def store(store_file):
+    store = ConformerStore(store_file)
+    yield store
+    store.close()
+
+
+def test_embed_seeded():
+    X_1 = embed("c1ccccc1CCO").GetConformer().GetPositions()
+    X_2 = embed("OCCc1ccccc1").GetConformer().GetPositions()
+
+    np.testing.assert_allclose(X_1, X_2)
+
+
+def test_embed_invalid():
+    assert embed("foo") is None
+
+
+def test_store_roundtrip(store):
+    mol = embed("CC(=O)Nc1ccccc1")
+    store.store("CC(=O)Nc1ccccc1", mol)
+
+    assert len(store) == 1
+    assert "O=C(C)Nc1ccccc1" in store
+
+    mol_stored = store.load("O=C(C)Nc1ccccc1")
+    assert mol_stored.GetNumAtoms() == mol.GetNumAtoms()
+    np.testing.assert_allclose(
+        mol_stored.GetConformer().GetPositions(), mol.GetConformer().GetPositions(), atol=1e-4
+    )
+    assert [a.GetDoubleProp("_GasteigerCharge") for a in mol_stored.GetAtoms()] == pytest.approx(
+        [a.GetDoubleProp("_GasteigerCharge") for a in mol.GetAtoms()], abs=1e-5
+    )
+
+
+def test_store_miss(store):
+    assert store.load("CCO") is None
+    assert "CCO" not in store
+
+
+def test_store_mismatched_atoms(store):
+    store.put("CCO", [6, 6, 7], np.zeros((3, 3)), np.zeros(3))
+
+    assert store.load("CCO") is None
+
+
+def test_get_conformer_populates(store_file):
+    mol = get_conformer("c1ccccc1O", store_file)
+    mol_cached = get_conformer("Oc1ccccc1", store_file)
+
+    assert Chem.MolToSmiles(Chem.RemoveHs(mol_cached)) == "Oc1ccccc1"
+    np.testing.assert_allclose(
+        mol_cached.GetConformer().GetPositions(), mol.GetConformer().GetPositions(), atol=1e-4
+    )
+    assert len(ConformerStore(store_file)) == 1
+
+
+def test_get_conformer_no_store():
+    assert get_conformer("CCO").GetNumConformers() == 1
+    assert get_conformer("foo") is None
+
+
+def test_get_conformer_threads(store_file):
+    """the store may be used concurrently from multiple threads of the same process"""
+    smis = ["CCO", "CCN", "CCC", "c1ccccc1", "CC(=O)O", "CCCl", "OCCO", "NCCN"]
+    with ThreadPoolExecutor(4) as pool:
+        mols = list(pool.map(lambda smi: get_conformer(smi, store_file), smis))
+
+    assert all(mol.GetNumConformers() == 1 for mol in mols)
+    assert len(ConformerStore(store_file)) == len(smis)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from pyscreener.docking.cost import CostModel, featurize
+
+
+@pytest.fixture
+def model():
+    return CostModel()
+
+
+@pytest.mark.parametrize(
+    "smi,x", [("C", [1, 0, 1, 0]), ("CCCCCC", [1, 3, 6, 0]), ("c1ccccc1CCO", [1, 2, 9, 1])]
+)
+def test_featurize(smi, x):
+    np.testing.assert_array_equal(featurize(smi), x)
+
+
+@pytest.mark.parametrize("smi", [None, "foo"])
+def test_featurize_invalid(smi):
+    assert featurize(smi) is None
+
+
+def test_predict_flexible(model):
+    """more flexible ligands are predicted to take longer"""
+    c1, c2 = model.predict([featurize("CCCC"), featurize("CCCCCCCCCCCC")])
+
+    assert c2 > c1
+
+
+def test_predict_no_features(model):
+    model.update(featurize("CCO"), 4.0)
+    model.update(None, 2.0)
+
+    np.testing.assert_allclose(model.predict([None]), [3.0])
+
+
+def test_update_fit(model):
+    """the model recovers the scale and flexibility dependence of observed docking times"""
+    smis = ["C" * n for n in range(2, 20)]
+    for _ in range(10):
+        for smi in smis:
+            model.update(featurize(smi), 0.1 * np.exp(0.3 * len(smi)))
+
+    c = model.predict([featurize("C" * 10), featurize("C" * 25)])
+    np.testing.assert_allclose(c, 0.1 * np.exp(0.3 * np.array([10, 25])), rtol=0.05)
+
+
+def test_eta(model):
+    xs = [featurize(smi) for smi in ["CCCC", "CCCCCC", "CCO", "CCCCCCCCCC"]]
+    costs = model.predict(xs)
+
+    assert model.eta(xs, 2) == pytest.approx(max(costs.sum() / 2, costs.max()))
+    assert model.eta(xs, 100) == pytest.approx(costs.max())
+    assert model.eta(xs, 2, num_sims=2) == pytest.approx(max(costs.sum(), costs.max()))
+
+
+def test_eta_unseen(model):
+    assert model.eta([], 1) == 0.0
+    assert model.eta([], 4, num_unseen=8) == pytest.approx(2 * model.mean_time)
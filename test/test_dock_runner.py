@@ -0,0 +1,159 @@
+import os
+from pathlib import Path
+import sys
+import tempfile
+from unittest import mock
+
+import pytest
+
+from pyscreener.docking import Simulation
+from pyscreener.exceptions import MisconfiguredDirectoryError, MissingEnvironmentVariableError
+from pyscreener.warnings import SimulationFailureWarning
+
+# a stand-in for the DOCK6 executable. Each molecule in the ligand file is "docked" to a single
+# pose with a score of -(number of atoms). The molecule named "crash" aborts a multi-molecule run
+DOCK6 = """\
+import sys
+
+argv = sys.argv[1:]
+params = dict(line.split(maxsplit=1) for line in open(argv[argv.index("-i") + 1]).read().splitlines())
+ligand_file = params["ligand_atom_file"]
+mol2s = open(ligand_file).read().split("@<TRIPOS>MOLECULE\\n")[1:]
+
+with open(argv[argv.index("-o") + 1], "w") as log, open(
+    f"{params['ligand_outfile_prefix']}_scored.mol2", "w"
+) as out:
+    for mol2 in mol2s:
+        name, counts = mol2.splitlines()[:2]
+        if name == "crash" and "_batch" in ligand_file:
+            exit(1)
+        score = -float(counts.split()[0])
+        log.write(f"Molecule: {name}\\n\\n Grid_Score: {score}\\n")
+        out.write(f"########## Name: {name}\\n@<TRIPOS>MOLECULE\\n{name}\\n")
+"""
+
+
+def fake_install(path: Path):
+    (path / "parameters").mkdir()
+    for filename in ("vdw_AMBER_parm99.defn", "flex.defn", "flex_drive.tbl"):
+        (path / "parameters" / filename).touch()
+    (path / "bin").mkdir()
+    for filename in ("sphgen_cpp", "sphere_selector", "showbox", "grid"):
+        (path / "bin" / filename).touch()
+    dock6 = path / "bin" / "dock6"
+    dock6.write_text(f"#!{sys.executable}\n{DOCK6}")
+    dock6.chmod(0o755)
+
+
+try:
+    with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(
+        os.environ, {"DOCK6": os.environ.get("DOCK6", tmp_dir)}
+    ):
+        if os.environ["DOCK6"] == tmp_dir:
+            fake_install(Path(tmp_dir))
+        from pyscreener.docking.dock import DOCKMetadata
+        from pyscreener.docking.dock.runner import DOCKRunner
+except (MissingEnvironmentVariableError, MisconfiguredDirectoryError):
+    pytestmark = pytest.mark.skip()
+
+
+def mol2(name: str, num_atoms: int) -> str:
+    return f"@<TRIPOS>MOLECULE\n{name}\n{num_atoms} 0 0 0 0\nSMALL\nUSER_CHARGES\n"
+
+
+@pytest.fixture
+def dock6(tmp_path, monkeypatch):
+    path = tmp_path / "dock6"
+    path.mkdir()
+    fake_install(path)
+    monkeypatch.setattr("pyscreener.docking.dock.runner.DOCK", path / "bin" / "dock6")
+
+
+@pytest.fixture
+def sims(tmp_path):
+    in_path = tmp_path / "inputs"
+    out_path = tmp_path / "outputs"
+    in_path.mkdir()
+    out_path.mkdir()
+
+    sims = []
+    for i, name in enumerate(["ligand_0", "ligand_1", "ligand_2"]):
+        prepared_ligand = in_path / f"{name}.mol2"
+        prepared_ligand.write_text(mol2("UNNAMED", i + 1))
+        metadata = DOCKMetadata(
+            prepared_ligand=prepared_ligand, prepared_receptor=("rec.sph", "rec")
+        )
+        sims.append(Simulation("C", None, None, None, metadata, 1, name, None, in_path, out_path))
+
+    return sims
+
+
+def test_rename_mol2():
+    text = mol2("UNNAMED", 3) + mol2("UNNAMED", 4)
+    renamed = DOCKRunner.rename_mol2(text, "foo")
+
+    assert renamed.splitlines()[1] == "foo"
+    assert renamed.count("UNNAMED") == 1
+
+
+def test_split_batch_logfile(tmp_path):
+    logfile = tmp_path / "batch.log"
+    logfile.write_text(
+        "DOCK v6.9\n\n"
+        "Molecule: a\n\n Grid_Score: -7.1\n Grid_Score: -6.5\n"
+        "Molecule: b\n\n Grid_Score: -5.2\n"
+    )
+    logs = DOCKRunner.split_batch_logfile(logfile)
+
+    assert list(logs) == ["a", "b"]
+    assert logs["a"].count("Grid_Score") == 2
+    assert "DOCK" not in logs["a"]
+
+
+def test_split_batch_logfile_missing(tmp_path):
+    assert DOCKRunner.split_batch_logfile(tmp_path / "batch.log") is None
+
+
+def test_split_batch_outfile(tmp_path):
+    outfile = tmp_path / "batch_scored.mol2"
+    outfile.write_text(
+        "########## Name: a\n########## Grid_Score: -7.1\n"
+        + mol2("a", 3)
+        + "########## Name: b\n########## Grid_Score: -5.2\n"
+        + mol2("b", 4)
+        + "########## Name: a\n########## Grid_Score: -6.5\n"
+        + mol2("a", 3)
+    )
+    poses = DOCKRunner.split_batch_outfile(outfile)
+
+    assert list(poses) == ["a", "b"]
+    assert poses["a"].count("@<TRIPOS>MOLECULE") == 2
+    assert poses["b"].count("@<TRIPOS>MOLECULE") == 1
+
+
+def test_split_batch_outfile_missing(tmp_path):
+    assert DOCKRunner.split_batch_outfile(tmp_path / "batch_scored.mol2") is None
+
+
+def test_run_batch(dock6, sims):
+    DOCKRunner.run_batch(sims)
+
+    out_path = sims[0].out_path
+    for i, sim in enumerate(sims):
+        name = DOCKRunner.output_name(sim)
+
+        assert sim.result.score == -(i + 1)
+        assert (out_path / f"{name}.log").exists()
+        assert f"Name: {sim.name}" in (out_path / f"{name}_scored.mol2").read_text()
+    assert not any("_batch" in p.name for p in out_path.iterdir())
+    assert not any("_batch" in p.name for p in sims[0].in_path.iterdir())
+
+
+def test_run_batch_rerun(dock6, sims):
+    """ligands missing from a crashed batched run are run individually"""
+    sims[1].name = "crash"
+
+    with pytest.warns(SimulationFailureWarning):
+        DOCKRunner.run_batch(sims)
+
+    assert [sim.result.score for sim in sims] == [-1, -2, -3]
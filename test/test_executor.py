@@ -0,0 +1,124 @@
+import asyncio
+from pathlib import Path
+import sys
+import time
+
+import pytest
+import ray
+
+from pyscreener.docking import Result, Simulation
+from pyscreener.docking.executor import Executor, ExecutorPool
+from pyscreener.utils.conformers import ConformerStore, get_conformer
+
+from .conftest import FakeMetadata, FakeRunner
+
+DELAY = 0.3
+
+
+class CommandRunner(FakeRunner):
+    @staticmethod
+    def build_command(sim):
+        out = Path(sim.out_path) / f"{sim.name}.out"
+        code = f"import time; time.sleep({DELAY}); open({str(out)!r}, 'w').write('-{len(sim.smi)}')"
+
+        return [sys.executable, "-c", code]
+
+    @staticmethod
+    def parse_results(sim):
+        scores = [float((Path(sim.out_path) / f"{sim.name}.out").read_text())]
+        sim.result = Result(sim.smi, sim.name, "node", scores[0])
+
+        return scores
+
+
+class ConformerRunner(FakeRunner):
+    @staticmethod
+    def prepare_ligand(sim):
+        mol = get_conformer(sim.smi, sim.conformer_store)
+        sim.metadata.prepared_ligand = Path(sim.in_path) / f"{sim.name}.txt"
+        sim.metadata.prepared_ligand.write_text(f"{mol.GetNumAtoms()}")
+
+        return True
+
+
+@pytest.fixture
+def sims(tmp_path):
+    return [
+        Simulation(
+            smi, None, None, None, FakeMetadata(), 1, f"ligand_{i}", None, tmp_path, tmp_path
+        )
+        for i, smi in enumerate(["C", "CC", "CCC", "CCCC"])
+    ]
+
+
+def run_all(executor, sims):
+    async def main():
+        return await asyncio.gather(*[executor.prepare_and_run(sim) for sim in sims])
+
+    return asyncio.run(main())
+
+
+def test_executor_invalid_slots():
+    with pytest.raises(ValueError):
+        Executor(CommandRunner, 0)
+
+
+def test_executor(sims):
+    results = run_all(Executor(CommandRunner, len(sims)), sims)
+
+    assert [r.score for r in results] == [-1, -2, -3, -4]
+    assert all(r.time is not None for r in results)
+
+
+def test_executor_slots(sims):
+    start = time.perf_counter()
+    run_all(Executor(CommandRunner, 2), sims)
+
+    assert time.perf_counter() - start >= len(sims) / 2 * DELAY
+
+
+def test_executor_prep_failure(sims, tmp_path):
+    sims.append(
+        Simulation("foo", None, None, None, FakeMetadata(), 1, "bad", None, tmp_path, tmp_path)
+    )
+    results = run_all(Executor(CommandRunner, len(sims)), sims)
+
+    assert results[-1] is None
+    assert all(r is not None for r in results[:-1])
+
+
+def test_executor_in_process(sims):
+    results = run_all(Executor(FakeRunner, 2), sims)
+
+    assert [r.score for r in results] == [-1, -2, -3, -4]
+
+
+def test_executor_conformer_store(tmp_path):
+    """ligands may be prepared from a conformer store on multiple prep threads"""
+    store = tmp_path / "conformers.db"
+    smis = ["CCO", "CCN", "CCC", "c1ccccc1", "CC(=O)O", "CCCl", "OCCO", "NCCN"]
+    sims = [
+        Simulation(
+            smi, None, None, None, FakeMetadata(), 1, f"ligand_{i}", None, tmp_path, tmp_path
+        )
+        for i, smi in enumerate(smis)
+    ]
+    for sim in sims:
+        sim.conformer_store = str(store)
+    results = run_all(Executor(ConformerRunner, 2, num_prep_workers=4), sims)
+
+    assert all(r is not None for r in results)
+    assert len(ConformerStore(store)) == len(sims)
+
+
+def test_set_ncpu_kills_executors(build_virtual_screen, tmp_path, sims):
+    """the executors of the previous pool are killed when the number of CPUs is reset"""
+    virtual_screen = build_virtual_screen(tmp_path, executor=True)
+    pool = virtual_screen.prepare_and_run
+    virtual_screen.set_ncpu(1)
+
+    assert isinstance(virtual_screen.prepare_and_run, ExecutorPool)
+    assert virtual_screen.prepare_and_run is not pool
+    assert ray.get(virtual_screen.prepare_and_run.remote(sims[0])).score == -1
+    with pytest.raises(ray.exceptions.RayActorError):
+        ray.get(pool.remote(sims[0]))
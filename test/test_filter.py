@@ -0,0 +1,74 @@
+import pytest
+from rdkit import Chem
+from rdkit.Chem import Crippen, Descriptors
+
+from pyscreener.preprocessing.filter import check_smi, filter_ligands, filter_smis, iter_filtered
+
+
+@pytest.fixture
+def smis():
+    return [
+        "CCCCCCC",
+        "C1CCC1",
+        "CC(=O)NCCC1=CNc2c1cc(OC)cc2",
+        "CCCCCCCCCCCCCCCCCCCCCCCCCCCCCC",
+        "c1ccccc1C(=O)O",
+        "foo",
+        "C(C)(C)(C)(C)C",
+        "OC[C@@H](O1)[C@@H](O)[C@H](O)[C@@H](O)[C@H](O)1",
+    ]
+
+
+@pytest.fixture(params=[{}, {"max_atoms": 10}, {"max_weight": 150}, {"max_logP": 1.0}])
+def criteria(request):
+    return request.param
+
+
+def expected(smis, max_atoms=None, max_weight=None, max_logP=None):
+    passed = []
+    for smi in smis:
+        mol = Chem.MolFromSmiles(smi)
+        if mol is None:
+            continue
+        if max_atoms is not None and mol.GetNumHeavyAtoms() > max_atoms:
+            continue
+        if max_weight is not None and Descriptors.MolWt(mol) > max_weight:
+            continue
+        if max_logP is not None and Crippen.MolLogP(mol) > max_logP:
+            continue
+        passed.append(smi)
+
+    return passed
+
+
+def test_check_smi_invalid():
+    assert not check_smi("foo")
+    assert not check_smi("C(C)(C)(C)(C)C")
+
+
+@pytest.mark.parametrize("ncpu", [1, 2])
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_iter_filtered(smis, criteria, ncpu, chunksize):
+    filtered = list(iter_filtered(iter(smis), **criteria, ncpu=ncpu, chunksize=chunksize))
+
+    assert filtered == expected(smis, **criteria)
+
+
+def test_filter_smis_names(smis, criteria):
+    names = [f"ligand_{i}" for i in range(len(smis))]
+    criteria = {"max_atoms": None, "max_weight": None, "max_logP": None, **criteria}
+
+    smis_filtered, names_filtered = filter_smis(smis, names, **criteria)
+
+    assert smis_filtered == expected(smis, **criteria)
+    assert names_filtered == [names[smis.index(smi)] for smi in smis_filtered]
+
+
+def test_filter_csv(smis, tmp_path):
+    p_csv = tmp_path / "ligands.csv"
+    p_csv.write_text("smiles\n" + "\n".join(smis) + "\n")
+
+    smis_filtered, names = filter_ligands(str(p_csv), max_atoms=10)
+
+    assert smis_filtered == expected(smis, max_atoms=10)
+    assert names is None
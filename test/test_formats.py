@@ -0,0 +1,137 @@
+import pytest
+from rdkit import Chem
+
+from pyscreener.utils.conformers import embed
+from pyscreener.utils.formats import (
+    ad_type,
+    rotatable_bonds,
+    sybyl_type,
+    to_mol2,
+    to_pdbqt,
+    write_ligand,
+)
+
+
+@pytest.fixture(
+    params=[
+        ("c1ccccc1", 0),
+        ("CCCC", 1),
+        ("CC(=O)Nc1ccc(O)cc1", 1),
+        ("CCN(CC)CCOC(=O)c1ccc(N)cc1", 7),
+        ("CC#CCC", 0),
+    ]
+)
+def smi_torsdof(request):
+    return request.param
+
+
+def atom_lines(pdbqt: str):
+    return [line for line in pdbqt.splitlines() if line.startswith("ATOM")]
+
+
+def test_rotatable_bonds(smi_torsdof):
+    smi, torsdof = smi_torsdof
+
+    assert len(rotatable_bonds(embed(smi))) == torsdof
+
+
+def test_pdbqt(smi_torsdof):
+    smi, torsdof = smi_torsdof
+    mol = embed(smi)
+    pdbqt = to_pdbqt(mol, "ligand")
+    lines = pdbqt.splitlines()
+
+    assert lines[-1] == f"TORSDOF {torsdof}"
+    assert len(atom_lines(pdbqt)) == mol.GetNumAtoms()
+    assert [int(line[6:11]) for line in atom_lines(pdbqt)] == list(range(1, mol.GetNumAtoms() + 1))
+    assert sum(line.startswith("BRANCH") for line in lines) == torsdof
+    assert sum(line.startswith("ENDBRANCH") for line in lines) == torsdof
+
+
+def test_pdbqt_columns():
+    mol = embed("CC(=O)Nc1ccc(O)cc1")
+    lines = atom_lines(to_pdbqt(mol))
+    charges = [float(line[70:76]) for line in lines]
+    types = {line[77:79].strip() for line in lines}
+
+    assert sum(charges) == pytest.approx(0, abs=0.01)
+    assert types == {"C", "A", "N", "OA", "H", "HD"}
+
+
+def test_pdbqt_no_conformer():
+    with pytest.raises(ValueError):
+        to_pdbqt(Chem.AddHs(Chem.MolFromSmiles("CCO")))
+
+
+@pytest.mark.parametrize(
+    "smi,i,expected",
+    [("c1ccncc1", 3, "NA"), ("c1cc[nH]c1", 3, "N"), ("CCN(C)C", 2, "NA"), ("CC(=O)NC", 3, "N")],
+)
+def test_ad_type_nitrogen(smi, i, expected):
+    assert ad_type(Chem.AddHs(Chem.MolFromSmiles(smi)).GetAtomWithIdx(i)) == expected
+
+
+def test_ad_type_unsupported():
+    with pytest.raises(ValueError):
+        ad_type(Chem.MolFromSmiles("[Si]").GetAtomWithIdx(0))
+
+
+@pytest.mark.parametrize(
+    "smi,i,expected",
+    [
+        ("CC(=O)NC", 3, "N.am"),
+        ("CC(=O)[O-]", 2, "O.co2"),
+        ("CS(=O)(=O)C", 1, "S.O2"),
+        ("C[N+](C)(C)C", 1, "N.4"),
+        ("CC#N", 2, "N.1"),
+    ],
+)
+def test_sybyl_type(smi, i, expected):
+    assert sybyl_type(Chem.AddHs(Chem.MolFromSmiles(smi)).GetAtomWithIdx(i)) == expected
+
+
+@pytest.mark.parametrize("smi", ["CC(=O)Nc1ccc(O)cc1", "CCN(CC)CCOC(=O)c1ccc(N)cc1", "CC(=O)[O-]"])
+def test_mol2_roundtrip(smi):
+    mol = Chem.MolFromMol2Block(to_mol2(embed(smi)))
+
+    assert Chem.MolToSmiles(Chem.RemoveHs(mol)) == Chem.MolToSmiles(Chem.MolFromSmiles(smi))
+
+
+@pytest.mark.parametrize("fmt", ["pdbqt", "mol2"])
+def test_write_ligand(tmp_path, fmt):
+    filepath = tmp_path / f"ligand.{fmt}"
+    mol = embed("CCCC")
+    write_ligand(mol, filepath, fmt)
+
+    assert filepath.read_text() == (to_pdbqt(mol) if fmt == "pdbqt" else to_mol2(mol))
+
+
+def test_write_ligand_fallback(tmp_path):
+    pytest.importorskip("openbabel")
+
+    filepath = tmp_path / "ligand.pdbqt"
+    mol = embed("C[Si](C)(C)C")
+    write_ligand(mol, filepath, "pdbqt")
+
+    assert "Si" in filepath.read_text()
+
+
+@pytest.mark.parametrize("smi", ["c1ccccc1N.Cl", "CCN(CC)CC.OC(=O)C(=O)O"])
+def test_write_ligand_fragments(tmp_path, smi):
+    """molecules with multiple fragments are written with all of their atoms via OpenBabel"""
+    pytest.importorskip("openbabel")
+
+    filepath = tmp_path / "ligand.pdbqt"
+    mol = embed(smi)
+    with pytest.raises(ValueError):
+        to_pdbqt(mol)
+    write_ligand(mol, filepath, "pdbqt")
+
+    lines = filepath.read_text().splitlines()
+
+    assert sum(line.startswith(("ATOM", "HETATM")) for line in lines) == mol.GetNumAtoms()
+
+
+def test_write_ligand_invalid_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_ligand(embed("CCCC"), tmp_path / "ligand.pdb", "pdb")
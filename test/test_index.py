@@ -0,0 +1,164 @@
+import pytest
+
+from pyscreener.utils.index import (
+    OffsetIndex,
+    format_reference,
+    read_reference,
+    read_records,
+    shard_byte_range,
+    split_byte_ranges,
+)
+
+
+@pytest.fixture(
+    params=[
+        ["CCCCCCC", "C1CCC1", "CC(=O)CC", "CCCCCCCC", "CCCC1CC1"],
+        ["C", "N", "O"],
+        ["CC(=O)NCCC1=CNc2c1cc(OC)cc2", "CN=C=O", "CN1CCC[C@H]1c2cccnc2"],
+    ]
+)
+def records(request):
+    return request.param
+
+
+@pytest.fixture(params=[True, False])
+def title_line(request):
+    return request.param
+
+
+@pytest.fixture(params=["\n", ""])
+def terminator(request):
+    return request.param
+
+
+@pytest.fixture
+def filepath(tmp_path, records, title_line, terminator):
+    p = tmp_path / "records.smi"
+    with open(p, "w") as fid:
+        if title_line:
+            fid.write("smiles\n")
+        fid.write("\n".join(records) + terminator)
+
+    return p
+
+
+def test_len(filepath, records, title_line):
+    index = OffsetIndex(filepath, title_line)
+
+    assert len(index) == len(records)
+
+
+def test_getitem(filepath, records, title_line):
+    index = OffsetIndex(filepath, title_line)
+
+    assert [index[i] for i in range(len(index))] == records
+    assert index[-1] == records[-1]
+    with pytest.raises(IndexError):
+        index[len(records)]
+
+
+def test_slice(filepath, records, title_line):
+    index = OffsetIndex(filepath, title_line)
+
+    assert index[:] == records
+    assert index[1:] == records[1:]
+    assert index[::2] == records[::2]
+
+
+def test_byte_range(filepath, records, title_line):
+    index = OffsetIndex(filepath, title_line)
+
+    assert read_records(filepath, *index.byte_range(1, len(index))) == records[1:]
+
+
+def test_cache(filepath, records, title_line):
+    index = OffsetIndex(filepath, title_line)
+
+    assert index.cache_file.exists()
+    assert index.load() is not None
+    assert OffsetIndex(filepath, not title_line, cache=False).load() is None
+
+    with open(filepath, "a") as fid:
+        fid.write("\nCCO\n")
+
+    assert index.load() is None
+    assert len(OffsetIndex(filepath, title_line)) == len(records) + 1
+
+
+def test_blank_lines(tmp_path):
+    p = tmp_path / "records.smi"
+    with open(p, "w") as fid:
+        fid.write("\n\nCC\n\nCCC\n\n")
+
+    assert OffsetIndex(p)[:] == ["CC", "CCC"]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10])
+def test_split_byte_ranges(filepath, records, title_line, n):
+    ranges = split_byte_ranges(filepath, n, None, title_line)
+
+    assert len(ranges) <= n
+    assert all(i < j for i, j in ranges)
+    assert [r for start, stop in ranges for r in read_records(filepath, start, stop)] == records
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10])
+def test_split_byte_ranges_terminator(tmp_path, n):
+    p = tmp_path / "records.sdf"
+    records = [f"mol_{i}\nfoo\nbar\n$$$$\n" for i in range(5)]
+    with open(p, "w") as fid:
+        fid.write("".join(records))
+
+    ranges = split_byte_ranges(p, n, b"$$$$")
+    with open(p) as fid:
+        text = fid.read()
+
+    assert "".join(text[i:j] for i, j in ranges) == text
+    assert all(text[i:j].endswith("$$$$\n") for i, j in ranges)
+
+
+@pytest.mark.parametrize("trailing", ["", "\n\n"])
+def test_multirecord(tmp_path, trailing):
+    p = tmp_path / "records.sdf"
+    records = [f"mol_{i}\nfoo\nbar\n$$$$" for i in range(5)]
+    with open(p, "w") as fid:
+        fid.write("\n".join(records) + trailing)
+
+    index = OffsetIndex(p, terminator=b"$$$$")
+
+    assert len(index) == len(records)
+    assert [index[i] for i in range(len(index))] == records
+    assert index[1:3] == records[1:3]
+
+
+def test_reference(tmp_path):
+    p = tmp_path / "records.sdf"
+    records = [f"mol_{i}\nfoo\nbar\n$$$$" for i in range(5)]
+    with open(p, "w") as fid:
+        fid.write("\n".join(records) + "\n")
+
+    assert read_reference(format_reference(p, 3)) == (str(p), records[3])
+    assert read_reference(p) == (str(p), None)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10])
+def test_shard_byte_range(filepath, records, title_line, n):
+    ranges = [shard_byte_range(filepath, i, n, title_line=title_line) for i in range(n)]
+
+    assert all(i <= j for i, j in ranges)
+    assert all(ranges[k][1] == ranges[k + 1][0] for k in range(n - 1))
+    assert [r for start, stop in ranges for r in read_records(filepath, start, stop)] == records
+
+
+@pytest.mark.parametrize("chunksize", [4, 1 << 26])
+def test_whitespace_lines(tmp_path, monkeypatch, chunksize):
+    """CRLF blank lines and whitespace-only lines are not records, even across chunk boundaries"""
+    monkeypatch.setattr("pyscreener.utils.index.CHUNKSIZE", chunksize)
+    p = tmp_path / "records.smi"
+    with open(p, "wb") as fid:
+        fid.write(b"smiles name\r\nCCO a\r\n\r\nCCC b\r\n   \nCCN c\n \t ")
+
+    index = OffsetIndex(p, True)
+
+    assert len(index) == 3
+    assert [line.strip() for line in index[:]] == ["CCO a", "CCC b", "CCN c"]
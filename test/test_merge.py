@@ -0,0 +1,101 @@
+import csv
+import random
+import tarfile
+
+import pytest
+
+from pyscreener.merge import main, merge_archives, merge_csvs
+
+
+@pytest.fixture
+def scoress():
+    random.seed(42)
+    scoress = [sorted(random.uniform(-12, 0) for _ in range(n)) for n in (10, 0, 25, 3)]
+
+    return [scores + [None] for scores in scoress]
+
+
+def write_scores(filepath, scores):
+    with open(filepath, "w") as fid:
+        writer = csv.writer(fid)
+        writer.writerow(["smiles", "score"])
+        writer.writerows((f"C{'C' * i}", score) for i, score in enumerate(scores))
+
+
+def read_scores(filepath):
+    with open(filepath) as fid:
+        reader = csv.reader(fid)
+        next(reader)
+        return [float(row[1]) if row[1] else None for row in reader]
+
+
+def test_merge_csvs(tmp_path, scoress):
+    filepaths = []
+    for i, scores in enumerate(scoress):
+        filepaths.append(tmp_path / f"scores_{i}.csv")
+        write_scores(filepaths[-1], scores)
+
+    num_rows = merge_csvs(filepaths, tmp_path / "scores.csv")
+    scores = read_scores(tmp_path / "scores.csv")
+
+    assert num_rows == len(scores) == sum(len(scores) for scores in scoress)
+    assert scores[: -len(scoress)] == sorted(s for scores in scoress for s in scores[:-1])
+    assert scores[-len(scoress) :] == [None] * len(scoress)
+
+
+def test_merge_unsorted(tmp_path):
+    write_scores(tmp_path / "scores_0.csv", [-1.0, -2.0])
+    write_scores(tmp_path / "scores_1.csv", [-1.0])
+
+    with pytest.raises(ValueError):
+        merge_csvs([tmp_path / "scores_0.csv", tmp_path / "scores_1.csv"], tmp_path / "scores.csv")
+
+
+def test_merge_archives(tmp_path):
+    archives = []
+    for i in range(3):
+        p = tmp_path / f"file_{i}.txt"
+        p.write_text(f"foo_{i}")
+        archives.append((f"shard_{i}", tmp_path / f"archive_{i}.tar.gz"))
+        with tarfile.open(archives[-1][1], "w:gz") as tar:
+            tar.add(p, arcname=f"outputs/{p.name}")
+
+    num_members = merge_archives(archives, tmp_path / "archives.tar.gz")
+
+    with tarfile.open(tmp_path / "archives.tar.gz") as tar:
+        names = tar.getnames()
+        assert tar.extractfile("shard_1/outputs/file_1.txt").read() == b"foo_1"
+
+    assert num_members == len(names) == 3
+
+
+def test_main(tmp_path, scoress):
+    paths = []
+    for i, scores in enumerate(scoress):
+        paths.append(tmp_path / f"shard_{i}")
+        paths[-1].mkdir()
+        write_scores(paths[-1] / "scores.csv", scores)
+
+    main([*map(str, paths), "-o", str(tmp_path / "merged")])
+
+    assert len(read_scores(tmp_path / "merged" / "scores.csv")) == sum(map(len, scoress))
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_merge_tables(tmp_path, output_format):
+    pytest.importorskip("pyarrow")
+    from pyscreener.docking import Result, Simulation
+    from pyscreener.docking.writer import build_writer
+    from pyscreener.merge import merge_tables
+
+    filepaths = []
+    for i in range(3):
+        with build_writer(output_format, tmp_path, f"results_{i}", row_group_size=2) as writer:
+            for j in range(5):
+                sim = Simulation("CC", None, None, None, None, name=f"ligand_{j}")
+                writer.write([sim], [Result("CC", sim.name, "node", -1.0 * j, 1.0)])
+        filepaths.append(writer.filepath)
+
+    num_rows = merge_tables(filepaths, tmp_path / f"results.{output_format}")
+
+    assert num_rows == 15
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pytest
+
+from pyscreener.docking import Simulation
+from pyscreener.docking.pipeline import dock, prepare
+
+from .conftest import FakeMetadata, FakeRunner
+
+
+@pytest.fixture
+def sim(tmp_path):
+    return Simulation(
+        "CCC", None, None, None, FakeMetadata(), 1, "ligand", None, tmp_path, tmp_path
+    )
+
+
+def test_prepare(sim):
+    sim_, contents, prep_time = prepare(FakeRunner, sim)
+
+    assert sim_ is sim
+    assert contents == b"CCC"
+    assert prep_time >= 0
+
+
+def test_prepare_failure(sim):
+    sim.smi = "foo"
+
+    assert prepare(FakeRunner, sim)[:2] == (None, None)
+
+
+def test_dock(sim):
+    result = dock(FakeRunner, prepare(FakeRunner, sim))
+
+    assert result.score == -3
+    assert result.time is not None
+
+
+def test_dock_other_node(sim):
+    """the prepared ligand file should be rewritten if it doesn't exist on the docking node"""
+    prep_output = prepare(FakeRunner, sim)
+    Path(sim.metadata.prepared_ligand).unlink()
+
+    assert dock(FakeRunner, prep_output).score == -3
+
+
+def test_dock_failed_prep(sim):
+    sim.smi = "foo"
+
+    assert dock(FakeRunner, prepare(FakeRunner, sim)) is None
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from pyscreener.docking import Result, Simulation
+from pyscreener.docking.records import RecordWriter, iter_smiles
+from pyscreener.utils import Reduction
+
+
+def make_sims(smi, name, n=2):
+    return [Simulation(smi, None, None, None, None, name=name) for _ in range(n)]
+
+
+@pytest.fixture
+def resultss():
+    return [
+        [Result("CCO", "a", None, -5.0), Result("CCO", "a", None, -7.0)],
+        [Result("CC", "b", None, None), Result("CC", "b", None, None)],
+        [None, None],
+        [Result("C", "d", None, None, status="misfit"), None],
+    ]
+
+
+@pytest.fixture
+def simss():
+    return [make_sims(smi, name) for smi, name in zip(["CCO", "CC", "foo", "C"], "abcd")]
+
+
+def test_iter_smiles():
+    fid = io.StringIO("CCO ethanol\n\n# comment\n  c1ccccc1\nCC\n")
+
+    assert list(iter_smiles(fid)) == ["CCO", "c1ccccc1", "CC"]
+
+
+def test_iter_smiles_lazy():
+    """lines are only read from the stream as they are consumed"""
+    fid = io.StringIO("CCO\nCC\nC\n")
+    smis = iter_smiles(fid)
+
+    assert next(smis) == "CCO"
+    assert fid.readline() == "CC\n"
+
+
+def test_jsonl(simss, resultss):
+    fid = io.StringIO()
+    writer = RecordWriter(fid)
+    for sims, results in zip(simss, resultss):
+        writer.write(sims, results)
+
+    records = [json.loads(line) for line in fid.getvalue().splitlines()]
+
+    assert len(writer) == 4
+    assert [r["score"] for r in records] == [-7.0, None, None, None]
+    assert records[0]["scores"] == [-5.0, -7.0]
+    assert [r["status"] for r in records] == ["success", "failed", "invalid", "misfit"]
+    assert [r["name"] for r in records] == list("abcd")
+
+
+def test_tsv(simss, resultss):
+    fid = io.StringIO()
+    writer = RecordWriter(fid, "tsv", Reduction.AVG)
+    for sims, results in zip(simss[:2], resultss[:2]):
+        writer.write(sims, results)
+
+    lines = fid.getvalue().splitlines()
+
+    assert lines[0] == "smiles\tname\tscore\tstatus"
+    assert lines[1:] == ["CCO\ta\t-6.0\tsuccess", "CC\tb\t\tfailed"]
+
+
+def test_flush(simss, resultss):
+    """each record is visible on the stream as soon as it is written"""
+
+    class Stream(io.StringIO):
+        num_flushes = 0
+
+        def flush(self):
+            self.num_flushes += 1
+
+    fid = Stream()
+    writer = RecordWriter(fid)
+    writer.write(simss[0], resultss[0])
+
+    assert fid.num_flushes == 1
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        RecordWriter(io.StringIO(), "csv")
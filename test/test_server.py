@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from pyscreener.server import Client, DockingService, ResultCache, canonicalize, make_server
+
+
+@pytest.fixture(scope="module")
+def receptors():
+    return ["receptor"]
+
+
+@pytest.fixture
+def service(virtual_screen):
+    with DockingService(virtual_screen, max_wait=0.2) as service:
+        yield service
+
+
+@pytest.fixture
+def server(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_canonicalize():
+    assert canonicalize("OCC") == canonicalize("CCO")
+    assert canonicalize("foo") is None
+
+
+def test_cache_lru():
+    cache = ResultCache(2)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    cache.get("a")
+    cache.put("c", 3.0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.0
+    assert len(cache) == 2
+
+
+def test_cache_disabled():
+    cache = ResultCache(0)
+    cache.put("a", 1.0)
+
+    assert cache.get("a") is None
+
+
+def test_score(service):
+    assert service.score(["CCO", "foo", "N", "c1ccccc1"]) == [-3.0, None, None, -8.0]
+
+
+def test_cached(service):
+    service.score(["CCCC"])
+    num_dispatched = service.num_dispatched
+
+    assert service.score(["CCCC", "C(C)CC"]) == [-4.0, -4.0]
+    assert service.num_dispatched == num_dispatched
+    assert service.cache.hits >= 2
+
+
+def test_micro_batching(service):
+    """the ligands of concurrent requests are dispatched in a single window and ligands shared
+    between requests are only docked once"""
+    smiss = [["CC", "CCC"], ["CCC", "CCCCC"], ["CCCCCC"]]
+    with ThreadPoolExecutor(len(smiss)) as pool:
+        scoress = list(pool.map(service.score, smiss))
+
+    assert scoress == [[-2.0, -3.0], [-3.0, -5.0], [-6.0]]
+    assert service.num_windows == 1
+    assert service.num_dispatched == 4
+
+
+def test_http(server):
+    client = Client(port=server.server_address[1], timeout=30)
+
+    assert client.score(["CCO", "foo"]) == [-3.0, None]
+    assert client.health()["status"] == "ok"
+
+
+def test_http_invalid(server):
+    client = Client(port=server.server_address[1], timeout=30)
+
+    with pytest.raises(RuntimeError):
+        client.request("POST", "/score", {"smis": ["CCO"]})
+    with pytest.raises(RuntimeError):
+        client.request("GET", "/foo")
+
+
+def test_unix_socket(service, tmp_path):
+    socket_path = str(tmp_path / "pyscreener.sock")
+    server = make_server(service, socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        assert Client(socket_path=socket_path, timeout=30).score(["CCO"]) == [-3.0]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,47 @@
+import pytest
+
+from .conftest import FakeRunner
+
+
+class BatchRunner(FakeRunner):
+    @classmethod
+    def supports_batching(cls, metadata):
+        return True
+
+    @staticmethod
+    def prepare_and_run_batch(sims):
+        return [FakeRunner.prepare_and_run(sim) for sim in sims]
+
+
+@pytest.fixture
+def virtual_screen(build_virtual_screen, tmp_path):
+    return build_virtual_screen(tmp_path)
+
+
+@pytest.mark.parametrize("window", [1, 2, None])
+def test_stream(virtual_screen, smis, window):
+    out = list(virtual_screen.stream(smis, window=window))
+
+    assert sorted(sims[0].smi for sims, _ in out) == sorted(smis)
+    assert len(virtual_screen.resultss) == len(virtual_screen) == len(smis)
+
+
+def test_stream_no_keep(virtual_screen, smis):
+    out = list(virtual_screen.stream(smis, keep=False))
+
+    assert len(out) == len(smis)
+    assert virtual_screen.resultss == virtual_screen.run_simulationss == []
+    assert len(virtual_screen) == len(smis)
+    assert virtual_screen.num_simulations == 2 * len(smis)
+    assert virtual_screen.num_timed == 2 * len(smis)
+
+
+@pytest.mark.parametrize("batch_size,schedule", [(1, "cost"), (2, "fifo"), (2, "cost")])
+def test_stream_schedule(build_virtual_screen, tmp_path, smis, batch_size, schedule):
+    virtual_screen = build_virtual_screen(
+        tmp_path, runner=BatchRunner, batch_size=batch_size, schedule=schedule
+    )
+    out = list(virtual_screen.stream(smis, window=3))
+
+    assert sorted(sims[0].smi for sims, _ in out) == sorted(smis)
+    assert all(r.score == -len(r.smiles) for _, results in out for r in results)
@@ -146,3 +146,293 @@ def test_use3d(smis, tmp_path):
 
     for ligand in supply:
         assert Path(ligand).exists()
+
+
+def test_lazy(smis, tmp_path, filetype):
+    if filetype is not None:
+        supply = LigandSupply([make_file(smis, tmp_path, filetype)], lazy=True)
+    else:
+        supply = LigandSupply([], smis=smis, path=tmp_path, lazy=True)
+
+    assert supply.ligands is None
+    assert len(list(supply)) == len(smis)
+
+    if filetype == "sdf":
+        with pytest.raises(TypeError):
+            len(supply)
+    else:
+        assert len(supply) == len(smis)
+
+
+def test_lazy_chunks(smis, tmp_path):
+    filepaths = [make_csv(smis, tmp_path), make_sdf(smis, tmp_path), make_smi(smis, tmp_path)]
+
+    supply = LigandSupply(filepaths, lazy=True)
+    chunks = list(supply.iter_chunks(2))
+
+    assert all(len(chunk) <= 2 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(filepaths) * len(smis)
+
+
+@pytest.mark.parametrize("filetype", ["csv", "smi"])
+def test_lazy_indexing(smis, tmp_path, filetype):
+    supply = LigandSupply([make_file(smis, tmp_path, filetype)], lazy=True)
+    ligands = LigandSupply([make_file(smis, tmp_path, filetype)]).ligands
+
+    assert len(supply) == len(smis)
+    assert [supply[i] for i in range(len(supply))] == ligands
+    assert supply[-1] == ligands[-1]
+    assert supply[1:] == ligands[1:]
+    assert supply[::2] == ligands[::2]
+
+
+def test_lazy_indexing_crlf(tmp_path):
+    p = tmp_path / "mols.smi"
+    p.write_bytes(b"smiles name\r\nCCO a\r\n\r\nCCC b\r\n   \nCCN c")
+
+    supply = LigandSupply([p], lazy=True)
+
+    assert len(supply) == len(list(supply)) == 3
+    assert supply[1] == list(supply)[1]
+
+
+def test_lazy_indexing_multiple_files(smis, tmp_path):
+    filepaths = [make_csv(smis, tmp_path), make_smi(smis, tmp_path)]
+
+    supply = LigandSupply(filepaths, smis=smis, lazy=True)
+
+    assert len(supply) == 3 * len(smis)
+    assert supply[:] == list(supply)
+
+
+def test_lazy_indexing_sdf(smis, tmp_path):
+    supply = LigandSupply([make_sdf(smis, tmp_path)], lazy=True)
+
+    with pytest.raises(TypeError):
+        supply[0]
+
+
+def test_byte_ranges(smis, tmp_path):
+    filepaths = [make_csv(smis, tmp_path), make_smi(smis, tmp_path)]
+
+    supply = LigandSupply(filepaths, lazy=True)
+    ligands = [
+        smi
+        for filepath, fmt, start, stop in supply.iter_byte_ranges(2)
+        for smi in LigandSupply.read_byte_range(filepath, fmt, start, stop)
+    ]
+
+    assert ligands == list(supply)
+
+
+@pytest.mark.parametrize("filetype", ["sdf", "smi"])
+def test_parallel(smis, tmp_path, filetype):
+    filepath = make_file(smis, tmp_path, filetype)
+
+    supply = LigandSupply([filepath], ncpu=2)
+
+    assert supply.ligands == LigandSupply([filepath]).ligands
+
+
+def test_parallel_lazy(smis, tmp_path):
+    filepath = make_sdf(smis, tmp_path)
+
+    supply = LigandSupply([filepath], lazy=True, ncpu=2)
+
+    assert list(supply) == LigandSupply([filepath]).ligands
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+@pytest.mark.parametrize("lazy", [True, False])
+@pytest.mark.parametrize("ncpu", [1, 2])
+def test_smi_smiles_col(smis, tmp_path, compressed, lazy, ncpu):
+    filepath = tmp_path / "mols.smi"
+    filepath.write_text("name smiles\n" + "".join(f"mol_{i} {smi}\n" for i, smi in enumerate(smis)))
+    if compressed:
+        filepath = compress(filepath, "gz")
+
+    supply = LigandSupply([filepath], smiles_col=1, lazy=lazy, ncpu=ncpu)
+
+    assert [Chem.CanonSmiles(smi) for smi in supply] == [Chem.CanonSmiles(smi) for smi in smis]
+
+
+@pytest.mark.parametrize("ncpu", [1, 2])
+def test_optimize_single_file(smis, tmp_path, ncpu):
+    supply = LigandSupply(
+        [make_csv(smis, tmp_path)], optimize=True, path=tmp_path, ncpu=ncpu, single_file=True
+    )
+
+    assert len(supply) == len(smis)
+    assert len({ligand.split("#")[0] for ligand in supply}) == 1
+
+    mols = list(Chem.SDMolSupplier(supply[0].split("#")[0], removeHs=False))
+    assert [Chem.MolToSmiles(Chem.RemoveHs(m)) for m in mols] == [
+        Chem.CanonSmiles(smi) for smi in smis
+    ]
+    assert all(m.GetConformer().Is3D() for m in mols)
+
+
+def test_optimize_parallel(smis, tmp_path):
+    supply = LigandSupply([], smis=smis, optimize=True, path=tmp_path, ncpu=2)
+
+    assert len(supply) == len(smis)
+    for ligand in supply:
+        assert Path(ligand).exists()
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_use3d_single_file(smis, tmp_path, lazy):
+    p_sdf = make_sdf(smis, tmp_path)
+
+    supply = LigandSupply([p_sdf], use_3d=True, lazy=lazy, single_file=True)
+    ligands = list(supply)
+
+    assert ligands == [f"{p_sdf}#{i}" for i in range(len(smis))]
+    assert not supply.smiles
+    assert list(tmp_path.glob("mols_*")) == []
+
+
+@pytest.fixture(params=["gz", "bz2", "xz"])
+def compression(request):
+    return request.param
+
+
+def compress(filepath, compression):
+    import bz2
+    import gzip
+    import lzma
+
+    open_ = {"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}[compression]
+    p_compressed = filepath.with_name(f"{filepath.name}.{compression}")
+    with open(filepath, "rb") as fid, open_(p_compressed, "wb") as fid_compressed:
+        fid_compressed.write(fid.read())
+
+    return p_compressed
+
+
+def test_guess_filetype_compressed(compression):
+    filepaths = [f"test.csv.{compression}", f"test.sdf.{compression}", f"test.smi.{compression}"]
+    formats = [LigandSupply.guess_format(Path(filepath)) for filepath in filepaths]
+
+    assert formats == [FileFormat.CSV, FileFormat.SDF, FileFormat.SMI]
+
+
+@pytest.mark.parametrize("filetype", ["csv", "smi", "sdf"])
+@pytest.mark.parametrize("ncpu", [1, 2])
+def test_compressed(smis, tmp_path, filetype, compression, ncpu):
+    filepath = make_file(smis, tmp_path, filetype)
+    p_compressed = compress(filepath, compression)
+
+    supply = LigandSupply([filepath], ncpu=ncpu)
+    supply_compressed = LigandSupply([p_compressed], ncpu=ncpu)
+    supply_lazy = LigandSupply([p_compressed], ncpu=ncpu, lazy=True)
+
+    assert list(supply_compressed) == list(supply)
+    assert len(list(supply_lazy)) == len(smis)
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_compressed_use3d(smis, tmp_path, compression, lazy):
+    p_compressed = compress(make_sdf(smis, tmp_path), compression)
+
+    ligands = list(LigandSupply([p_compressed], use_3d=True, lazy=lazy, path=tmp_path))
+
+    assert len(ligands) == len(smis)
+    assert all(Path(ligand).exists() for ligand in ligands)
+
+
+def test_compressed_use3d_unsupported(smis, tmp_path):
+    p_compressed = compress(make_smi(smis, tmp_path), "bz2")
+
+    with pytest.raises(ValueError):
+        list(LigandSupply.read_mols(p_compressed))
+
+
+def test_compressed_lazy_indexing(smis, tmp_path, compression):
+    p_compressed = compress(make_smi(smis, tmp_path), compression)
+
+    supply = LigandSupply([p_compressed], lazy=True)
+
+    with pytest.raises(TypeError):
+        len(supply)
+
+
+@pytest.fixture(params=["parquet", "feather"])
+def table_format(request):
+    return request.param
+
+
+def make_table(smis, path, table_format):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    table = pa.table(
+        {
+            "id": [f"ligand_{i}" for i in range(len(smis))],
+            "smiles": smis,
+            "MW": [float(m.GetNumHeavyAtoms()) for m in mols(smis)],
+        }
+    )
+    p_table = path / f"mols.{table_format}"
+    if table_format == "parquet":
+        pq.write_table(table, p_table, row_group_size=2)
+    else:
+        feather.write_feather(table, p_table)
+
+    return p_table
+
+
+def test_guess_filetype_table():
+    filepaths = ["test.parquet", "test.feather", "test.arrow"]
+    formats = [LigandSupply.guess_format(Path(filepath)) for filepath in filepaths]
+
+    assert formats == [FileFormat.PARQUET, FileFormat.ARROW, FileFormat.ARROW]
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+@pytest.mark.parametrize("smiles_col", [1, "smiles"])
+def test_table(smis, tmp_path, table_format, lazy, smiles_col):
+    p_table = make_table(smis, tmp_path, table_format)
+
+    supply = LigandSupply([p_table], smiles_col=smiles_col, lazy=lazy)
+
+    assert list(supply) == smis
+
+
+def test_table_filters(smis, tmp_path, table_format):
+    p_table = make_table(smis, tmp_path, table_format)
+    max_atoms = sorted(m.GetNumHeavyAtoms() for m in mols(smis))[len(smis) // 2]
+
+    supply = LigandSupply([p_table], smiles_col="smiles", filters={"MW": (None, max_atoms)})
+
+    assert list(supply) == [
+        smi for smi, m in zip(smis, mols(smis)) if m.GetNumHeavyAtoms() <= max_atoms
+    ]
+
+
+@pytest.mark.parametrize("filetype", ["csv", "smi", "sdf"])
+@pytest.mark.parametrize("n", [1, 2, 3, 7])
+def test_shard(smis, tmp_path, filetype, n):
+    filepath = make_file(smis, tmp_path, filetype)
+
+    full = list(LigandSupply([filepath], lazy=True))
+    shards = [list(LigandSupply([filepath], lazy=True, shard=(i, n))) for i in range(n)]
+
+    assert [ligand for shard in shards for ligand in shard] == full
+
+
+@pytest.mark.parametrize("n", [1, 2, 3])
+def test_shard_round_robin(smis, tmp_path, compression, n):
+    filepath = compress(make_smi(smis, tmp_path), compression)
+
+    full = list(LigandSupply([filepath], smis=smis, lazy=True))
+    shards = [list(LigandSupply([filepath], smis=smis, lazy=True, shard=(i, n))) for i in range(n)]
+
+    assert sorted(ligand for shard in shards for ligand in shard) == sorted(full)
+
+
+@pytest.mark.parametrize("shard,lazy", [((0, 2), False), ((2, 2), True), ((-1, 2), True)])
+def test_invalid_shard(smis, tmp_path, shard, lazy):
+    with pytest.raises(ValueError):
+        LigandSupply([make_smi(smis, tmp_path)], lazy=lazy, shard=shard)
@@ -0,0 +1,145 @@
+import re
+import warnings
+
+import pytest
+
+from pyscreener.docking import Simulation
+from pyscreener.exceptions import MissingExecutableError
+from pyscreener.warnings import SimulationFailureWarning
+
+from .conftest import stub_executables, write_executable
+
+try:
+    with stub_executables("prepare_receptor"):
+        from pyscreener.docking.vina import VinaMetadata, VinaRunner
+except MissingExecutableError:
+    pytestmark = pytest.mark.skip()
+
+# a stand-in for the smina executable. Each ligand is "docked" to two binding modes with scores of
+# -(number of atoms) and -(number of atoms) + 1. In a multi-ligand run, a ligand with a "crash"
+# remark aborts the run, and the binding modes of a ligand with a "drop" remark are not written
+SMINA = """\
+import re
+import sys
+
+args = dict(arg[2:].split("=", 1) for arg in sys.argv[1:])
+text = open(args["ligand"]).read()
+batch = text.startswith("MODEL")
+ligands = re.split(r"(?m)^MODEL \\d+\\n", text)[1:] if batch else [text]
+
+with open(args["log"], "w") as log, open(args["out"], "w") as out:
+    for ligand in ligands:
+        if batch and "REMARK crash" in ligand:
+            exit(1)
+
+        n = ligand.count("ATOM")
+        log.write("mode |   affinity | dist from best mode\\n")
+        log.write("     | (kcal/mol) | rmsd l.b.| rmsd u.b.\\n")
+        log.write("-----+------------+----------+----------\\n")
+        for i, score in enumerate((-n, -n + 1), 1):
+            log.write(f"{i:>4} {score:>12.1f}      0.000      0.000\\n")
+            if not (batch and "REMARK drop" in ligand):
+                out.write(f"MODEL {i}\\nREMARK VINA RESULT: {score} 0.000 0.000\\nENDMDL\\n")
+    log.write("Refine time 0.1\\n")
+"""
+
+
+def pdbqt(num_atoms: int, remark: str = "") -> str:
+    return f"REMARK {remark}\n" + "ATOM\n" * num_atoms
+
+
+@pytest.fixture
+def smina(tmp_path, monkeypatch):
+    bin_path = tmp_path / "bin"
+    bin_path.mkdir()
+    write_executable(bin_path / "smina", SMINA)
+    monkeypatch.setenv("PATH", str(bin_path), prepend=":")
+
+
+@pytest.fixture
+def sims(tmp_path):
+    in_path = tmp_path / "inputs"
+    out_path = tmp_path / "outputs"
+    in_path.mkdir()
+    out_path.mkdir()
+
+    sims = []
+    for i in range(3):
+        metadata = VinaMetadata(software="smina", prepared_receptor=in_path / "receptor.pdbqt")
+        metadata.prepared_ligand = in_path / f"ligand_{i}.pdbqt"
+        metadata.prepared_ligand.write_text(pdbqt(i + 1))
+        sims.append(
+            Simulation(
+                "C",
+                "receptor.pdb",
+                (0, 0, 0),
+                (10, 10, 10),
+                metadata,
+                1,
+                f"ligand_{i}",
+                None,
+                in_path,
+                out_path,
+            )
+        )
+
+    return sims
+
+
+def test_parse_batch_logfile(tmp_path):
+    scoress = [[-7.1, -6.5, -6.0], [-5.2], [-8.0, -7.9]]
+    logfile = tmp_path / "batch.log"
+    logfile.write_text("".join(VinaRunner.format_log_table(s) for s in scoress))
+
+    assert VinaRunner.parse_batch_logfile(logfile) == scoress
+
+
+def test_parse_batch_logfile_missing(tmp_path):
+    assert VinaRunner.parse_batch_logfile(tmp_path / "batch.log") is None
+
+
+def test_split_batch_outfile(tmp_path):
+    scoress = [[-7.1, -6.5], [-5.2]]
+    outfile = tmp_path / "batch_out.pdbqt"
+    outfile.write_text("".join(f"MODEL {i}\nREMARK {i}\nENDMDL\n" for i in range(1, 4)))
+
+    poses = VinaRunner.split_batch_outfile(outfile, scoress)
+
+    assert len(poses) == 2
+    assert poses[0].count("MODEL") == 2
+    assert poses[1].startswith("MODEL 3")
+
+
+def test_split_batch_outfile_mismatch(tmp_path):
+    outfile = tmp_path / "batch_out.pdbqt"
+    outfile.write_text("MODEL 1\nENDMDL\n")
+
+    assert VinaRunner.split_batch_outfile(outfile, [[-7.1], [-5.2]]) is None
+
+
+def test_run_batch(smina, sims):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SimulationFailureWarning)
+        VinaRunner.run_batch(sims)
+
+    out_path = sims[0].out_path
+    for i, sim in enumerate(sims):
+        name = VinaRunner.output_name(sim)
+
+        assert sim.result.score == -(i + 1)
+        assert VinaRunner.parse_logfile(out_path / f"smina_{name}.log") == [-(i + 1), -i]
+        assert (out_path / f"smina_{name}_out.pdbqt").read_text().count("MODEL") == 2
+    assert not any("_batch" in p.name for p in out_path.iterdir())
+    assert not any("_batch" in p.name for p in sims[0].in_path.iterdir())
+
+
+@pytest.mark.parametrize("remark", ["crash", "drop"])
+def test_run_batch_fallback(smina, sims, remark):
+    """ligands are run individually if the batched run fails or its output can't be split"""
+    sims[1].metadata.prepared_ligand.write_text(pdbqt(2, remark))
+
+    with pytest.warns(SimulationFailureWarning, match="individually"):
+        VinaRunner.run_batch(sims)
+
+    assert [sim.result.score for sim in sims] == [-1, -2, -3]
+    assert all(re.fullmatch(r"receptor_ligand_\d", sim.result.name) for sim in sims)
@@ -0,0 +1,266 @@
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from importlib.util import find_spec
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+import ray
+
+from pyscreener.docking import Simulation, get_runner
+from pyscreener.exceptions import MissingExecutableError
+from pyscreener.warnings import SimulationFailureWarning
+
+from .conftest import stub_executables, write_executable
+
+
+class FakeVina:
+    """a stand-in for the `Vina` class of the AutoDock Vina python bindings. Each ligand is
+    "docked" to a single binding mode with a score of -(number of atoms)"""
+
+    lock = threading.Lock()
+    num_computed = 0
+    num_loaded = 0
+
+    def __init__(self, sf_name="vina", cpu=0, verbosity=1):
+        self.maps = None
+        self.ligand = None
+
+    def set_receptor(self, rigid_pdbqt_filename=None):
+        self.receptor = rigid_pdbqt_filename
+
+    def compute_vina_maps(self, center, box_size):
+        with FakeVina.lock:
+            FakeVina.num_computed += 1
+        self.maps = (tuple(center), tuple(box_size))
+
+    def write_maps(self, map_prefix_filename="receptor"):
+        with open(f"{map_prefix_filename}.maps", "w") as fid:
+            fid.write(repr(self.maps))
+
+    def load_maps(self, map_prefix_filename):
+        with FakeVina.lock:
+            FakeVina.num_loaded += 1
+        with open(f"{map_prefix_filename}.maps") as fid:
+            self.maps = eval(fid.read())
+
+    def set_ligand_from_string(self, pdbqt):
+        self.ligand = pdbqt
+
+    def dock(self, exhaustiveness=8, n_poses=20):
+        assert self.maps is not None
+        time.sleep(0.05)
+
+    def energies(self, n_poses=9, energy_range=3.0):
+        return np.array([[-float(self.ligand.count("ATOM")), 0.0, 0.0, 0.0, 0.0]])
+
+    def poses(self, n_poses=9, energy_range=3.0):
+        return f"MODEL 1\n{self.ligand}ENDMDL\n"
+
+
+# import the bindings with FakeVina if the python bindings aren't installed. Only the "vina" entry
+# is restored afterwards, as restoring all of sys.modules would unload the pyscreener modules
+vina = sys.modules.get("vina")
+if find_spec("vina") is None:
+    sys.modules["vina"] = types.SimpleNamespace(Vina=FakeVina)
+try:
+    with stub_executables("prepare_receptor"):
+        from pyscreener.docking.vina import Software, VinaMetadata, VinaRunner, bindings
+except MissingExecutableError:
+    pytestmark = pytest.mark.skip()
+finally:
+    if vina is None:
+        sys.modules.pop("vina", None)
+
+
+# a stand-in for the vina executable, with the same scores as FakeVina
+VINA = """\
+import sys
+
+args = dict(arg[2:].split("=", 1) for arg in sys.argv[1:])
+n = open(args["ligand"]).read().count("ATOM")
+with open(args["log"], "w") as log:
+    log.write("-----+------------+----------+----------\\n")
+    log.write(f"   1 {-n:>12.1f}      0.000      0.000\\n")
+    log.write("Writing output ... done.\\n")
+open(args["out"], "w").write("MODEL 1\\nENDMDL\\n")
+"""
+
+
+class LocalActor:
+    """a stand-in for the handle of a VinaActor that docks in the calling process"""
+
+    def __init__(self):
+        self.docker = bindings.VinaDocker()
+        self.dock = types.SimpleNamespace(remote=self.remote)
+
+    def remote(self, *args):
+        return ray.put(self.docker.dock(*args))
+
+
+class DeadActor:
+    def __init__(self):
+        self.dock = types.SimpleNamespace(remote=self.remote)
+
+    def remote(self, *args):
+        raise ray.exceptions.RayActorError()
+
+
+@pytest.fixture(autouse=True)
+def fake_vina(monkeypatch):
+    monkeypatch.setattr(bindings, "Vina", FakeVina)
+    monkeypatch.setattr(FakeVina, "num_computed", 0)
+    monkeypatch.setattr(FakeVina, "num_loaded", 0)
+
+
+def dock(docker, ligand="ATOM\n", center=(0, 0, 0)):
+    return docker.dock(ligand, "receptor.pdbqt", center, (10, 10, 10))
+
+
+def test_docker():
+    docker = bindings.VinaDocker()
+    scores, poses = dock(docker, "ATOM\nATOM\n")
+
+    assert scores == [-2.0]
+    assert poses.startswith("MODEL 1")
+
+
+def test_docker_reuse():
+    docker = bindings.VinaDocker()
+    for _ in range(3):
+        dock(docker)
+
+    assert docker.num_maps() == FakeVina.num_computed == 1
+    assert FakeVina.num_loaded == 0
+
+
+def test_docker_boxes():
+    docker = bindings.VinaDocker()
+    dock(docker, center=(0, 0, 0))
+    dock(docker, center=(1, 0, 0))
+
+    assert docker.num_maps() == FakeVina.num_computed == 2
+
+
+def test_docker_concurrent():
+    """the maps are computed once and loaded by the Vina object of each concurrent call"""
+    docker = bindings.VinaDocker()
+    with ThreadPoolExecutor(4) as pool:
+        scoress = list(pool.map(lambda _: dock(docker)[0], range(8)))
+
+    assert scoress == [[-1.0]] * 8
+    assert FakeVina.num_computed == 1
+    assert FakeVina.num_loaded > 0
+    assert sum(len(vinas) for vinas in docker.vinas.values()) == 1 + FakeVina.num_loaded
+
+
+def test_get_actor(monkeypatch):
+    """all of the workers on a node share the same named actor"""
+    if not ray.is_initialized():
+        ray.init(num_cpus=2)
+
+    options = {}
+
+    class FakeActorClass:
+        def options(self, **kwargs):
+            options.update(kwargs)
+            return types.SimpleNamespace(remote=lambda: "actor")
+
+    monkeypatch.setattr(bindings, "VinaActor", FakeActorClass())
+    bindings.get_actor.cache_clear()
+    try:
+        actor = bindings.get_actor()
+    finally:
+        bindings.get_actor.cache_clear()
+
+    node_id = ray.get_runtime_context().get_node_id()
+
+    assert actor == "actor"
+    assert options["name"] == f"pyscreener_vina_{node_id}"
+    assert options["get_if_exists"]
+    assert options["max_concurrency"] > 1
+
+
+@pytest.fixture
+def sim(tmp_path):
+    if not ray.is_initialized():
+        ray.init(num_cpus=2)
+
+    metadata = VinaMetadata(software="vina_py", prepared_receptor=tmp_path / "receptor.pdbqt")
+    metadata.prepared_ligand = tmp_path / "ligand.pdbqt"
+    metadata.prepared_ligand.write_text("ATOM\nATOM\nATOM\n")
+
+    return Simulation(
+        "CCC",
+        "receptor.pdb",
+        (0, 0, 0),
+        (10, 10, 10),
+        metadata,
+        1,
+        "ligand",
+        None,
+        tmp_path,
+        tmp_path,
+    )
+
+
+def set_actor(monkeypatch, actor):
+    monkeypatch.setattr(bindings, "get_actor", functools.lru_cache()(lambda: actor))
+
+
+def test_get_runner():
+    metadata = VinaMetadata(software="vina_py")
+
+    assert get_runner("vina", metadata) is bindings.VinaPyRunner
+    assert metadata.software == Software.VINA_PY
+
+
+def test_get_runner_not_installed(monkeypatch):
+    """the vina executable is used if the python bindings can't be imported"""
+    monkeypatch.setitem(sys.modules, "pyscreener.docking.vina.bindings", None)
+    metadata = VinaMetadata(software="vina_py")
+
+    with pytest.warns(UserWarning, match="not installed"):
+        runner = get_runner("vina", metadata)
+
+    assert runner is VinaRunner
+    assert metadata.software == Software.VINA
+
+
+def test_run(monkeypatch, sim):
+    actor = LocalActor()
+    set_actor(monkeypatch, actor)
+
+    scores = bindings.VinaPyRunner.run(sim)
+    name = VinaRunner.output_name(sim)
+
+    assert scores == [-3.0]
+    assert sim.result.score == -3.0
+    assert VinaRunner.parse_logfile(sim.out_path / f"vina_py_{name}.log") == [-3.0]
+    assert (sim.out_path / f"vina_py_{name}_out.pdbqt").exists()
+    assert actor.docker.num_maps() == 1
+
+
+def test_run_unprepared(sim):
+    sim.metadata.prepared_ligand = None
+
+    assert bindings.VinaPyRunner.run(sim) is None
+
+
+def test_run_dead_actor(monkeypatch, tmp_path, sim):
+    """the ligand is docked with the vina executable if the actor dies"""
+    bin_path = tmp_path / "bin"
+    bin_path.mkdir()
+    write_executable(bin_path / "vina", VINA)
+    monkeypatch.setenv("PATH", str(bin_path), prepend=":")
+    set_actor(monkeypatch, DeadActor())
+
+    with pytest.warns(SimulationFailureWarning, match="actor died"):
+        scores = bindings.VinaPyRunner.run(sim)
+
+    assert scores == [-3.0]
+    assert sim.result.score == -3.0
+    assert sim.metadata.software == Software.VINA
@@ -1,4 +1,5 @@
 from pathlib import Path
+import shutil
 
 import pytest
 
@@ -10,6 +11,10 @@ try:
 except MissingExecutableError:
     pytestmark = pytest.mark.skip()
 
+# the runner module may have already been imported with a stubbed executable (see test_vina_batch)
+if shutil.which("prepare_receptor") is None:
+    pytestmark = pytest.mark.skip()
+
 TEST_DIR = Path(__file__).parent
 
 
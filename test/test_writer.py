@@ -0,0 +1,100 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from pyscreener.docking import Result, Simulation  # noqa: E402
+from pyscreener.docking.writer import build_writer  # noqa: E402
+
+
+@pytest.fixture(params=["parquet", "arrow"])
+def output_format(request):
+    return request.param
+
+
+@pytest.fixture
+def simss():
+    return [
+        [Simulation(smi, None, None, None, None, name=f"ligand_{i}") for _ in range(2)]
+        for i, smi in enumerate(["C1=CC=CC=C1", "CCCC", "foo"])
+    ]
+
+
+@pytest.fixture
+def resultss(simss):
+    resultss = [
+        [Result(sims[0].smi, sims[0].name, "node", -1.0 * i, 1.0) for _ in sims]
+        for i, sims in enumerate(simss)
+    ]
+    resultss[1][1].score = None
+    resultss[2] = [None, None]
+
+    return resultss
+
+
+def read(filepath, output_format):
+    if output_format == "parquet":
+        return pq.read_table(filepath)
+
+    with pa.memory_map(str(filepath)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def test_write(tmp_path, output_format, simss, resultss):
+    with build_writer(output_format, tmp_path, row_group_size=2) as writer:
+        for sims, results in zip(simss, resultss):
+            writer.write(sims, results)
+
+    table = read(writer.filepath, output_format)
+
+    assert len(table) == len(writer) == 6
+    assert table.column("receptor").to_pylist() == [0, 1] * 3
+    assert table.column("status").to_pylist() == [
+        "success",
+        "success",
+        "success",
+        "failed",
+        "invalid",
+        "invalid",
+    ]
+    assert table.column("smiles").to_pylist()[0] == "c1ccccc1"
+
+
+def test_row_groups(tmp_path, simss, resultss):
+    with build_writer("parquet", tmp_path, row_group_size=2) as writer:
+        for sims, results in zip(simss, resultss):
+            writer.write(sims, results)
+
+    assert pq.ParquetFile(writer.filepath).num_row_groups == 3
+
+
+def test_invalid_format(tmp_path):
+    with pytest.raises(ValueError):
+        build_writer("foo", tmp_path)
+
+
+@pytest.mark.parametrize("output_format,compression", [("arrow", "gzip"), ("parquet", "foo")])
+def test_invalid_compression(tmp_path, output_format, compression):
+    with pytest.raises(ValueError):
+        build_writer(output_format, tmp_path, compression=compression)
+
+
+def test_write_exception(tmp_path, simss, resultss):
+    """the rows written before an exception are readable"""
+    with pytest.raises(RuntimeError):
+        with build_writer("parquet", tmp_path, row_group_size=2) as writer:
+            for sims, results in zip(simss, resultss):
+                writer.write(sims, results)
+            raise RuntimeError
+
+    assert pq.read_table(writer.filepath).num_rows == sum(len(results) for results in resultss)
+
+
+def test_write_status(tmp_path, simss, resultss):
+    resultss[0][0].status = "misfit"
+    with build_writer("parquet", tmp_path) as writer:
+        writer.write(simss[0], resultss[0])
+
+    table = read(writer.filepath, "parquet")
+
+    assert table.column("status").to_pylist() == ["misfit", "success"]